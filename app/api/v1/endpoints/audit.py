@@ -44,3 +44,11 @@ def read_audit_stats(
     """
     key_id = api_key.id if hasattr(api_key, 'id') else None
     return audit_service.get_audit_stats(db, api_key_id=key_id)
+
+@router.get("/writer/stats")
+def read_audit_writer_stats(api_key = Depends(get_api_key)):
+    """
+    Buffered audit writer: queue depth, rows dropped under backpressure,
+    flush sizes and flush latency.
+    """
+    return audit_service.audit_writer.stats()
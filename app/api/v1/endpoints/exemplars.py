@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.schemas.exemplar import ExemplarCreateRequest, ExemplarRemoveRequest, ExemplarChangeResponse, ExemplarListResponse
+from app.services.exemplar_service import exemplar_registry, ExemplarChangesUnsupported, ExemplarSyncFailed
+from app.core.security import get_api_key, get_admin_api_key
+
+router = APIRouter()
+
+def _require_scanner():
+    if not exemplar_registry.enabled:
+        raise HTTPException(status_code=503, detail="Semantic scanning is disabled")
+
+async def _change(apply):
+    """Run an exemplar change, mapping "can't reach the semantic check" to 409 / 503."""
+    try:
+        return await apply()
+    except ExemplarChangesUnsupported as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ExemplarSyncFailed as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+@router.get("/", response_model=ExemplarListResponse)
+def list_exemplars(limit: int = 100, offset: int = 0, api_key = Depends(get_api_key)):
+    """
+    Known jailbreak exemplars used by the semantic injection check.
+    """
+    _require_scanner()
+    total, items = exemplar_registry.list(offset, limit)
+    return {"total": total, "items": items}
+
+@router.post("/", response_model=ExemplarChangeResponse)
+async def add_exemplars(body: ExemplarCreateRequest, api_key = Depends(get_admin_api_key)):
+    """
+    Add (or replace) exemplars. Only the new texts are encoded; the change
+    reaches every worker without a restart.
+    """
+    _require_scanner()
+    ids = await _change(lambda: exemplar_registry.add([(item.id, item.text) for item in body.items]))
+    return {"ids": ids, "version": exemplar_registry.version}
+
+@router.post("/remove", response_model=ExemplarChangeResponse)
+async def remove_exemplars(body: ExemplarRemoveRequest, api_key = Depends(get_admin_api_key)):
+    """Remove exemplars by id (file or runtime ones)."""
+    _require_scanner()
+    ids = await _change(lambda: exemplar_registry.remove(body.ids))
+    return {"ids": ids, "version": exemplar_registry.version}
+
+@router.delete("/{exemplar_id}", response_model=ExemplarChangeResponse)
+async def remove_exemplar(exemplar_id: str, api_key = Depends(get_admin_api_key)):
+    _require_scanner()
+    ids = await _change(lambda: exemplar_registry.remove([exemplar_id]))
+    if not ids:
+        raise HTTPException(status_code=404, detail=f"Unknown exemplar: {exemplar_id}")
+    return {"ids": ids, "version": exemplar_registry.version}
+
+@router.get("/stats")
+def read_exemplar_stats(api_key = Depends(get_api_key)):
+    """
+    Corpus size, index state and sync counters.
+    """
+    return exemplar_registry.stats()
@@ -1,123 +1,297 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, BackgroundTasks
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+import asyncio
 import time
-from app.services.gliner_service import gliner_service
+from app.schemas.guard import GuardConfig, GuardRequest, GuardResponse, GuardBatchRequest, GuardBatchResponse
+from app.services.guard_pipeline import guard_scheduler, run_guard_batch
+from app.services.guard_cache import guard_cache, cache_key
+from app.services.stream_guard import StreamGuard, inspect_window
 from app.services.security_service import security_scanner
 from app.services.toxicity_service import toxicity_scanner
+from app.services.exemplar_service import exemplar_registry
 from app.services.notification_service import notification_service
-from app.core.limiter import limiter
-from app.core.security import get_api_key
-from app.services.audit_service import log_request
+from app.core.config import settings
+from app.core.executor import inference_executor, InferenceQueueFull
+from app.core.remote_executor import RemoteInferenceError
+from app.core.limiter import limiter, hit
+from app.core.security import get_api_key, lookup_api_key
+from app.services.audit_service import audit_writer, build_row
+from app.services.worker_stats import model_stats, planner_stats, toxicity_stats
 
 router = APIRouter()
 
-class GuardConfig(BaseModel):
-    detect_injection: bool = True
-    redact_pii: bool = True
-    detect_toxicity: bool = False
-    block_topics: Optional[List[str]] = None
+# Inference failures that say nothing about the prompt: the client may retry
+INFERENCE_ERRORS = (InferenceQueueFull, RemoteInferenceError, asyncio.TimeoutError)
 
-class GuardRequest(BaseModel):
-    prompt: str
-    config: Optional[GuardConfig] = Field(default_factory=GuardConfig)
+def _inference_failed(e: Exception):
+    """503 + Retry-After for a full queue or a failing worker, 504 for a worker that timed out."""
+    if isinstance(e, asyncio.TimeoutError):
+        return HTTPException(status_code=504, detail="Inference timed out", headers={"Retry-After": "1"})
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-class GuardResponse(BaseModel):
-    safe: bool
-    score: float = 0.0
-    sanitized_prompt: Optional[str] = None
-    reason: Optional[str] = None
-    pii_detected: Optional[List[str]] = []
+MODEL_NAME = "guard-v2-composite"
+
+# Alerts sent outside a request (WebSocket streams have no BackgroundTasks); referenced until done
+_alert_tasks = set()
+
+def _schedule_alert(**alert):
+    task = asyncio.get_running_loop().create_task(notification_service.send_alert(**alert))
+    _alert_tasks.add(task)
+    task.add_done_callback(_alert_tasks.discard)
+
+async def _inference_stats(fn, *args) -> dict:
+    """
+    fn(*args) where inference runs: on every inference worker with the
+    remote executor, in this process otherwise. A process pool's workers
+    can't be addressed one by one, so with INFERENCE_EXECUTOR=process this
+    is the API process's own (mostly idle) state.
+    """
+    if inference_executor.kind == "remote":
+        return {"scope": "inference workers", **await inference_executor.collect(fn, *args)}
+    return {"scope": "this process", **fn(*args)}
+
+def _cache_key(item: tuple) -> str:
+    """cache_key for a (prompt, config, api_key_id) item under the current rules and exemplars."""
+    return cache_key(*item, detection_version=f"rules:{security_scanner.rule_engine.version}/exemplars:{exemplar_registry.version}")
+
+def _audit_entry(result: GuardResponse, latency_ms: float, api_key_id):
+    """Build the audit row arguments (build_row kwargs) for one guard result."""
+    reason = result.reason
+    # Append score to reason for visibility in existing logs
+    if reason and result.score > 0:
+        reason = f"{reason} (Conf: {result.score:.2f})"
+
+    return {
+        "model_name": MODEL_NAME,
+        "is_safe": result.safe,
+        "reason": reason,
+        "latency_ms": latency_ms,
+        "pii_detected": result.pii_detected,
+        "api_key_id": api_key_id
+    }
 
 @router.post("/", response_model=GuardResponse)
 @limiter.limit("5/minute")
 async def analyze_prompt(
-    request: Request, 
-    body: GuardRequest, 
+    request: Request,
+    body: GuardRequest,
     background_tasks: BackgroundTasks,
     api_key = Depends(get_api_key)
 ):
     start_time = time.time()
-    
-    # Default to safe
-    is_safe = True
-    sanitized_prompt = body.prompt
-    pii_entities = []
-    reason = None
-
-    # Helper to log before return
-    def log_result(safe, stop_reason, final_score):
-        latency = (time.time() - start_time) * 1000
-        key_id = api_key.id if hasattr(api_key, 'id') else None
-        
-        # Append score to reason for visibility in existing logs
-        if stop_reason and final_score > 0:
-            stop_reason = f"{stop_reason} (Conf: {final_score:.2f})"
-
-        # 1. Database Audit Log
+    key_id = api_key.id if hasattr(api_key, 'id') else None
+    item = (body.prompt, body.config, key_id)
+
+    async def compute():
+        if settings.MICROBATCH_ENABLED:
+            return await guard_scheduler.submit(item)
+        return (await inference_executor.run(run_guard_batch, [item]))[0]
+
+    try:
+        if settings.GUARD_CACHE_ENABLED:
+            result = await guard_cache.get_or_compute(_cache_key(item), compute)
+        else:
+            result = await compute()
+    except INFERENCE_ERRORS as e:
+        raise _inference_failed(e)
+
+    latency = (time.time() - start_time) * 1000
+    entry = _audit_entry(result, latency, key_id)
+
+    # 1. Database Audit Log (queued; written in bulk by the audit writer)
+    await audit_writer.put([build_row(**entry)])
+
+    # 2. Webhook Notification (Only on Block)
+    if not result.safe:
+        background_tasks.add_task(
+            notification_service.send_alert,
+            reason=entry["reason"],
+            score=result.score,
+            details=f"PII: {result.pii_detected}" if result.pii_detected else None
+        )
+
+    return result
+
+@router.post("/batch", response_model=GuardBatchResponse)
+@limiter.limit("5/minute")
+async def analyze_batch(
+    request: Request,
+    body: GuardBatchRequest,
+    background_tasks: BackgroundTasks,
+    api_key = Depends(get_api_key)
+):
+    """
+    Guard many prompts in one call. Every model stage runs one batched
+    forward pass over all pending items, and audit rows are written in bulk.
+    """
+    if len(body.items) > settings.GUARD_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(body.items)} items (max {settings.GUARD_BATCH_MAX_ITEMS})"
+        )
+
+    start_time = time.time()
+    key_id = api_key.id if hasattr(api_key, 'id') else None
+
+    items = [(item.prompt, item.config, key_id) for item in body.items]
+
+    # Serve repeats from the cache; only misses go to the models
+    if settings.GUARD_CACHE_ENABLED:
+        keys = [_cache_key(item) for item in items]
+        results = await guard_cache.get_many(keys)
+    else:
+        results = [None] * len(items)
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        try:
+            computed = await inference_executor.run(run_guard_batch, [items[i] for i in misses])
+        except INFERENCE_ERRORS as e:
+            raise _inference_failed(e)
+        for i, result in zip(misses, computed):
+            results[i] = result
+            if settings.GUARD_CACHE_ENABLED:
+                await guard_cache.set(keys[i], result)
+
+    # Amortized per-item latency, so batch traffic doesn't skew avg_latency stats
+    latency = (time.time() - start_time) * 1000 / len(results)
+
+    # 1. Database Audit Log (queued; written in bulk by the audit writer)
+    await audit_writer.put([build_row(**_audit_entry(result, latency, key_id)) for result in results])
+
+    # 2. Webhook Notification (one summary alert per batch)
+    blocked = [result for result in results if not result.safe]
+    if blocked:
+        reasons = sorted({result.reason for result in blocked})
         background_tasks.add_task(
-            log_request,
-            model_name="guard-v2-composite",
-            is_safe=safe,
-            reason=stop_reason,
-            latency_ms=latency,
-            pii_detected=pii_entities,
-            api_key_id=key_id
+            notification_service.send_alert,
+            reason=f"BATCH: {len(blocked)}/{len(results)} prompts blocked",
+            score=max(result.score for result in blocked),
+            details=", ".join(reasons)
         )
 
-        # 2. Webhook Notification (Only on Block)
-        if not safe:
-            background_tasks.add_task(
-                notification_service.send_alert,
-                reason=stop_reason,
-                score=final_score,
-                details=f"PII: {pii_entities}" if pii_entities else None
-            )
-
-    # Track highest risk score
-    max_risk_score = 0.0
-
-    # 1. PII Redaction
-    if body.config.redact_pii:
-        sanitized_prompt, pii_entities = gliner_service.anonymize(body.prompt)
-    
-    # 2. Injection Detection
-    if body.config.detect_injection:
-        is_safe, reason, score = security_scanner.scan(sanitized_prompt)
-        max_risk_score = max(max_risk_score, score)
-        if not is_safe:
-            log_result(safe=False, stop_reason=reason, final_score=score)
-            return GuardResponse(safe=False, reason=reason, pii_detected=pii_entities, score=score)
-
-    # 3. Toxicity Detection (New)
-    if body.config.detect_toxicity:
-        is_toxic, tox_score, flags = toxicity_scanner.scan(sanitized_prompt)
-        max_risk_score = max(max_risk_score, tox_score)
-        if is_toxic:
-            reason = f"TOXIC_CONTENT: {', '.join(flags)}"
-            log_result(safe=False, stop_reason=reason, final_score=tox_score)
-            return GuardResponse(safe=False, reason=reason, pii_detected=pii_entities, score=tox_score, sanitized_prompt=sanitized_prompt)
-
-    # 4. Topic Blocking (Keyword Filter)
-    if body.config.block_topics:
-        prompt_lower = sanitized_prompt.lower()
-        for topic in body.config.block_topics:
-            if topic.lower() in prompt_lower:
-                reason = f"BLOCKED_TOPIC: {topic}"
-                log_result(safe=False, stop_reason=reason, final_score=1.0)
-                return GuardResponse(
-                    safe=False,
-                    sanitized_prompt=None,
-                    reason=reason,
-                    pii_detected=pii_entities,
-                    score=1.0
+    return GuardBatchResponse(results=results)
+
+@router.websocket("/stream")
+async def guard_stream(websocket: WebSocket):
+    """
+    Guard an LLM output token stream as it is generated.
+
+    Auth: `x-api-key` header (or `api_key` query parameter for browser clients).
+    Client -> server (JSON):
+        {"event": "start", "config": {...}}   optional, before the first token
+        {"token": "..."}                       repeated
+        {"event": "end"}
+    Server -> client (JSON):
+        {"event": "chunk", "text": "..."}      redacted text, safe to display
+        {"event": "block", "reason": "...", "score": 0.9}   stream stops here
+        {"event": "done", "safe": true, "score": 0.1, "pii_detected": [...]}
+        {"event": "error", "detail": "..."}    bad message or limit; stream stops here
+
+    Limits: STREAM_RATE_LIMIT streams per API key (close code 1013 beyond it),
+    STREAM_MAX_PENDING_CHARS per token and STREAM_MAX_TOTAL_CHARS per stream.
+    """
+    token = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+    api_key = await run_in_threadpool(lookup_api_key, token)
+    if not api_key:
+        await websocket.close(code=1008, reason="Invalid or missing API Key")
+        return
+    if not await run_in_threadpool(hit, settings.STREAM_RATE_LIMIT, "guard_stream", str(api_key.id)):
+        await websocket.close(code=1013, reason=f"Rate limit exceeded: {settings.STREAM_RATE_LIMIT}")
+        return
+
+    await websocket.accept()
+    start_time = time.time()
+    stream = StreamGuard()
+
+    async def inspect(final: bool = False):
+        inspection = await inference_executor.run(inspect_window, stream.window(), stream.config, api_key.id)
+        for event in stream.advance(inspection, final=final):
+            await websocket.send_json(event)
+
+    try:
+        while not stream.done:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                raise ValueError("Each message must be a JSON object")
+
+            if message.get("event") == "start" and not stream.window():
+                stream = StreamGuard(GuardConfig(**(message.get("config") or {})))
+            elif "token" in message:
+                if stream.push(str(message["token"])):
+                    await inspect()
+            elif message.get("event") == "end":
+                await inspect(final=True)
+    except WebSocketDisconnect:
+        return
+    except (ValidationError, ValueError) as e:
+        await websocket.send_json({"event": "error", "detail": str(e)})
+    except INFERENCE_ERRORS as e:
+        await websocket.send_json({"event": "error", "detail": _inference_failed(e).detail})
+    finally:
+        if stream.done:
+            entry = _audit_entry(stream.result, (time.time() - start_time) * 1000, api_key.id)
+            entry["model_name"] = "guard-v2-stream"
+            await audit_writer.put([build_row(**entry)])
+            if not stream.result.safe:
+                _schedule_alert(
+                    reason=f"STREAM: {entry['reason']}",
+                    score=stream.result.score,
+                    details=f"PII: {stream.result.pii_detected}" if stream.result.pii_detected else None
                 )
 
-    log_result(safe=True, stop_reason=None, final_score=max_risk_score)
-    return GuardResponse(
-        safe=is_safe,
-        sanitized_prompt=sanitized_prompt,
-        pii_detected=pii_entities,
-        reason=reason,
-        score=max_risk_score
-    )
+    await websocket.close()
+
+@router.get("/scheduler/stats")
+def read_scheduler_stats(api_key = Depends(get_api_key)):
+    """
+    Micro-batching statistics (queue depth, batch-size distribution) and
+    inference executor load.
+    """
+    return {
+        "enabled": settings.MICROBATCH_ENABLED,
+        **guard_scheduler.stats(),
+        "executor": inference_executor.stats()
+    }
+
+@router.get("/planner")
+async def read_planner_stats(api_key = Depends(get_api_key)):
+    """
+    Stage ordering: the order the planner would choose (globally and for this
+    API key) and the cost / block-rate measurements behind it, per inference
+    worker with the remote executor (see "scope").
+    """
+    key_id = api_key.id if hasattr(api_key, 'id') else None
+    return await _inference_stats(planner_stats, key_id)
+
+@router.get("/cache/stats")
+def read_cache_stats(api_key = Depends(get_api_key)):
+    """
+    Guard result cache statistics: hits per tier, misses, coalesced requests.
+    """
+    return {"enabled": settings.GUARD_CACHE_ENABLED, **guard_cache.stats()}
+
+@router.get("/models/stats")
+async def read_model_stats(api_key = Depends(get_api_key)):
+    """
+    Loaded models and their memory against MODEL_MEMORY_BUDGET_MB, with
+    load / eviction counts (this process, or per inference worker; see "scope").
+    """
+    return await _inference_stats(model_stats)
+
+@router.get("/toxicity/stats")
+async def read_toxicity_stats(api_key = Depends(get_api_key)):
+    """
+    Toxicity cascade counters: prompts decided by the first pass (safe or
+    toxic) and the fraction escalated to the toxicity model (this process,
+    or per inference worker; see "scope").
+    """
+    return await _inference_stats(toxicity_stats)
+
+@router.get("/rules")
+def read_injection_rules(api_key = Depends(get_api_key)):
+    """
+    Active injection rule set: version, backend and rule IDs.
+    """
+    return security_scanner.rule_engine.stats()
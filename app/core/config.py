@@ -1,3 +1,4 @@
+import os
 from typing import List, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings
@@ -8,9 +9,112 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     DATABASE_URL: str
     
+    # API key ids allowed to change shared state (e.g. exemplars); empty = nobody
+    ADMIN_API_KEY_IDS: list[int] = []
+
     # Monitoring
     SENTRY_DSN: str | None = None
     WEBHOOK_URL: str | None = None
+
+    # Inference
+    INFERENCE_BATCH_SIZE: int = 32   # Max texts per model forward pass
+    GUARD_BATCH_MAX_ITEMS: int = 1000  # Max prompts accepted by POST /guard/batch
+    CHUNK_OVERLAP_TOKENS: int = 32     # Overlap between windows of prompts longer than a model's limit
+    GLINER_WINDOW_WORDS: int = 256     # Words per GLiNER window (capped at the model's max_len)
+    # Bi-encoder models (e.g. knowledgator/gliner-bi-small-v1.0) encode labels separately; those encodings are cached per label set
+    GLINER_MODEL_NAME: str = "urchade/gliner_small-v2.1"
+    # PII detection: "neural" (GLiNER for every label), "hybrid" (validated patterns + GLiNER for
+    # person/organization/location when a pre-check hints at them) or "regex-only" (patterns only)
+    PII_MODE: str = "neural"
+    PII_SECRET_MIN_ENTROPY: float = 4.0  # Bits per char for an unprefixed token to count as a secret
+    GUARD_EXECUTION_MODE: str = "sequential"  # "sequential" or "concurrent" (parallel stages, early exit)
+    # Max characters each stage will scan; larger inputs are blocked (INPUT_TOO_LARGE)
+    GUARD_STAGE_MAX_CHARS: dict[str, int] = {
+        "pii": 1_000_000,
+        "injection_rules": 10_000_000,
+        "injection_semantic": 1_000_000,
+        "toxicity": 1_000_000,
+        "topics": 10_000_000,
+    }
+    INJECTION_RULES_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "injection_rules.json")
+    INJECTION_RULES_RELOAD_SECONDS: float = 5.0
+    # Semantic injection check: exemplar corpus (.json or .jsonl) and nearest-neighbour index
+    SEMANTIC_EXEMPLARS_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "injection_exemplars.json")
+    SEMANTIC_INDEX: str = "exact"  # "exact" (matmul over the corpus) or "ivf" (clustered, approximate)
+    SEMANTIC_IVF_LISTS: int = 0    # 0 = ~sqrt(corpus size)
+    SEMANTIC_IVF_PROBES: int = 8   # Lists scanned per query
+    SEMANTIC_EXEMPLARS_REDIS: bool = False  # Share runtime exemplar changes across workers/nodes via REDIS_URL
+    # Exemplar embeddings cached on disk and memory-mapped (shared by all workers on a node)
+    EMBEDDING_STORE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".cache", "embeddings")
+    EMBEDDING_STORE_DTYPE: str = "float32"  # "float32" or "float16" (half the disk and page cache)
+    GUARD_ADAPTIVE_ORDER: bool = False  # Order block stages by measured cost / block rate
+    GUARD_PLANNER_MIN_SAMPLES: int = 20  # Per-key measurements needed before they override global ones
+    INFERENCE_EXECUTOR: str = "thread"  # "thread", "process" or "remote" (workers of inference_server.py)
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_MAX_QUEUE: int = 64      # Jobs allowed to wait for a worker before rejecting (503)
+    INFERENCE_TORCH_THREADS: int = 0   # torch intra-op threads per worker (0 = torch default)
+    # Per-model backend: "torch" (fp32), "torch-int8" (dynamic quantization),
+    # "onnx" or "onnx-int8" (exported by scripts/export_onnx.py into ONNX_MODEL_DIR)
+    INFERENCE_BACKENDS: dict[str, str] = {
+        "semantic": "torch",
+        "toxicity": "torch",
+        "gliner": "torch",
+    }
+    # Remote inference (INFERENCE_EXECUTOR="remote"): API processes send jobs over Unix sockets
+    # to the inference_server.py workers, which alone hold the models
+    INFERENCE_SOCKET_DIR: str = "/tmp/guard-inference"
+    INFERENCE_SERVER_WORKERS: int = 2  # Worker processes started by inference_server.py
+    INFERENCE_REMOTE_TIMEOUT_SECONDS: float = 30.0
+    ONNX_MODEL_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".cache", "onnx")
+
+    # Startup: models loaded (and warmed up) in the background before GET /ready passes
+    MODEL_PRELOAD: list[str] = ["profanity", "semantic", "toxicity", "gliner"]
+    MODEL_LOAD_WORKERS: int = 3             # Models loaded in parallel
+    MODEL_WARMUP_RUNS: int = 1              # Warmup inferences per model after loading (0 = none)
+    MODEL_LOAD_TIMEOUT_SECONDS: float = 300.0  # A model not ready by then is reported as failed
+    # Loaded models beyond this are unloaded, idle longest first, and reloaded on next use (0 = no limit)
+    MODEL_MEMORY_BUDGET_MB: int = 0
+    MODEL_IDLE_UNLOAD_SECONDS: float = 0.0  # Unload a model unused for this long (0 = never)
+    # Under gunicorn (gunicorn.conf.py): load MODEL_PRELOAD in the master before forking, so all
+    # workers share one copy of the torch weights (copy-on-write). ONNX sessions still load per worker.
+    MODEL_PRELOAD_BEFORE_FORK: bool = True
+
+    # Profanity matcher: off = the same decisions as better_profanity. On also catches elongated
+    # words ("fuuuck") and spelled-out words ending the text ("say f-u-c-k"), at more false positives
+    PROFANITY_EXTENDED_MATCHING: bool = False
+
+    # Toxicity cascade: a cheap n-gram scorer (weights in TOXICITY_PREFILTER_PATH) decides clear
+    # cases; only prompts scoring in [SAFE_BELOW, TOXIC_ABOVE) go to the toxicity model
+    TOXICITY_CASCADE: bool = False
+    TOXICITY_CASCADE_SAFE_BELOW: float = 0.05   # First-pass score under this: safe without the model
+    TOXICITY_CASCADE_TOXIC_ABOVE: float = 0.99  # At or above this: toxic without the model
+    # "Safe" also needs positive evidence: at least this fraction of words in the safe vocabulary
+    TOXICITY_CASCADE_SAFE_COVERAGE: float = 0.9
+    TOXICITY_PREFILTER_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "toxicity_prefilter.json")
+
+    # Audit log writer: rows are queued and written in bulk, one multi-row INSERT per flush
+    AUDIT_BATCH_SIZE: int = 500           # Rows per flush, at most
+    AUDIT_FLUSH_INTERVAL_MS: float = 200.0  # Max time a row waits for its flush
+    AUDIT_MAX_QUEUE: int = 10000          # Rows buffered in memory before producers wait
+    AUDIT_ENQUEUE_TIMEOUT_MS: float = 100.0  # Max wait for room in a full queue before dropping rows
+
+    # Streaming guard (WebSocket /guard/stream)
+    STREAM_CHUNK_CHARS: int = 200   # New characters per scanned window
+    STREAM_OVERLAP_CHARS: int = 64  # Left context re-scanned and tail held back per window
+    STREAM_RATE_LIMIT: str = "30/minute"      # Streams opened per API key
+    STREAM_MAX_PENDING_CHARS: int = 8_000     # Unscanned text held at once (i.e. the largest single token)
+    STREAM_MAX_TOTAL_CHARS: int = 1_000_000   # Text accepted over a whole stream
+
+    # Guard result cache
+    GUARD_CACHE_ENABLED: bool = True
+    GUARD_CACHE_TTL_SECONDS: int = 300
+    GUARD_CACHE_MAX_ENTRIES: int = 10000
+    GUARD_CACHE_REDIS: bool = False  # Share results across workers/nodes via REDIS_URL
+
+    # Micro-batching of concurrent single-prompt requests
+    MICROBATCH_ENABLED: bool = True
+    MICROBATCH_MAX_SIZE: int = 32
+    MICROBATCH_MAX_WAIT_MS: float = 5.0
     
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
     # e.g: '["http://localhost", "http://localhost:4200", "http://localhost:3000"]'
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.core.config import settings
+from app.core.logging_config import logger
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor is at capacity and rejects new work."""
+
+def _init_worker(torch_threads: int):
+    """Cap torch intra-op threads so workers don't oversubscribe the CPUs."""
+    if torch_threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+class InferenceExecutor:
+    """
+    Bounded pool that runs blocking model calls off the event loop.
+
+    `kind` is "thread" (models shared in-process; torch releases the GIL during
+    forward passes) or "process" (each worker loads its own models). At most
+    `max_workers` jobs run at once and at most `max_queue` more may wait;
+    anything beyond that is rejected with InferenceQueueFull.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 2, max_queue: int = 64, torch_threads: int = 0):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.torch_threads = torch_threads
+
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._outstanding = 0
+
+        # Stats
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            logger.info(f"⚙️ Starting {self.kind} inference executor ({self.max_workers} workers, torch threads: {self.torch_threads or 'default'})")
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,)
+                )
+            else:
+                # Threads share one process, so the torch setting applies once
+                _init_worker(self.torch_threads)
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        return self._pool
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the pool and await its result."""
+        with self._lock:
+            if self._outstanding >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise InferenceQueueFull(f"Inference queue full ({self._outstanding} jobs outstanding)")
+            self._outstanding += 1
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        running = min(self._outstanding, self.max_workers)
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "torch_threads": self.torch_threads,
+            "running": running,
+            "queued": self._outstanding - running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+# Singleton
+if settings.INFERENCE_EXECUTOR == "remote":
+    from app.core.remote_executor import RemoteInferenceExecutor
+    inference_executor = RemoteInferenceExecutor(
+        settings.INFERENCE_SOCKET_DIR,
+        timeout=settings.INFERENCE_REMOTE_TIMEOUT_SECONDS
+    )
+else:
+    inference_executor = InferenceExecutor(
+        kind=settings.INFERENCE_EXECUTOR,
+        max_workers=settings.INFERENCE_WORKERS,
+        max_queue=settings.INFERENCE_MAX_QUEUE,
+        torch_threads=settings.INFERENCE_TORCH_THREADS
+    )
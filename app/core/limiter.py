@@ -1,3 +1,4 @@
+from limits import parse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import redis
@@ -15,3 +16,18 @@ def get_limiter():
         return Limiter(key_func=get_remote_address)
 
 limiter = get_limiter()
+
+def hit(limit: str, *identifiers) -> bool:
+    """
+    Count one hit against `limit` (e.g. "30/minute") for `identifiers`, where
+    the @limiter.limit decorator can't be used (WebSocket routes). Shares the
+    limiter's storage; fails open if that storage is unreachable.
+    Returns: False once the limit is exceeded.
+    """
+    if not limiter.enabled:
+        return True
+    try:
+        return limiter.limiter.hit(parse(limit), *identifiers)
+    except Exception as e:
+        logger.warning(f"⚠️ Rate limit storage unavailable, allowing request: {e}")
+        return True
@@ -0,0 +1,150 @@
+import asyncio
+import gc
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.logging_config import logger
+
+class ModelLoader:
+    """
+    Loads models in the background at startup so the app can serve /health
+    immediately while /ready stays failing until every preloaded model is
+    usable.
+
+    Each registered model has a `load` callable and an optional `warmup`
+    callable (a small inference, so the first real request doesn't pay for
+    lazy allocations). Up to `workers` models load in parallel threads; a
+    model that takes longer than `timeout` seconds is reported as failed.
+    Models load before the "process" inference executor starts its workers,
+    so forked workers inherit them.
+    """
+
+    def __init__(self, workers: int = 3, warmup_runs: int = 1, timeout: float = 300.0):
+        self.workers = workers
+        self.warmup_runs = warmup_runs
+        self.timeout = timeout
+
+        self._models: Dict[str, tuple] = {}  # name -> (load, warmup)
+        self._task: Optional[asyncio.Task] = None
+        self.status: Dict[str, dict] = {}   # name -> {"state", "seconds", "error"}
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None  # Time to readiness, once every model finished
+
+    def register(self, name: str, load: Callable, warmup: Optional[Callable] = None):
+        self._models[name] = (load, warmup)
+
+    async def start(self, names: List[str]):
+        """Start loading `names` (unknown names are ignored) without waiting for them."""
+        if self._task:
+            return
+        names = [name for name in names if name in self._models]
+        self.status = {name: {"state": "pending", "seconds": None, "error": None} for name in names}
+        self.started_at = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._load_all(names))
+
+    def preload(self, names: List[str]) -> bool:
+        """
+        Load and warm `names` now, blocking. Used by a pre-fork server's
+        master (gunicorn.conf.py) so forked workers share the weights.
+        Returns: whether every model is ready.
+        """
+        names = [name for name in names if name in self._models]
+        self.status = {name: {"state": "pending", "seconds": None, "error": None} for name in names}
+        self.started_at = time.monotonic()
+        asyncio.run(self._load_all(names))
+        return self.ready
+
+    async def wait(self):
+        if self._task:
+            await self._task
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self.started_at is not None and all(s["state"] == "ready" for s in self.status.values())
+
+    def state(self) -> dict:
+        elapsed = self.seconds if self.seconds is not None else (time.monotonic() - self.started_at if self.started_at else 0.0)
+        return {"ready": self.ready, "seconds": round(elapsed, 3), "models": self.status}
+
+    async def _load_all(self, names: List[str]):
+        pool = ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix="model-loader")
+        try:
+            await asyncio.gather(*(self._load(name, pool) for name in names))
+        finally:
+            # A timed-out load can't be interrupted; don't wait for it
+            pool.shutdown(wait=False)
+        self.seconds = time.monotonic() - self.started_at
+        if self.ready:
+            logger.info(f"✅ Models ready in {self.seconds:.2f}s ({', '.join(names) or 'none'})")
+        else:
+            failed = [name for name, s in self.status.items() if s["state"] != "ready"]
+            logger.error(f"❌ Models failed to load: {', '.join(failed)}")
+
+    async def _load(self, name: str, pool: ThreadPoolExecutor):
+        status = self.status[name]
+        status["state"] = "loading"
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(pool, self._load_and_warm, name), self.timeout)
+            status["state"] = "ready"
+        except asyncio.TimeoutError:
+            status["state"] = "failed"
+            status["error"] = f"not ready after {self.timeout:.0f}s"
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+        status["seconds"] = round(time.monotonic() - start, 3)
+
+    def _load_and_warm(self, name: str):
+        load, warmup = self._models[name]
+        load()
+        if warmup:
+            for _ in range(self.warmup_runs):
+                warmup()
+
+def preload_for_fork(loader: ModelLoader, names: List[str]) -> bool:
+    """
+    Load and warm `names` in a process that is about to fork workers, so
+    they share the weights copy-on-write (gunicorn master, inference server).
+    Returns: whether every model is ready.
+    """
+    # ONNX Runtime sessions own thread pools that don't survive fork; those load per worker
+    names = [name for name in names if not settings.INFERENCE_BACKENDS.get(name, "torch").startswith("onnx")]
+
+    # Fast tokenizers disable themselves in a child forked after they ran in parallel
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        import torch
+        # A single-threaded warmup never starts the OpenMP pool, which a forked child can't reuse
+        threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+    except ImportError:
+        torch = None
+    try:
+        ready = loader.preload(names)
+    finally:
+        if torch is not None:
+            torch.set_num_threads(threads)
+
+    # Move everything loaded so far out of the collector's reach: collections in the
+    # workers would otherwise write to (and so copy) the shared pages
+    gc.freeze()
+    logger.info(f"🧬 Preloaded {', '.join(names) or 'no models'} before fork ({loader.state()['seconds']:.1f}s)")
+    return ready
+
+# Singleton
+model_loader = ModelLoader(
+    workers=settings.MODEL_LOAD_WORKERS,
+    warmup_runs=settings.MODEL_WARMUP_RUNS,
+    timeout=settings.MODEL_LOAD_TIMEOUT_SECONDS
+)
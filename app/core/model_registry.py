@@ -0,0 +1,177 @@
+import ctypes
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+import psutil
+from app.core.config import settings
+from app.core.logging_config import logger
+
+def tensor_bytes(module) -> int:
+    """Bytes held by a torch module's parameters and buffers (shared tensors counted once)."""
+    seen = set()
+    total = 0
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        if tensor.data_ptr() not in seen:
+            seen.add(tensor.data_ptr())
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+def _rss() -> int:
+    return psutil.Process().memory_info().rss
+
+def _release_memory():
+    """Collect the dropped model and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+class _Entry:
+    def __init__(self, name: str, service):
+        self.name = name
+        self.service = service
+        self.lock = threading.Lock()  # Serializes this model's load / unload
+        self.bytes = 0               # Last measured size (kept after eviction, to make room before reloading)
+        self.in_use = 0
+        self.last_used = 0.0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.evictions = 0
+
+
+class ModelRegistry:
+    """
+    Owns the lifetime of the heavy models (GLiNER, MiniLM, toxicity RoBERTa,
+    Presidio/spaCy) under a total memory budget.
+
+    A registered service exposes `is_loaded`, `load_model()`,
+    `unload_model()` and `memory_bytes()` (None = unknown, in which case the
+    process RSS growth during the load is used). Services wrap every model
+    call in `with model_registry.use(self):`, which loads the model if needed
+    and marks it busy. When the loaded models exceed `budget_bytes`, the ones
+    idle longest are unloaded; a busy model is never unloaded. Models idle
+    for more than `idle_seconds` are unloaded too.
+
+    Instances that were never registered (e.g. a service built for a
+    script) just load on use, outside the budget.
+    """
+
+    def __init__(self, budget_mb: int = 0, idle_seconds: float = 0.0):
+        self.budget_bytes = budget_mb * 1024 * 1024  # 0 = unlimited
+        self.idle_seconds = idle_seconds              # 0 = never unload for idleness
+        self._entries: Dict[str, _Entry] = {}
+        self._by_service: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, service):
+        entry = _Entry(name, service)
+        self._entries[name] = entry
+        self._by_service[id(service)] = entry
+
+    @contextmanager
+    def use(self, service):
+        """Load `service`'s model if needed and keep it loaded for the duration of the block."""
+        entry = self._by_service.get(id(service))
+        if entry is None:
+            service.load_model()
+            yield
+            return
+
+        with self._lock:
+            entry.in_use += 1
+        try:
+            if not service.is_loaded:
+                self._load(entry)
+            yield
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+            # Loads that happened while everything was busy may have left us over budget
+            self._evict(0)
+            self._unload_idle()
+
+    def load(self, name: str):
+        """Load a registered model without using it (startup preload)."""
+        with self.use(self._entries[name].service):
+            pass
+
+    def _load(self, entry: _Entry):
+        with entry.lock:
+            if entry.service.is_loaded:
+                return
+            # Size known from an earlier load: make room first, so the peak stays under budget
+            if entry.bytes:
+                self._evict(entry.bytes, keep=entry)
+            rss = _rss()
+            start = time.monotonic()
+            entry.service.load_model()
+            entry.load_seconds = time.monotonic() - start
+            measured = entry.service.memory_bytes()
+            entry.bytes = measured if measured is not None else max(_rss() - rss, 0)
+            entry.loads += 1
+        self._evict(0, keep=entry)
+
+    def _evict(self, incoming: int, keep: Optional[_Entry] = None):
+        """Unload least recently used idle models until `incoming` more bytes fit the budget."""
+        if not self.budget_bytes:
+            return
+        with self._lock:
+            while self.total_bytes() + incoming > self.budget_bytes:
+                idle = [e for e in self._entries.values() if e is not keep and e.in_use == 0 and e.service.is_loaded]
+                if not idle:
+                    logger.warning(
+                        f"⚠️ Models over memory budget ({self.total_bytes() / 2**20:.0f} MB of "
+                        f"{self.budget_bytes / 2**20:.0f} MB) and none is idle"
+                    )
+                    break
+                self._unload(min(idle, key=lambda e: e.last_used), "memory budget")
+
+    def _unload_idle(self):
+        if not self.idle_seconds:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.in_use == 0 and entry.service.is_loaded and now - entry.last_used > self.idle_seconds:
+                    self._unload(entry, "idle")
+
+    def _unload(self, entry: _Entry, reason: str):
+        # Caller holds self._lock and has checked the model is not in use
+        with entry.lock:
+            entry.service.unload_model()
+            entry.evictions += 1
+        _release_memory()
+        logger.info(f"♻️ Unloaded {entry.name} model ({entry.bytes / 2**20:.0f} MB, {reason})")
+
+    def total_bytes(self) -> int:
+        return sum(e.bytes for e in self._entries.values() if e.service.is_loaded)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "budget_bytes": self.budget_bytes,
+            "loaded_bytes": self.total_bytes(),
+            "rss_bytes": _rss(),
+            "models": {
+                name: {
+                    "loaded": e.service.is_loaded,
+                    "bytes": e.bytes,
+                    "in_use": e.in_use,
+                    "idle_seconds": round(now - e.last_used, 1) if e.last_used else None,
+                    "load_seconds": round(e.load_seconds, 3),
+                    "loads": e.loads,
+                    "evictions": e.evictions,
+                }
+                for name, e in self._entries.items()
+            },
+        }
+
+# Singleton
+model_registry = ModelRegistry(
+    budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+    idle_seconds=settings.MODEL_IDLE_UNLOAD_SECONDS
+)
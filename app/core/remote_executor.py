@@ -0,0 +1,336 @@
+import asyncio
+import glob
+import itertools
+import os
+import pickle
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.core.executor import InferenceQueueFull
+from app.core.logging_config import logger
+
+# Every message is a 4-byte big-endian length followed by that many bytes of pickle
+HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+class RemoteInferenceError(Exception):
+    """A job raised on an inference worker. Carries "<type>: <message>" of the remote exception."""
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+    return pickle.loads(await reader.readexactly(size))
+
+def write_frame(writer: asyncio.StreamWriter, message: Any):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(HEADER.pack(len(payload)) + payload)
+
+def socket_path(socket_dir: str, index: int) -> str:
+    return os.path.join(socket_dir, f"worker-{index}.sock")
+
+
+class _WorkerConnection:
+    """
+    One client connection to an inference worker socket. Requests are
+    multiplexed by id; a reader task resolves each caller's future when
+    its reply arrives, in whatever order the worker finishes them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.load = 0             # Jobs outstanding on the worker, as of its last reply
+        self.down_until = 0.0     # Skipped by routing until then, after a connection error
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, seconds: float):
+        self.down_until = time.monotonic() + seconds
+        self.close()
+
+    async def request(self, message: dict, timeout: float) -> dict:
+        await self._connect()
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message["id"]] = future
+        try:
+            write_frame(self._writer, message)
+            await self._writer.drain()
+            reply = await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(message["id"], None)
+        self.down_until = 0.0
+        return reply
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            while True:
+                reply = await read_frame(self._reader)
+                self.load = reply.get("load", self.load)
+                future = self.pending.pop(reply["id"], None)
+                if future and not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            self._fail(ConnectionError(f"Inference worker {self.name} closed the connection"))
+
+    def _fail(self, error: Exception):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+        self._close_writer()
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    def close(self):
+        if self._read_task and not self._read_task.done():
+            self._read_task.cancel()
+        self._fail(ConnectionError(f"Connection to inference worker {self.name} closed"))
+
+
+class RemoteInferenceExecutor:
+    """
+    Sends inference jobs to the worker processes of inference_server.py over
+    Unix sockets, instead of running them in this process. API processes then
+    stay small (no model weights), and one pool of model-holding workers
+    serves all of them; the workers micro-batch across API processes.
+
+    Same interface as InferenceExecutor: `await run(fn, *args)` where `fn` is
+    a module-level function (sent by reference) and args/results pickle.
+    Each job goes to the least-loaded worker; a worker that reports itself
+    busy passes the job on to the next one, and InferenceQueueFull is raised
+    once every worker is busy or unreachable. A worker whose connection fails
+    is skipped for `retry_seconds` and the job is retried elsewhere.
+    """
+
+    kind = "remote"
+
+    def __init__(self, socket_dir: str, timeout: float = 30.0, retry_seconds: float = 1.0):
+        self.socket_dir = socket_dir
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: Dict[str, _WorkerConnection] = {}
+        self._ids = itertools.count()
+
+        # Stats
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def _connections(self) -> List[_WorkerConnection]:
+        """Worker sockets currently in `socket_dir` (connections are per event loop)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._workers = {}
+        paths = sorted(glob.glob(os.path.join(self.socket_dir, "worker-*.sock")))
+        for path in paths:
+            if path not in self._workers:
+                self._workers[path] = _WorkerConnection(path)
+        return [self._workers[path] for path in paths]
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on an inference worker and await its result."""
+        workers = sorted((w for w in self._connections() if w.healthy), key=lambda w: w.load + len(w.pending))
+        busy = 0
+        for worker in workers:
+            try:
+                reply = await worker.request({"id": next(self._ids), "op": "run", "fn": fn, "args": args}, self.timeout)
+            except asyncio.TimeoutError:
+                # The job may still be running there; don't pile a second copy onto another worker
+                self.failed += 1
+                raise
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"⚠️ Inference worker {worker.name} unreachable, retrying elsewhere: {e}")
+                worker.mark_down(self.retry_seconds)
+                self.retries += 1
+                continue
+            except Exception:
+                self.failed += 1
+                raise
+            if reply.get("busy"):
+                busy += 1
+                continue
+            if "error" in reply:
+                self.failed += 1
+                raise RemoteInferenceError(reply["error"])
+            self.completed += 1
+            return reply["result"]
+
+        self.rejected += 1
+        if not busy:
+            raise InferenceQueueFull(f"No inference workers reachable in {self.socket_dir}")
+        raise InferenceQueueFull(f"All {busy} reachable inference workers are busy")
+
+    async def _ask_all(self, message: dict) -> Dict[str, dict]:
+        """Send `message` to every worker. Returns: {socket: result, or {"ready": False, "error": ...}}"""
+        workers = {}
+        for worker in self._connections():
+            try:
+                reply = await worker.request({**message, "id": next(self._ids)}, min(self.timeout, 5.0))
+            except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                worker.mark_down(self.retry_seconds)
+                workers[worker.name] = {"ready": False, "error": str(e) or e.__class__.__name__}
+                continue
+            workers[worker.name] = {"error": reply["error"]} if "error" in reply else reply["result"]
+        return workers
+
+    async def health(self) -> dict:
+        """
+        Ask every worker for its model and load state.
+        Returns: {"ready": every worker reachable and ready, "workers": {socket: state}}
+        """
+        workers = await self._ask_all({"op": "health"})
+        return {"ready": bool(workers) and all(state.get("ready") for state in workers.values()), "workers": workers}
+
+    async def collect(self, fn: Callable, *args) -> dict:
+        """
+        Call fn(*args) on every worker, outside its inference queue; for
+        cheap reads of worker state (stats).
+        Returns: {"workers": {socket: result, or {"error": ...}}}
+        """
+        return {"workers": await self._ask_all({"op": "call", "fn": fn, "args": args})}
+
+    def shutdown(self):
+        for worker in self._workers.values():
+            worker.close()
+        self._workers = {}
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "socket_dir": self.socket_dir,
+            "workers": {
+                worker.name: {"healthy": worker.healthy, "load": worker.load, "in_flight": len(worker.pending)}
+                for worker in self._workers.values()
+            },
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retries": self.retries,
+        }
+
+
+class InferenceWorkerServer:
+    """
+    The worker side: serves RemoteInferenceExecutor clients on one Unix socket
+    (owner-only permissions; messages are pickles, so anyone able to connect
+    can run code as the worker). "run" jobs go to `executor`, except
+    functions listed in `batchers`, whose items are split and submitted one
+    by one to that MicroBatchScheduler so jobs from different API processes
+    share forward passes. Beyond `max_outstanding` jobs the worker replies
+    "busy" and the client tries another worker. "call" runs a function
+    directly on the worker's event loop, for cheap reads of its state.
+    """
+
+    def __init__(self, path: str, executor, batchers: Optional[Dict[Callable, Any]] = None, max_outstanding: int = 64, health: Optional[Callable[[], dict]] = None):
+        self.path = path
+        self.executor = executor
+        self.batchers = batchers or {}
+        self.max_outstanding = max_outstanding
+        self.health = health or (lambda: {"ready": True})
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._outstanding = 0
+
+        # Stats
+        self.completed = 0
+        self.failed = 0
+        self.busy = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a worker that died
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, 0o600)
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while True:
+                message = await read_frame(reader)
+                task = asyncio.get_running_loop().create_task(self._handle(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _handle(self, message: dict, writer: asyncio.StreamWriter):
+        reply = {"id": message["id"]}
+        if message["op"] == "health":
+            reply["result"] = {**self.health(), "server": self.stats()}
+        elif message["op"] == "call":
+            try:
+                reply["result"] = message["fn"](*message["args"])
+            except Exception as e:
+                reply["error"] = f"{e.__class__.__name__}: {e}"
+        elif self._outstanding >= self.max_outstanding:
+            self.busy += 1
+            reply["busy"] = True
+        else:
+            self._outstanding += 1
+            try:
+                reply["result"] = await self._run(message["fn"], message["args"])
+                self.completed += 1
+            except InferenceQueueFull:
+                self.busy += 1
+                reply["busy"] = True
+            except Exception as e:
+                self.failed += 1
+                reply["error"] = f"{e.__class__.__name__}: {e}"
+            finally:
+                self._outstanding -= 1
+
+        reply["load"] = self._outstanding
+        try:
+            write_frame(writer, reply)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass  # Client went away; nothing to deliver
+
+    async def _run(self, fn: Callable, args: tuple) -> Any:
+        batcher = self.batchers.get(fn)
+        if batcher is not None:
+            (items,) = args
+            return list(await asyncio.gather(*(batcher.submit(item) for item in items)))
+        return await self.executor.run(fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "outstanding": self._outstanding,
+            "max_outstanding": self.max_outstanding,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy": self.busy,
+        }
@@ -8,24 +8,44 @@ from app.core.logging_config import logger
 
 api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
 
-def get_api_key(api_key_token: str = Security(api_key_header)):
-    """
-    Validate API Key against Database.
-    Allows 'sk_local_dev_12345' as a fallback master key if configured.
-    """
-    # 1. Check Database
+def lookup_api_key(api_key_token: str):
+    """Return the active ApiKey record for a token, or None."""
+    if not api_key_token:
+        return None
     db = SessionLocal()
     try:
-        key_record = db.query(ApiKey).filter(ApiKey.key == api_key_token, ApiKey.is_active == True).first()
-        if key_record:
-            return key_record
+        return db.query(ApiKey).filter(ApiKey.key == api_key_token, ApiKey.is_active == True).first()
     except Exception as e:
         logger.error(f"⚠️ Key validation error: {e}")
+        return None
     finally:
         db.close()
 
+def get_api_key(api_key_token: str = Security(api_key_header)):
+    """
+    Validate API Key against Database.
+    Allows 'sk_local_dev_12345' as a fallback master key if configured.
+    """
+    # 1. Check Database
+    key_record = lookup_api_key(api_key_token)
+    if key_record:
+        return key_record
+
     # 3. Fail
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
         detail="Invalid or missing API Key"
     )
+
+def get_admin_api_key(api_key = Depends(get_api_key)):
+    """
+    Valid API key that may change state shared by every tenant. Only keys
+    listed in ADMIN_API_KEY_IDS qualify; with the list empty, none do
+    (any registered user holds an active key).
+    """
+    if getattr(api_key, 'id', None) not in settings.ADMIN_API_KEY_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API Key not allowed to perform this action"
+        )
+    return api_key
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Boolean, Float, Text
-from app.core.database import Base, engine
+from app.core.database import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -12,6 +12,3 @@ class AuditLog(Base):
     latency_ms = Column(Float)
     pii_detected = Column(Text, nullable=True)  # Stored as comma-separated string
     api_key_id = Column(Integer, index=True, nullable=True)  # Link to the user who made the request
-
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
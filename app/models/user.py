@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from app.core.database import Base, engine
+from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -25,6 +25,3 @@ class ApiKey(Base):
     is_active = Column(Boolean, default=True)
 
     owner = relationship("User", back_populates="api_keys")
-
-# Create tables
-Base.metadata.create_all(bind=engine)
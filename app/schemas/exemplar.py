@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class Exemplar(BaseModel):
+    id: str
+    text: str
+
+class ExemplarCreate(BaseModel):
+    id: Optional[str] = Field(None, min_length=1, max_length=128)  # Generated when omitted; an existing id is replaced
+    text: str = Field(..., min_length=1)
+
+class ExemplarCreateRequest(BaseModel):
+    items: List[ExemplarCreate] = Field(..., min_length=1)
+
+class ExemplarRemoveRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+
+class ExemplarChangeResponse(BaseModel):
+    ids: List[str]
+    version: int
+
+class ExemplarListResponse(BaseModel):
+    total: int
+    items: List[Exemplar]
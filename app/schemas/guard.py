@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class GuardConfig(BaseModel):
+    detect_injection: bool = True
+    redact_pii: bool = True
+    detect_toxicity: bool = False
+    block_topics: Optional[List[str]] = None
+    topic_whole_words: bool = False     # Only match topics at word boundaries
+    topic_case_sensitive: bool = False
+    profanity_words: Optional[List[str]] = None  # Tenant words added to the default profanity list
+    # PII labels to detect (default: all). Labels without a pattern detector go to GLiNER (zero-shot)
+    pii_labels: Optional[List[str]] = Field(default=None, max_length=32)
+
+class GuardRequest(BaseModel):
+    prompt: str
+    config: Optional[GuardConfig] = Field(default_factory=GuardConfig)
+
+class GuardResponse(BaseModel):
+    safe: bool
+    score: float = 0.0
+    sanitized_prompt: Optional[str] = None
+    reason: Optional[str] = None
+    pii_detected: Optional[List[str]] = []
+
+class GuardBatchRequest(BaseModel):
+    items: List[GuardRequest] = Field(..., min_length=1)
+
+class GuardBatchResponse(BaseModel):
+    results: List[GuardResponse]
@@ -1,35 +1,266 @@
+import asyncio
 import datetime
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.models.audit_log import AuditLog
 from app.core.logging_config import logger
 
-def log_request(model_name: str, is_safe: bool, reason: str = None, latency_ms: float = 0, pii_detected: list = None, api_key_id: int = None):
-    """
-    Log request details to PostgreSQL (Neon DB).
-    """
+def build_row(model_name: str, is_safe: bool, reason: str = None, latency_ms: float = 0, pii_detected: list = None, api_key_id: int = None):
+    """Map log_request arguments onto AuditLog column values (timestamped now, not at flush)."""
+    return {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "model": model_name,
+        "is_safe": is_safe,
+        "reason": reason,
+        "latency_ms": latency_ms,
+        # Convert PII list to string for storage
+        "pii_detected": ",".join(pii_detected) if pii_detected else "",
+        "api_key_id": api_key_id
+    }
+
+def _insert_rows(rows: List[dict]):
+    """Write rows in one multi-row INSERT and one commit. Raises on failure."""
     db: Session = SessionLocal()
     try:
-        # Convert PII list to string for storage
-        pii_str = ",".join(pii_detected) if pii_detected else ""
-        
-        log_entry = AuditLog(
-            timestamp=datetime.datetime.now().isoformat(),
-            model=model_name,
-            is_safe=is_safe,
-            reason=reason,
-            latency_ms=latency_ms,
-            pii_detected=pii_str,
-            api_key_id=api_key_id
-        )
-        db.add(log_entry)
+        db.execute(insert(AuditLog), rows)
         db.commit()
-    except Exception as e:
-        logger.error(f"⚠️ Failed to write audit log: {e}")
+    except Exception:
         db.rollback()
+        raise
     finally:
         db.close()
 
+# Tells the writer thread to stop once everything queued before it is written
+_STOP = object()
+
+class AuditWriter:
+    """
+    Buffers audit rows in memory and writes them in bulk from one background
+    thread: one multi-row INSERT and commit per flush, once `batch_size` rows
+    are queued or `flush_interval_ms` after the first one. Flushes run one
+    at a time, so audit logging holds at most one pooled connection.
+
+    At most `max_queue` rows wait. When the queue is full, producers wait up
+    to `enqueue_timeout_ms` for room and the rest of their rows are dropped
+    (and counted), so a slow database slows requests down only so much.
+    A failed flush is retried once, then written row by row so one bad row
+    doesn't lose the others; only rows that still fail count as failed.
+    close() writes everything still queued before the thread stops; the
+    next enqueue starts it again.
+    """
+
+    def __init__(self, write_rows: Callable[[List[dict]], None] = None, batch_size: int = 500, flush_interval_ms: float = 200.0, max_queue: int = 10000, enqueue_timeout_ms: float = 100.0):
+        # Looked up at flush time by default, so a patched SessionLocal (tests) is used
+        self.write_rows = write_rows or (lambda rows: _insert_rows(rows))
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.max_queue = max_queue
+        self.enqueue_timeout_ms = enqueue_timeout_ms
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # Producers count from the event loop and from threads
+
+        # Stats
+        self.queued = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.row_fallbacks = 0
+        self.largest_flush = 0
+        self.last_flush_size = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, rows: List[dict]) -> int:
+        """
+        Queue rows, waiting up to enqueue_timeout_ms in total for room.
+        Returns: the number of rows accepted (the rest are dropped).
+        """
+        self._ensure_thread()
+        deadline = time.monotonic() + self.enqueue_timeout_ms / 1000
+        accepted = 0
+        for row in rows:
+            try:
+                self._queue.put(row, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break
+            accepted += 1
+        return self._count(rows, accepted)
+
+    async def put(self, rows: List[dict]) -> int:
+        """
+        enqueue() for the event loop: only waits (in a thread) when the queue is full.
+        Returns: the number of rows accepted.
+        """
+        self._ensure_thread()
+        accepted = 0
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # Count the rows already queued; enqueue() counts the rest
+                self._count(rows[:accepted], accepted)
+                return accepted + await asyncio.to_thread(self.enqueue, rows[accepted:])
+            accepted += 1
+        return self._count(rows, accepted)
+
+    def _count(self, rows: List[dict], accepted: int) -> int:
+        with self._stats_lock:
+            self.queued += accepted
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+            if accepted < len(rows):
+                self.dropped += len(rows) - accepted
+        if accepted < len(rows):
+            logger.warning(f"⚠️ Audit queue full ({self.max_queue} rows): dropped {len(rows) - accepted} audit logs")
+        return accepted
+
+    def _run(self):
+        stop = False
+        while not stop:
+            row = self._queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, still take whatever is already queued
+                    row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            self._flush(batch)
+
+    def _flush(self, rows: List[dict]):
+        start = time.perf_counter()
+        written = self._write(rows)
+        self.written += written
+        if written < len(rows):
+            self.failed += len(rows) - written
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.last_flush_size = len(rows)
+        self.largest_flush = max(self.largest_flush, len(rows))
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+    def _write(self, rows: List[dict]) -> int:
+        """
+        The batch; once more after a flush interval if that fails (transient
+        errors); then row by row, giving up after 3 failures in a row.
+        Returns: the number of rows written.
+        """
+        for attempt in range(2):
+            try:
+                self.write_rows(rows)
+                return len(rows)
+            except Exception as e:
+                error = e
+            if attempt == 0:
+                self.retries += 1
+                logger.warning(f"⚠️ Failed to write {len(rows)} audit logs, retrying: {error}")
+                time.sleep(self.flush_interval_ms / 1000)
+        if len(rows) == 1:
+            logger.error(f"⚠️ Failed to write 1 audit log: {error}")
+            return 0
+
+        self.row_fallbacks += 1
+        written = failures_in_a_row = 0
+        for row in rows:
+            try:
+                self.write_rows([row])
+                written += 1
+                failures_in_a_row = 0
+            except Exception as e:
+                error = e
+                failures_in_a_row += 1
+                if failures_in_a_row == 3:
+                    break  # The database, not a row, is the problem
+        if written < len(rows):
+            logger.error(f"⚠️ Failed to write {len(rows) - written} of {len(rows)} audit logs: {error}")
+        return written
+
+    def close(self, timeout: float = 10.0):
+        """Write everything queued so far, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error(f"⚠️ Audit writer did not drain within {timeout:.0f}s")
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error(f"⚠️ Audit writer did not drain within {timeout:.0f}s")
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval_ms,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "row_fallbacks": self.row_fallbacks,
+            "flushes": self.flushes,
+            "avg_flush_size": round(self.written / self.flushes, 2) if self.flushes else 0,
+            "last_flush_size": self.last_flush_size,
+            "largest_flush": self.largest_flush,
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+# Singleton
+audit_writer = AuditWriter(
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+    max_queue=settings.AUDIT_MAX_QUEUE,
+    enqueue_timeout_ms=settings.AUDIT_ENQUEUE_TIMEOUT_MS
+)
+
+def log_request(model_name: str, is_safe: bool, reason: str = None, latency_ms: float = 0, pii_detected: list = None, api_key_id: int = None):
+    """
+    Log request details to PostgreSQL (Neon DB). Queued and written in bulk
+    by audit_writer; async callers should `await audit_writer.put(...)`.
+    """
+    audit_writer.enqueue([build_row(model_name, is_safe, reason, latency_ms, pii_detected, api_key_id)])
+
+def log_requests(entries: list):
+    """
+    Bulk variant of log_request. Each entry is a dict of log_request keyword arguments.
+    """
+    if entries:
+        audit_writer.enqueue([build_row(**entry) for entry in entries])
+
 from sqlalchemy import func
 
 def get_recent_logs(db: Session, limit: int = 50, offset: int = 0, api_key_id: int = None):
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from typing import Any, Callable, List, Optional
+from app.core.executor import InferenceQueueFull
+from app.core.logging_config import logger
+
+class MicroBatchScheduler:
+    """
+    Dynamic micro-batching for concurrent single-item requests.
+
+    Callers `await submit(...)`; the scheduler collects items until either
+    `max_batch_size` items are queued or `max_wait_ms` has passed since the
+    first one arrived, runs `run_batch` once on the whole group (off the event
+    loop, on `executor` if given), and resolves each caller's future with its
+    own result.
+
+    Up to `max_in_flight` batches run at once (default: the executor's
+    worker count), so every executor worker gets work; while all slots are
+    busy, new items keep queueing and form the next, larger batch.
+
+    At most `max_pending` items wait (default: the executor's `max_queue`
+    batches' worth; 0 = no limit); beyond that submit() raises
+    InferenceQueueFull. The executor only ever sees `max_in_flight` jobs,
+    so its own queue limit can't reject the overflow.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 32, max_wait_ms: float = 5.0, executor=None, max_in_flight: Optional[int] = None, max_pending: Optional[int] = None):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_in_flight = max(max_in_flight or getattr(executor, "max_workers", 1), 1)
+        self.max_pending = getattr(executor, "max_queue", 0) * max_batch_size if max_pending is None else max_pending
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: List[tuple] = []
+        self._has_items: Optional[asyncio.Event] = None
+        self._is_full: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.max_queue_depth = 0
+        self.rejected = 0
+        self.batch_size_histogram = {}
+        self.total_batch_ms = 0.0
+
+    def _ensure_worker(self):
+        """Start the dispatcher on the running loop (restarted if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker and not self._worker.done():
+            return
+        self._loop = loop
+        self._pending = []
+        self._has_items = asyncio.Event()
+        self._is_full = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._running = set()
+        self._worker = loop.create_task(self._dispatch_loop())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        self._ensure_worker()
+        if self.max_pending and len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            raise InferenceQueueFull(f"Micro-batch queue full ({len(self._pending)} items waiting)")
+        future = self._loop.create_future()
+        self._pending.append((item, future))
+
+        depth = len(self._pending)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._has_items.set()
+        if depth >= self.max_batch_size:
+            self._is_full.set()
+
+        return await future
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._has_items.wait()
+            # Wait for a free slot; items arriving meanwhile join this batch
+            await self._slots.acquire()
+
+            # Give concurrent callers a short window to join the batch
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._is_full.wait(), timeout=self.max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._is_full.clear()
+
+            # Callers that went away (client disconnect) don't need a slot
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = self._loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._slots.release()
+
+    async def _run(self, batch: List[tuple]):
+        start = time.time()
+        try:
+            items = [item for item, _ in batch]
+            if self.executor:
+                results = await self.executor.run(self.run_batch, items)
+            else:
+                results = await self._loop.run_in_executor(None, self.run_batch, items)
+        except Exception as e:
+            logger.error(f"❌ Micro-batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        size = len(batch)
+        self.batches += 1
+        self.items += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+        self.total_batch_ms += (time.time() - start) * 1000
+
+    async def close(self):
+        """Stop the dispatcher and fail anything still queued."""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+        for _, future in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Scheduler shut down"))
+        self._pending = []
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": len(self._running),
+            "queue_depth": len(self._pending),
+            "max_pending": self.max_pending,
+            "max_queue_depth": self.max_queue_depth,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "avg_batch_ms": round(self.total_batch_ms / self.batches, 2) if self.batches else 0,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+        }
@@ -0,0 +1,124 @@
+import re
+from typing import List, Optional, Tuple
+
+# Fallback "tokens" when no fast tokenizer is available (and GLiNER's own unit)
+WORD_PATTERN = re.compile(r"\S+")
+
+def word_offsets(text: str) -> List[Tuple[int, int]]:
+    return [(m.start(), m.end()) for m in WORD_PATTERN.finditer(text)]
+
+def tokenize_batch(texts: List[str], tokenizer=None) -> Tuple[List[List[Tuple[int, int, int]]], Optional[List[List[int]]]]:
+    """
+    One call to a fast HuggingFace tokenizer when given, else whitespace-separated words.
+    Returns: (per text [(token position, start char, end char), ...], per text token ids or None)
+    """
+    if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+        return [[(i, s, e) for i, (s, e) in enumerate(word_offsets(text))] for text in texts], None
+
+    encoded = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    # Drop zero-width entries some tokenizers emit (their ids stay in place)
+    offsets = [[(i, s, e) for i, (s, e) in enumerate(row) if e > s] for row in encoded["offset_mapping"]]
+    return offsets, encoded["input_ids"]
+
+def window_ranges(count: int, max_tokens: int, overlap: int) -> List[Tuple[int, int]]:
+    """(first, last) token indices of overlapping windows of at most `max_tokens` tokens."""
+    if count <= max_tokens:
+        return [(0, count - 1)]
+
+    step = max(max_tokens - overlap, 1)
+    ranges = []
+    for first in range(0, count, step):
+        last = min(first + max_tokens, count) - 1
+        ranges.append((first, last))
+        if last == count - 1:
+            break
+    return ranges
+
+def window_spans(text: str, offsets: List[Tuple[int, int]], max_tokens: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Character spans of overlapping windows of at most `max_tokens` tokens.
+    Short texts come back as a single window covering the whole text.
+    """
+    if len(offsets) <= max_tokens:
+        return [(0, len(text))]
+    return [(offsets[first][0], offsets[last][1]) for first, last in window_ranges(len(offsets), max_tokens, overlap)]
+
+class Windows:
+    """
+    Flattened windows for a batch of texts: `texts[i]` is a window of input
+    `owners[i]`, starting at character `starts[i]` of that input and
+    `lengths[i]` tokens long. With a fast tokenizer, `token_ids[i]` are the
+    window's ids (no special tokens), so models can run on them without
+    tokenizing again; otherwise `token_ids` is None.
+    """
+
+    def __init__(self, tokenized: bool = False):
+        self.texts: List[str] = []
+        self.owners: List[int] = []
+        self.starts: List[int] = []
+        self.lengths: List[int] = []
+        self.token_ids: Optional[List[List[int]]] = [] if tokenized else None
+
+    def add(self, owner: int, start: int, text: str, length: int = 0, token_ids: Optional[List[int]] = None):
+        self.owners.append(owner)
+        self.starts.append(start)
+        self.texts.append(text)
+        self.lengths.append(length)
+        if self.token_ids is not None:
+            self.token_ids.append(token_ids)
+
+def split_batch(texts: List[str], max_tokens: int, overlap: int, tokenizer=None) -> Windows:
+    """
+    Split every text into token-aware overlapping windows, ready for one
+    batched call. Texts are tokenized once; the ids are kept per window.
+    """
+    offsets, ids = tokenize_batch(texts, tokenizer)
+    windows = Windows(tokenized=ids is not None)
+
+    def add(owner: int, start: int, end: int, length: int, id_range: Tuple[int, int]):
+        if ids is None:
+            windows.add(owner, start, texts[owner][start:end], length)
+        else:
+            # Zero-width tokens are kept, but never past the model's window
+            window_ids = ids[owner][id_range[0]:id_range[1]][:max_tokens]
+            windows.add(owner, start, texts[owner][start:end], len(window_ids), window_ids)
+
+    for owner, text in enumerate(texts):
+        tokens = offsets[owner]
+        if len(tokens) <= max_tokens:
+            add(owner, 0, len(text), len(tokens), (0, len(ids[owner]) if ids is not None else 0))
+            continue
+        for first, last in window_ranges(len(tokens), max_tokens, overlap):
+            (id_first, start, _), (id_last, _, end) = tokens[first], tokens[last]
+            add(owner, start, end, last - first + 1, (id_first, id_last + 1))
+    return windows
+
+def length_order(lengths: List[int]) -> List[int]:
+    """Indices sorted by length (stable), so neighbours pad to similar lengths."""
+    return sorted(range(len(lengths)), key=lengths.__getitem__)
+
+def length_buckets(lengths: List[int], batch_size: int) -> List[List[int]]:
+    """
+    Batches of indices with similar lengths: one long input only pads the
+    few inputs next to it in length order, not its whole arrival batch.
+    """
+    order = length_order(lengths)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def in_order(order: List[int], results: list) -> list:
+    """Undo length_order: results[k] belongs to input order[k]."""
+    restored = [None] * len(order)
+    for i, result in zip(order, results):
+        restored[i] = result
+    return restored
+
+def merge_entities(entities: List[dict]) -> List[dict]:
+    """
+    Drop duplicate spans found by overlapping windows: when two spans
+    overlap, the higher-scoring one wins.
+    """
+    kept = []
+    for entity in sorted(entities, key=lambda e: e['score'], reverse=True):
+        if all(entity['end'] <= k['start'] or entity['start'] >= k['end'] for k in kept):
+            kept.append(entity)
+    return sorted(kept, key=lambda e: e['start'])
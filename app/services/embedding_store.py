@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.logging_config import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock
+    fcntl = None
+
+def corpus_hash(model_name: str, exemplars: Dict[str, str]) -> str:
+    """Digest of the model name and the (id, text) pairs, in order."""
+    # One C-level dump of the whole corpus; per-item dumps dominate warm starts
+    payload = json.dumps([model_name, list(exemplars.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk cache of exemplar embeddings: one flat .npy matrix (normalized
+    rows, float32 or float16) plus a .json metadata file, named after the
+    model and the corpus hash.
+
+    Matrices are opened with mmap, so every worker process on a node shares
+    the same page-cache pages instead of holding its own copy, and startup
+    no longer re-encodes the corpus. A file lock makes concurrent cold starts
+    build the matrix once; the others wait and then map it.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+
+    def _slug(self, model_name: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+    def _base(self, model_name: str, digest: str) -> str:
+        return os.path.join(self.directory, f"{self._slug(model_name)}-{digest[:16]}")
+
+    def load(self, model_name: str, exemplars: Dict[str, str]) -> Optional[Tuple[List[str], np.ndarray]]:
+        """(ids, memory-mapped matrix) if a matching store exists, else None."""
+        digest = corpus_hash(model_name, exemplars)
+        base = self._base(model_name, digest)
+        try:
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["corpus_hash"] != digest or meta["dtype"] != self.dtype.name:
+                return None
+            vectors = np.load(base + ".npy", mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta["ids"], vectors
+
+    def save(self, model_name: str, exemplars: Dict[str, str], vectors: np.ndarray):
+        """Write the matrix and metadata atomically, then drop stale stores of this model."""
+        digest = corpus_hash(model_name, exemplars)
+        base = self._base(model_name, digest)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Matrix first: a metadata file only ever points at a complete matrix
+        tmp = f"{base}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(vectors, dtype=self.dtype))
+        os.replace(tmp, base + ".npy")
+
+        meta = {
+            "model": model_name,
+            "corpus_hash": digest,
+            "dtype": self.dtype.name,
+            "count": len(exemplars),
+            "dim": int(vectors.shape[1]),
+            "created_at": time.time(),
+            "ids": list(exemplars),
+        }
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, base + ".json")
+
+        # Older corpora of the same model (workers still mapping them keep their pages)
+        stale = re.compile(rf"{re.escape(self._slug(model_name))}-[0-9a-f]{{16}}\.(npy|json)$")
+        for name in os.listdir(self.directory):
+            if stale.match(name) and not name.startswith(os.path.basename(base)):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def get_or_build(self, model_name: str, exemplars: Dict[str, str], encode: Callable[[List[str]], np.ndarray]) -> Tuple[List[str], np.ndarray]:
+        """
+        Load the stored matrix for this corpus, or encode it (once per node)
+        and store it. Falls back to an in-memory matrix if the directory is
+        not writable.
+        Returns: (ids, matrix)
+        """
+        stored = self.load(model_name, exemplars)
+        if stored:
+            return stored
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            lock = open(os.path.join(self.directory, ".lock"), "w")
+        except OSError as e:
+            logger.warning(f"⚠️ Embedding store unavailable ({e}); encoding in memory.")
+            return list(exemplars), encode(list(exemplars.values()))
+
+        with lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have built it while we waited
+            stored = self.load(model_name, exemplars)
+            if stored:
+                return stored
+
+            start = time.time()
+            vectors = encode(list(exemplars.values()))
+            try:
+                self.save(model_name, exemplars, vectors)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write embedding store: {e}")
+                return list(exemplars), vectors
+            logger.info(f"💾 Encoded {len(exemplars)} exemplars in {time.time() - start:.1f}s, stored in {self.directory}")
+
+        return self.load(model_name, exemplars) or (list(exemplars), vectors)
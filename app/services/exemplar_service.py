@@ -0,0 +1,242 @@
+import asyncio
+import json
+import uuid
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.services.guard_cache import guard_cache
+from app.services.semantic_service import semantic_scanner
+
+ADDED_KEY = "guard:exemplars:added"      # hash: id -> text, exemplars added at runtime
+REMOVED_KEY = "guard:exemplars:removed"  # set: ids removed at runtime (file or runtime exemplars)
+VERSION_KEY = "guard:exemplars:version"  # counter, bumped on every change
+CHANNEL = "guard:exemplars:events"
+
+class ExemplarChangesUnsupported(Exception):
+    """Raised when a change could not reach the processes that run the semantic check."""
+
+class ExemplarSyncFailed(Exception):
+    """Raised when a change could not be shared through Redis and nothing here applies it."""
+
+class ExemplarRegistry:
+    """
+    Runtime changes to the semantic-injection exemplar corpus, on top of the
+    exemplars file. Changes are applied incrementally to SemanticScanner
+    (adding N exemplars costs N encodings) and shared through Redis: the
+    overlay lives in ADDED_KEY / REMOVED_KEY so workers started later replay
+    it, and every change is published on CHANNEL so running workers on any
+    node apply it within milliseconds.
+
+    Each change also invalidates the guard result cache, since cached
+    verdicts were computed against the previous corpus.
+
+    Without Redis, changes only affect this worker. When the semantic check
+    runs elsewhere (`detects_locally` False: "process" or "remote" inference
+    executor), this process never loads the encoder: changes only update the
+    listed texts and go out through Redis, which the inference_server.py
+    workers follow. Process-pool workers follow nothing, so with the
+    "process" executor, or "remote" without Redis, changes are refused.
+    """
+
+    def __init__(self, scanner, redis_url: Optional[str] = None, executor_kind: str = "thread"):
+        self.scanner = scanner
+        self.redis_url = redis_url
+        self.executor_kind = executor_kind
+        # Whether the semantic check runs in this process (inference_server.py workers set it)
+        self.detects_locally = executor_kind == "thread"
+        self.origin = uuid.uuid4().hex  # Our own events come back on the channel; skip them
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self.version = 0
+
+        # Stats
+        self.local_changes = 0
+        self.remote_changes = 0
+        self.redis_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.scanner is not None
+
+    async def start(self):
+        """Connect to Redis, replay the shared overlay and follow changes from other workers."""
+        if not self.enabled or not self.redis_url or self._listener:
+            return
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Exemplar sync disabled: {e}")
+            return
+        self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
+
+    # --- Public API ---
+
+    def list(self, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict[str, str]]]:
+        """Returns: (total, [{"id", "text"}, ...]) in corpus order."""
+        exemplars = list(self.scanner.exemplars.items())
+        return len(exemplars), [{"id": i, "text": text} for i, text in exemplars[offset:offset + limit]]
+
+    def check_writable(self):
+        """Raise ExemplarChangesUnsupported if a change here would not reach the semantic check."""
+        if self.detects_locally:
+            return
+        if self.executor_kind == "process":
+            raise ExemplarChangesUnsupported("Exemplar changes are not supported with INFERENCE_EXECUTOR=process: pool workers keep the corpus they started with")
+        if not self._redis:
+            raise ExemplarChangesUnsupported("Exemplar changes need SEMANTIC_EXEMPLARS_REDIS: the inference workers only follow changes through Redis")
+
+    async def add(self, items: List[Tuple[Optional[str], str]]) -> List[str]:
+        """
+        Add (or replace) exemplars; items without an id get a generated one.
+        Returns: the ids that were (re)indexed.
+        """
+        self.check_writable()
+        exemplars = {exemplar_id or f"RT-{uuid.uuid4().hex[:12]}": text for exemplar_id, text in items}
+        if self.detects_locally:
+            added = await asyncio.to_thread(self.scanner.add_exemplars, exemplars)
+        else:
+            added = [i for i, text in exemplars.items() if self.scanner.exemplars.get(i) != text]
+        if added:
+            await self._publish("add", added, lambda pipe: (
+                pipe.hset(ADDED_KEY, mapping={i: exemplars[i] for i in added}),
+                pipe.srem(REMOVED_KEY, *added),
+            ))
+            if not self.detects_locally:
+                self.scanner.exemplars.update({i: exemplars[i] for i in added})
+        return added
+
+    async def remove(self, ids: List[str]) -> List[str]:
+        """Returns: the ids that were present."""
+        self.check_writable()
+        if self.detects_locally:
+            removed = await asyncio.to_thread(self.scanner.remove_exemplars, ids)
+        else:
+            removed = [i for i in dict.fromkeys(ids) if i in self.scanner.exemplars]
+        if removed:
+            await self._publish("remove", removed, lambda pipe: (
+                pipe.hdel(ADDED_KEY, *removed),
+                pipe.sadd(REMOVED_KEY, *removed),
+            ))
+            if not self.detects_locally:
+                for exemplar_id in removed:
+                    self.scanner.exemplars.pop(exemplar_id, None)
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "redis": self._redis is not None,
+            "version": self.version,
+            "size": len(self.scanner.exemplars) if self.enabled else 0,
+            "index": self.scanner.index.stats() if self.enabled and self.scanner.index is not None else None,
+            "local_changes": self.local_changes,
+            "remote_changes": self.remote_changes,
+            "redis_errors": self.redis_errors,
+        }
+
+    # --- Sync ---
+
+    async def _publish(self, op: str, ids: List[str], write):
+        self.local_changes += 1
+        if not self._redis:
+            self.version += 1
+            self._invalidate()
+            return
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                write(pipe)
+                pipe.incr(VERSION_KEY)
+                results = await pipe.execute()
+            self.version = results[-1]
+            self._invalidate()
+            await self._redis.publish(CHANNEL, json.dumps({"origin": self.origin, "op": op, "ids": ids, "version": self.version}))
+        except Exception as e:
+            self.redis_errors += 1
+            if not self.detects_locally:
+                # Redis is the only way this change reaches the semantic check
+                raise ExemplarSyncFailed(f"Exemplar change not shared: {e}")
+            # Applied here; other workers catch up on their next replay
+            self._invalidate()
+            logger.warning(f"⚠️ Exemplar change not shared: {e}")
+
+    def _invalidate(self):
+        guard_cache.invalidate(f"exemplars-{self.version}")
+
+    async def _replay(self):
+        """Bring this worker's corpus in line with the shared overlay."""
+        removed = await self._redis.smembers(REMOVED_KEY)
+        added = await self._redis.hgetall(ADDED_KEY)
+        version = int(await self._redis.get(VERSION_KEY) or 0)
+        if removed:
+            await self._apply_remove(list(removed))
+        if added:
+            await self._apply_add(added)
+        if version != self.version:
+            self.version = version
+            self._invalidate()
+        logger.info(f"🧠 Exemplar overlay applied: +{len(added)} / -{len(removed)} (version {version})")
+
+    async def _apply(self, event: dict):
+        if event.get("origin") == self.origin:
+            return
+        ids = event.get("ids") or []
+        if event.get("op") == "add":
+            texts = await self._redis.hmget(ADDED_KEY, ids)
+            # A later remove may already have dropped some of them
+            await self._apply_add({i: t for i, t in zip(ids, texts) if t is not None})
+        elif event.get("op") == "remove":
+            await self._apply_remove(ids)
+        self.remote_changes += 1
+        self.version = max(self.version, int(event.get("version") or 0))
+        self._invalidate()
+
+    async def _apply_add(self, exemplars: Dict[str, str]):
+        if self.detects_locally:
+            await asyncio.to_thread(self.scanner.add_exemplars, exemplars)
+        else:
+            # Only listed here; encoding happens where the semantic check runs
+            self.scanner.exemplars.update(exemplars)
+
+    async def _apply_remove(self, ids: List[str]):
+        if self.detects_locally:
+            await asyncio.to_thread(self.scanner.remove_exemplars, ids)
+        else:
+            for exemplar_id in ids:
+                self.scanner.exemplars.pop(exemplar_id, None)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    # Subscribed first, so nothing published from here on is missed
+                    await self._replay()
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            await self._apply(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"⚠️ Exemplar sync interrupted, retrying: {e}")
+                await asyncio.sleep(1)
+
+# Singleton
+exemplar_registry = ExemplarRegistry(
+    semantic_scanner,
+    redis_url=settings.REDIS_URL if settings.SEMANTIC_EXEMPLARS_REDIS else None,
+    executor_kind=settings.INFERENCE_EXECUTOR
+)
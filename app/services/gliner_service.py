@@ -1,20 +1,47 @@
-from gliner import GLiNER
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.core.config import settings
 from app.core.logging_config import logger
+from app.core.model_registry import model_registry, tensor_bytes
+from app.services.chunking import in_order, length_order, merge_entities, split_batch
+from app.services.inference_backend import backend_for, onnx_path, quantize_torch, session_options
+from app.services.redaction import redact
 import time
 
 class GlinerPiiService:
-    def __init__(self):
+    def __init__(self, backend: str = None):
         self.model = None
-        self.model_name = "urchade/gliner_small-v2.1"
+        self.model_name = settings.GLINER_MODEL_NAME
+        self.backend = backend or backend_for("gliner")
         self.labels = ["person", "organization", "location", "email", "phone number", "credit card", "password", "api key", "secret"]
+        # Label set -> label-side encoding (bi-encoder models), least recently used first
+        self._label_encodings = OrderedDict()
+        self.label_cache_size = 128
+        self._load_lock = threading.Lock()
+        self._label_lock = threading.Lock()  # label_encoding runs on several executor threads
 
     def load_model(self):
         """Lazy loading of the model to avoid memory spike on import"""
-        if not self.model:
-            logger.info(f"🧠 Loading GLiNER model: {self.model_name}...")
+        if self.model:
+            return
+        with self._load_lock:
+            if self.model:
+                return
+            logger.info(f"🧠 Loading GLiNER model: {self.model_name} ({self.backend})...")
             start = time.time()
             try:
-                self.model = GLiNER.from_pretrained(self.model_name)
+                from gliner import GLiNER
+                if self.backend.startswith("onnx"):
+                    directory, file_name = onnx_path(self.model_name, self.backend)
+                    self.model = GLiNER.from_pretrained(
+                        directory, load_onnx_model=True, onnx_model_file=file_name, session_options=session_options()
+                    )
+                else:
+                    self.model = GLiNER.from_pretrained(self.model_name)
+                    if self.backend == "torch-int8":
+                        quantize_torch(self.model)
                 logger.info(f"✅ GLiNER loaded in {time.time() - start:.2f}s")
             except Exception as e:
                 logger.error(f"❌ Failed to load GLiNER: {e}")
@@ -22,42 +49,113 @@ class GlinerPiiService:
                 # For now, we want to know if it fails.
                 raise e
 
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def unload_model(self):
+        self.model = None
+        with self._label_lock:
+            self._label_encodings.clear()
+
+    def memory_bytes(self) -> int:
+        if self.backend.startswith("onnx"):
+            # Weights live in the ONNX Runtime session, not in torch tensors
+            return os.path.getsize(os.path.join(*onnx_path(self.model_name, self.backend)))
+        return tensor_bytes(self.model)
+
+    def label_encoding(self, labels: Tuple[str, ...]):
+        """
+        Label-side encoding of a label set, computed once per distinct set.
+        Only bi-encoder models encode labels apart from the text; uni-encoder
+        models read the labels as part of every input's prompt, so there is
+        nothing to reuse and this returns None.
+        """
+        if not hasattr(self.model, "encode_labels") or getattr(self.model, "onnx_model", False):
+            return None
+        with self._label_lock:
+            encoding = self._label_encodings.get(labels)
+            if encoding is not None:
+                self._label_encodings.move_to_end(labels)
+                return encoding
+
+        # Encoded outside the lock; two threads may both encode a new set, and one result is kept
+        encoding = self.model.encode_labels(list(labels))
+        with self._label_lock:
+            self._label_encodings[labels] = encoding
+            self._label_encodings.move_to_end(labels)
+            while len(self._label_encodings) > self.label_cache_size:
+                self._label_encodings.popitem(last=False)
+        return encoding
+
+    @property
+    def max_window_words(self) -> int:
+        return min(settings.GLINER_WINDOW_WORDS, getattr(self.model.config, "max_len", 384))
+
     def anonymize(self, text: str):
         """
         Detects and PII entities and replaces them.
         Returns: (sanitized_text, list_of_types_found)
         """
-        if not self.model:
-            self.load_model()
-
         if not text:
             return text, []
 
-        entities = self.model.predict_entities(text, self.labels)
-        
-        # Sort entities by start index (descending) to replace without messing up indices
-        entities.sort(key=lambda x: x['start'], reverse=True)
-        
-        sanitized_text = text
-        detected_types = set()
-
-        for entity in entities:
-            start = entity['start']
-            end = entity['end']
-            label = entity['label']
-            score = entity['score']
-            
-            # Threshold check (GLiNER is usually confident, but let's be safe)
-            if score < 0.35: 
-                continue
-
-            detected_types.add(label)
-            
-            # Replace logic
-            replacement = f"<{label.upper()}>"
-            sanitized_text = sanitized_text[:start] + replacement + sanitized_text[end:]
-
-        return sanitized_text, list(detected_types)
+        return self.anonymize_batch([text])[0]
+
+    def anonymize_batch(self, texts: List[str], batch_size: int = 8):
+        """
+        Batched variant of anonymize: one GLiNER inference call for all texts.
+        Returns: list of (sanitized_text, list_of_types_found), in input order.
+        """
+        batch_entities = self.detect_batch(texts, batch_size=batch_size)
+        return [self.redact(text, entities) for text, entities in zip(texts, batch_entities)]
+
+    def detect_batch(self, texts: List[str], batch_size: int = 8, labels: Optional[List[str]] = None):
+        """
+        Raw entity spans for each text (one GLiNER inference call), for
+        `labels` (default: all of self.labels).
+        Texts longer than GLiNER's window are split into overlapping word
+        windows; spans are mapped back to offsets in the original text.
+        Returns: list of [{'start', 'end', 'label', 'score', ...}], in input order.
+        """
+        with model_registry.use(self):
+            return self._detect_batch(texts, batch_size, labels)
+
+    def _detect_batch(self, texts: List[str], batch_size: int, labels: Optional[List[str]]):
+        results = [[] for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text]
+        if not indices:
+            return results
+
+        labels = tuple(dict.fromkeys(labels or self.labels))
+        encoding = self.label_encoding(labels)
+        extra = {} if encoding is None else {"labels_embeddings": encoding}
+
+        windows = split_batch([texts[i] for i in indices], self.max_window_words, settings.CHUNK_OVERLAP_TOKENS)
+        # GLiNER tokenizes internally; sorting by word count still keeps its batches' padding small
+        order = length_order(windows.lengths)
+        window_entities = in_order(order, self.model.inference([windows.texts[i] for i in order], list(labels), batch_size=batch_size, **extra))
+
+        found = [[] for _ in indices]
+        for owner, start, entities in zip(windows.owners, windows.starts, window_entities):
+            for entity in entities:
+                entity['start'] += start
+                entity['end'] += start
+                found[owner].append(entity)
+
+        for i, entities in zip(indices, found):
+            results[i] = merge_entities(entities)
+
+        return results
+
+    def redact(self, text: str, entities: list):
+        """
+        Replace detected entity spans with <LABEL> placeholders.
+        Returns: (sanitized_text, list_of_types_found)
+        """
+        redaction = redact(text, entities)
+        return redaction.text, redaction.labels
 
 # Singleton instance
 gliner_service = GlinerPiiService()
+model_registry.register("gliner", gliner_service)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.schemas.guard import GuardConfig, GuardResponse
+
+def cache_key(prompt: str, config: Optional[GuardConfig], api_key_id: Optional[int] = None, detection_version: str = "") -> str:
+    """
+    Hash of the normalized prompt plus the effective config. Normalization is
+    Unicode NFC only, so canonically equal strings share an entry but the
+    cached sanitized_prompt is never a different text. Keys are scoped per
+    API key so one tenant can't probe another's traffic through hit timing.
+    `detection_version` identifies the rules and exemplars in force, so a
+    rule reload or exemplar change stops serving verdicts computed before it.
+    """
+    effective = (config or GuardConfig()).model_dump()
+    payload = json.dumps(
+        [unicodedata.normalize("NFC", prompt), effective, api_key_id, detection_version],
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return "guard:v1:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GuardResultCache:
+    """
+    Two-tier cache for guard results: an in-process LRU with TTL and max-entry
+    eviction, plus an optional Redis tier shared across workers. Concurrent
+    misses for the same key are coalesced so only one computation runs.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 10000, redis_url: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, GuardResponse)
+        self._inflight = {}  # key -> Future
+        self._redis = None
+        # Suffix of Redis keys; changed when results computed before may be stale
+        self.namespace = ""
+
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+                self._redis = aioredis.from_url(redis_url, socket_connect_timeout=1, socket_timeout=0.5)
+            except Exception as e:
+                logger.warning(f"⚠️ Guard cache Redis tier disabled: {e}")
+
+        # Stats
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+    # --- Memory tier ---
+
+    def _get_local(self, key: str) -> Optional[GuardResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: GuardResponse):
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --- Redis tier ---
+
+    def _redis_key(self, key: str) -> str:
+        return f"{key}:{self.namespace}" if self.namespace else key
+
+    async def _get_redis(self, key: str) -> Optional[GuardResponse]:
+        if not self._redis:
+            return None
+        try:
+            raw = await self._redis.get(self._redis_key(key))
+            return GuardResponse.model_validate_json(raw) if raw else None
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"⚠️ Guard cache Redis read failed: {e}")
+            return None
+
+    async def _set_redis(self, key: str, value: GuardResponse):
+        if not self._redis:
+            return
+        try:
+            await self._redis.set(self._redis_key(key), value.model_dump_json(), ex=self.ttl_seconds)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"⚠️ Guard cache Redis write failed: {e}")
+
+    # --- Public API ---
+
+    async def get(self, key: str) -> Optional[GuardResponse]:
+        value = self._get_local(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        value = await self._get_redis(key)
+        if value is not None:
+            self.redis_hits += 1
+            self._set_local(key, value)
+        return value
+
+    async def set(self, key: str, value: GuardResponse):
+        self._set_local(key, value)
+        await self._set_redis(key, value)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[GuardResponse]]) -> GuardResponse:
+        """Return the cached result, or run compute() once for all concurrent callers of this key."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A separate task, so one caller disconnecting doesn't cancel the others
+            task = asyncio.get_running_loop().create_task(self._compute_and_store(key, compute))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[GuardResponse]]) -> GuardResponse:
+        try:
+            value = await compute()
+            await self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[GuardResponse]]:
+        """Batch lookup; misses are counted, hits come back in key order."""
+        values = [await self.get(key) for key in keys]
+        self.misses += sum(1 for value in values if value is None)
+        return values
+
+    def clear(self):
+        self._entries.clear()
+
+    def invalidate(self, namespace: str):
+        """
+        Drop every cached result, e.g. after the detection corpus changed.
+        Local entries are cleared; Redis entries are orphaned by switching to
+        `namespace` (shared by all workers) and expire with their TTL.
+        """
+        self._entries.clear()
+        self.namespace = namespace
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "redis": self._redis is not None,
+            "namespace": self.namespace,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+        }
+
+# Singleton
+guard_cache = GuardResultCache(
+    ttl_seconds=settings.GUARD_CACHE_TTL_SECONDS,
+    max_entries=settings.GUARD_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL if settings.GUARD_CACHE_REDIS else None
+)
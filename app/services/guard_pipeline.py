@@ -0,0 +1,295 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+from app.core.config import settings
+from app.core.executor import inference_executor
+from app.schemas.guard import GuardConfig, GuardResponse
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.services.pii_engine import pii_engine
+from app.services.security_service import security_scanner
+from app.services.stage_planner import stage_planner
+from app.services.topic_service import get_topic_matcher
+from app.services.toxicity_service import toxicity_scanner
+
+# (is_safe, reason, score) as returned by a block stage
+Verdict = Tuple[bool, Optional[str], float]
+
+class GuardState:
+    """Working state of one prompt as it moves through the pipeline stages."""
+
+    def __init__(self, prompt: str, config: Optional[GuardConfig], api_key_id: Optional[int] = None):
+        self.prompt = prompt
+        self.config = config or GuardConfig()
+        self.api_key_id = api_key_id
+        self.sanitized_prompt = prompt
+        self.pii_entities: List[str] = []
+        self.max_risk_score = 0.0
+        self.result: Optional[GuardResponse] = None
+        self.verdicts = {}  # stage name -> Verdict (concurrent mode)
+
+    @property
+    def pending(self) -> bool:
+        return self.result is None
+
+    def block(self, reason: str, score: float, sanitized_prompt: Optional[str] = None):
+        self.result = GuardResponse(
+            safe=False,
+            score=score,
+            sanitized_prompt=sanitized_prompt,
+            reason=reason,
+            pii_detected=self.pii_entities
+        )
+
+    def finish(self) -> GuardResponse:
+        if self.result is None:
+            self.result = GuardResponse(
+                safe=True,
+                score=self.max_risk_score,
+                sanitized_prompt=self.sanitized_prompt,
+                reason=None,
+                pii_detected=self.pii_entities
+            )
+        return self.result
+
+
+class GuardStage:
+    """
+    A block-capable pipeline stage. `scan` takes a list of GuardStates and
+    returns one (is_safe, reason, score) verdict per state, in order.
+    """
+
+    def __init__(self, name: str, enabled: Callable[[GuardConfig], bool], scan: Callable[[List[GuardState]], List[Verdict]], keep_sanitized: bool = False):
+        self.name = name
+        self.enabled = enabled
+        self.scan = scan
+        # Whether a block from this stage still returns the sanitized prompt
+        self.keep_sanitized = keep_sanitized
+
+    def apply(self, state: GuardState, verdict: Verdict):
+        is_safe, reason, score = verdict
+        state.max_risk_score = max(state.max_risk_score, score)
+        if not is_safe:
+            state.block(reason, score, sanitized_prompt=state.sanitized_prompt if self.keep_sanitized else None)
+
+
+class GuardPipeline:
+    """
+    Runs the guard stages (PII -> injection rules -> semantic injection ->
+    toxicity -> topics) over a batch of prompts. Each model-backed stage makes
+    one batched inference call for every prompt that is still pending and has
+    the stage enabled.
+
+    With `adaptive` on, the block stages are reordered per batch by the stage
+    planner (cheapest stage per expected block first). PII redaction always
+    runs first because the other stages scan the redacted prompt. When more
+    than one stage would block a prompt, the reported reason is that of the
+    first one in the chosen order.
+
+    In "concurrent" mode the block stages run in parallel once PII redaction is
+    done. As soon as every prompt's verdict is settled (a block from a stage
+    with no unfinished stage ahead of it in sequential order), stages that are
+    still queued are cancelled and running ones are dropped. Verdicts are
+    applied in sequential order, so the response matches the sequential path.
+    """
+
+    def __init__(self, batch_size: int = settings.INFERENCE_BATCH_SIZE, mode: str = settings.GUARD_EXECUTION_MODE, adaptive: bool = settings.GUARD_ADAPTIVE_ORDER, max_chars: Optional[dict] = None):
+        self.batch_size = batch_size
+        self.mode = mode
+        self.adaptive = adaptive
+        # Per-stage input budget (characters); larger inputs are blocked unscanned
+        self.max_chars = settings.GUARD_STAGE_MAX_CHARS if max_chars is None else max_chars
+        # Default (sequential) order
+        self.stages = [
+            GuardStage("injection_rules", lambda c: c.detect_injection, self._scan_injection_rules),
+            GuardStage("injection_semantic", lambda c: c.detect_injection, self._scan_injection_semantic),
+            GuardStage("toxicity", lambda c: c.detect_toxicity, self._scan_toxicity, keep_sanitized=True),
+            GuardStage("topics", lambda c: bool(c.block_topics), self._scan_topics),
+        ]
+        self._stage_pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    def run(self, prompt: str, config: Optional[GuardConfig] = None, api_key_id: Optional[int] = None) -> GuardResponse:
+        return self.run_batch([(prompt, config, api_key_id)])[0]
+
+    def run_batch(self, items: List[tuple]) -> List[GuardResponse]:
+        """Items are (prompt, config) or (prompt, config, api_key_id) tuples."""
+        states = [GuardState(*item) for item in items]
+
+        self._run_pii([s for s in states if s.config.redact_pii])
+
+        stages = self.plan([s for s in states if s.pending] or states)
+        if self.mode == "concurrent":
+            self._run_concurrent(states, stages)
+        else:
+            self._run_sequential(states, stages)
+
+        return [s.finish() for s in states]
+
+    def plan(self, states: List[GuardState]) -> List[GuardStage]:
+        """Stage order for this batch: planner order if adaptive, default order otherwise."""
+        if not self.adaptive:
+            return self.stages
+        key_ids = {s.api_key_id for s in states}
+        # Batches mixing keys use the global measurements
+        key_id = key_ids.pop() if len(key_ids) == 1 else None
+        by_name = {stage.name: stage for stage in self.stages}
+        return [by_name[name] for name in stage_planner.order(self.stage_names, key_id)]
+
+    def _oversized(self, stage_name: str, text: str) -> Optional[Verdict]:
+        """Block verdict if text exceeds the stage's input budget, else None."""
+        budget = self.max_chars.get(stage_name)
+        if budget and len(text) > budget:
+            return False, f"INPUT_TOO_LARGE: {stage_name} (max {budget} chars)", 1.0
+        return None
+
+    def _scan(self, stage: GuardStage, targets: List[GuardState]) -> List[Verdict]:
+        """Run a stage scan (within its input budget) and feed its cost and block count to the planner."""
+        verdicts = [self._oversized(stage.name, s.sanitized_prompt) for s in targets]
+        within = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if not within:
+            return verdicts
+
+        start = time.time()
+        for i, verdict in zip(within, stage.scan([targets[i] for i in within])):
+            verdicts[i] = verdict
+        elapsed_ms = (time.time() - start) * 1000
+
+        # Split the measurement across the keys in the batch
+        per_key = {}
+        for i in within:
+            counts = per_key.setdefault(targets[i].api_key_id, [0, 0])
+            counts[0] += 1
+            counts[1] += 0 if verdicts[i][0] else 1
+        for key_id, (items, blocks) in per_key.items():
+            stage_planner.record(stage.name, items, blocks, elapsed_ms * items / len(within), api_key_id=key_id)
+
+        return verdicts
+
+    def _run_sequential(self, states: List[GuardState], stages: List[GuardStage]):
+        for stage in stages:
+            targets = [s for s in states if s.pending and stage.enabled(s.config)]
+            if not targets:
+                continue
+            for state, verdict in zip(targets, self._scan(stage, targets)):
+                stage.apply(state, verdict)
+
+    def _run_concurrent(self, states: List[GuardState], stages: List[GuardStage]):
+        if self._stage_pool is None:
+            # Enough threads for every inference worker to have all its stages in flight
+            self._stage_pool = ThreadPoolExecutor(
+                max_workers=len(self.stages) * settings.INFERENCE_WORKERS,
+                thread_name_prefix="guard-stage"
+            )
+
+        futures = {}
+        for stage in stages:
+            targets = [s for s in states if s.pending and stage.enabled(s.config)]
+            if targets:
+                futures[self._stage_pool.submit(self._scan, stage, targets)] = (stage, targets)
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, targets = futures[future]
+                for state, verdict in zip(targets, future.result()):
+                    state.verdicts[stage.name] = verdict
+            if all(self._is_settled(s, stages) for s in states):
+                break
+
+        # Nothing left can change a response: cancel queued stages, drop running ones
+        for future in pending:
+            future.cancel()
+
+        for state in states:
+            for stage in stages:
+                verdict = state.verdicts.get(stage.name)
+                if state.pending and verdict is not None and stage.enabled(state.config):
+                    stage.apply(state, verdict)
+
+    def _is_settled(self, state: GuardState, stages: List[GuardStage]) -> bool:
+        """True once the sequential-order verdict of a state can no longer change."""
+        if not state.pending:
+            return True
+        for stage in stages:
+            if not stage.enabled(state.config):
+                continue
+            verdict = state.verdicts.get(stage.name)
+            if verdict is None:
+                return False
+            if not verdict[0]:
+                return True
+        return True
+
+    # --- Stages ---
+
+    def _run_pii(self, states: List[GuardState]):
+        for state in states:
+            oversized = self._oversized("pii", state.prompt)
+            if oversized:
+                # Can't redact it, so it must not pass through unredacted
+                state.block(oversized[1], oversized[2])
+        states = [s for s in states if s.pending]
+        if not states:
+            return
+        results = pii_engine.anonymize_batch(
+            [s.prompt for s in states],
+            batch_size=self.batch_size,
+            labels=[s.config.pii_labels for s in states]
+        )
+        for state, (sanitized_prompt, pii_entities) in zip(states, results):
+            state.sanitized_prompt = sanitized_prompt
+            state.pii_entities = pii_entities
+
+    def _scan_injection_rules(self, states: List[GuardState]) -> List[Verdict]:
+        return security_scanner.scan_rules_batch(
+            [s.sanitized_prompt for s in states],
+            profanity_words=[s.config.profanity_words for s in states]
+        )
+
+    def _scan_injection_semantic(self, states: List[GuardState]) -> List[Verdict]:
+        return security_scanner.scan_semantic_batch([s.sanitized_prompt for s in states], batch_size=self.batch_size)
+
+    def _scan_toxicity(self, states: List[GuardState]) -> List[Verdict]:
+        results = toxicity_scanner.scan_batch([s.sanitized_prompt for s in states], batch_size=self.batch_size)
+        return [
+            (not is_toxic, f"TOXIC_CONTENT: {', '.join(flags)}" if is_toxic else None, tox_score)
+            for is_toxic, tox_score, flags in results
+        ]
+
+    def _scan_topics(self, states: List[GuardState]) -> List[Verdict]:
+        verdicts = []
+        for state in states:
+            matcher = get_topic_matcher(
+                tuple(state.config.block_topics),
+                whole_words=state.config.topic_whole_words,
+                case_sensitive=state.config.topic_case_sensitive
+            )
+            matched = matcher.find_all(state.sanitized_prompt)
+            if matched:
+                verdicts.append((False, f"BLOCKED_TOPIC: {', '.join(matched)}", 1.0))
+            else:
+                verdicts.append((True, None, 0.0))
+        return verdicts
+
+# Singletons
+guard_pipeline = GuardPipeline()
+
+def run_guard_batch(items: List[tuple]) -> List[GuardResponse]:
+    """Module-level entry point so process-pool workers can import it by name."""
+    return guard_pipeline.run_batch(items)
+
+# Coalesces concurrent single-prompt requests into pipeline batches
+guard_scheduler = MicroBatchScheduler(
+    run_guard_batch,
+    max_batch_size=settings.MICROBATCH_MAX_SIZE,
+    max_wait_ms=settings.MICROBATCH_MAX_WAIT_MS,
+    executor=inference_executor,
+    # One batch per executor worker (remote: per thread of every inference server worker)
+    max_in_flight=settings.INFERENCE_WORKERS * (settings.INFERENCE_SERVER_WORKERS if settings.INFERENCE_EXECUTOR == "remote" else 1),
+    # Prompts waiting beyond this get 503, as they would from the executor without micro-batching
+    max_pending=settings.INFERENCE_MAX_QUEUE * settings.MICROBATCH_MAX_SIZE
+)
@@ -0,0 +1,274 @@
+import json
+import os
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+# "torch"       fp32 PyTorch (reference)
+# "torch-int8"  PyTorch with nn.Linear weights dynamically quantized to int8
+# "onnx"        exported ONNX graph on onnxruntime (CPU)
+# "onnx-int8"   same graph, dynamically quantized to int8
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Same file names GLiNER's own export uses, so one layout serves every model
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_quantized.onnx"
+ENCODER_META_FILE = "encoder.json"
+
+def backend_for(model_key: str) -> str:
+    """Configured backend of a model ("semantic", "toxicity" or "gliner")."""
+    backend = settings.INFERENCE_BACKENDS.get(model_key, "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend for {model_key}: {backend} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+def export_dir(model_name: str) -> str:
+    """Where the ONNX export of a model lives (one directory per model name)."""
+    return os.path.join(settings.ONNX_MODEL_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+def onnx_file(backend: str) -> str:
+    return ONNX_INT8_FILE if backend.endswith("int8") else ONNX_FILE
+
+def onnx_path(model_name: str, backend: str) -> Tuple[str, str]:
+    """
+    Export directory and graph file for an "onnx" / "onnx-int8" backend.
+    Returns: (directory, file_name)
+    """
+    directory = export_dir(model_name)
+    file_name = onnx_file(backend)
+    if not os.path.exists(os.path.join(directory, file_name)):
+        raise FileNotFoundError(
+            f"No ONNX export of {model_name} at {os.path.join(directory, file_name)}; "
+            f"run scripts/export_onnx.py first"
+        )
+    return directory, file_name
+
+# --- Runtime ---
+
+def quantize_torch(module):
+    """Dynamic int8 quantization of every nn.Linear, in place (weights int8, activations quantized per batch)."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # Same per-worker thread budget as the torch path
+    if settings.INFERENCE_TORCH_THREADS > 0:
+        options.intra_op_num_threads = settings.INFERENCE_TORCH_THREADS
+    return options
+
+def onnx_session(path: str):
+    import onnxruntime as ort
+    return ort.InferenceSession(path, session_options(), providers=["CPUExecutionProvider"])
+
+
+def pad_token_ids(tokenizer, token_ids: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Model inputs from already-tokenized texts: special tokens added, padded
+    to the longest in the batch (so batch similar lengths together).
+    Returns: (input_ids, attention_mask), int64
+    """
+    rows = [tokenizer.build_inputs_with_special_tokens(list(ids)) for ids in token_ids]
+    input_ids = np.full((len(rows), max(map(len, rows))), tokenizer.pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros(input_ids.shape, dtype=np.int64)
+    for i, row in enumerate(rows):
+        input_ids[i, :len(row)] = row
+        attention_mask[i, :len(row)] = 1
+    return input_ids, attention_mask
+
+def _is_multi_label(config) -> bool:
+    # Same activation the transformers pipeline picks
+    return config.problem_type == "multi_label_classification" or config.num_labels == 1
+
+def _activate(logits: np.ndarray, multi_label: bool) -> np.ndarray:
+    logits = logits.astype(np.float64)
+    if multi_label:
+        return 1.0 / (1.0 + np.exp(-logits))
+    scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return scores / scores.sum(axis=1, keepdims=True)
+
+def class_scores(classifier, input_ids: np.ndarray, attention_mask: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """
+    Label scores of padded token ids, for a transformers text-classification
+    pipeline or an OnnxSequenceClassifier.
+    Returns: (labels, (batch, labels) scores)
+    """
+    if isinstance(classifier, OnnxSequenceClassifier):
+        return classifier.labels, classifier.classify(input_ids, attention_mask)
+
+    import torch
+    model = classifier.model
+    with torch.no_grad():
+        logits = model(input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)).logits
+    labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+    return labels, _activate(logits.float().numpy(), _is_multi_label(model.config))
+
+def sentence_embeddings(encoder, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Embeddings of padded token ids, for a SentenceTransformer or an OnnxSentenceEncoder."""
+    if isinstance(encoder, OnnxSentenceEncoder):
+        return encoder.embed(input_ids, attention_mask)
+
+    import torch
+    with torch.no_grad():
+        features = encoder({"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(attention_mask)})
+    return features["sentence_embedding"].float().numpy()
+
+
+class OnnxModel:
+    """Exported transformer graph (inputs: input_ids, attention_mask) plus its tokenizer."""
+
+    def __init__(self, directory: str, file_name: str):
+        from transformers import AutoTokenizer
+        self.directory = directory
+        self.path = os.path.join(directory, file_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.session = onnx_session(self.path)
+
+    def forward(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """First graph output for padded token ids."""
+        return self.session.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+    def batches(self, texts: List[str], batch_size: int, max_length: Optional[int] = None):
+        """
+        (indices, input_ids, attention_mask) over texts, tokenized in batches
+        of similar character length (like SentenceTransformer.encode does).
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            encoded = self.tokenizer(
+                [texts[j] for j in batch], padding=True, truncation=True, max_length=max_length, return_tensors="np"
+            )
+            yield batch, encoded["input_ids"].astype(np.int64), encoded["attention_mask"].astype(np.int64)
+
+
+class OnnxSequenceClassifier(OnnxModel):
+    """
+    Stand-in for a transformers text-classification pipeline (top_k=None)
+    on an exported graph: called with texts, returns per-text
+    [{'label', 'score'}, ...] for every label.
+    """
+
+    def __init__(self, directory: str, file_name: str):
+        from transformers import AutoConfig
+        super().__init__(directory, file_name)
+        config = AutoConfig.from_pretrained(directory)
+        self.labels = [config.id2label[i] for i in range(config.num_labels)]
+        self.multi_label = _is_multi_label(config)
+
+    def classify(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """(batch, labels) scores of padded token ids."""
+        return _activate(self.forward(input_ids, attention_mask), self.multi_label)
+
+    def __call__(self, texts: List[str], batch_size: int = 8):
+        results = [None] * len(texts)
+        for batch, input_ids, attention_mask in self.batches(texts, batch_size):
+            for i, row in zip(batch, self.classify(input_ids, attention_mask)):
+                results[i] = [{'label': label, 'score': float(s)} for label, s in zip(self.labels, row)]
+        return results
+
+
+class OnnxSentenceEncoder(OnnxModel):
+    """
+    Stand-in for SentenceTransformer.encode on an exported graph: token
+    embeddings from the graph, then mean pooling (and normalization, if the
+    original model had it) in numpy.
+    """
+
+    def __init__(self, directory: str, file_name: str):
+        super().__init__(directory, file_name)
+        with open(os.path.join(directory, ENCODER_META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.max_seq_length = meta["max_seq_length"]
+        self.dimension = meta["dimension"]
+        self.normalize = meta["normalize"]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def embed(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Pooled embeddings of padded token ids."""
+        hidden = self.forward(input_ids, attention_mask)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for batch, input_ids, attention_mask in self.batches(texts, batch_size, max_length=self.max_seq_length):
+            embeddings[batch] = self.embed(input_ids, attention_mask)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+# --- Export ---
+
+def quantize_onnx(directory: str):
+    """Write the int8 graph (ONNX_INT8_FILE) next to the fp32 one."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(os.path.join(directory, ONNX_FILE), os.path.join(directory, ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+
+def _export_graph(model, tokenizer, directory: str, output: str):
+    """Trace model(input_ids, attention_mask).<output> to ONNX_FILE, with dynamic batch and sequence axes."""
+    import torch
+
+    class Graph(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return getattr(self.model(input_ids=input_ids, attention_mask=attention_mask), output)
+
+    dummy = tokenizer(["export sample text", "a second, longer export sample text"], padding=True, return_tensors="pt")
+    os.makedirs(directory, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            Graph().eval(),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            os.path.join(directory, ONNX_FILE),
+            input_names=["input_ids", "attention_mask"],
+            output_names=[output],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                output: {0: "batch"} if output == "logits" else {0: "batch", 1: "sequence"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(directory)
+
+def export_sequence_classifier(model, tokenizer, directory: str, quantize: bool = True):
+    """Export a transformers *ForSequenceClassification model (and its tokenizer / label config)."""
+    _export_graph(model.eval(), tokenizer, directory, "logits")
+    model.config.save_pretrained(directory)
+    if quantize:
+        quantize_onnx(directory)
+
+def export_sentence_encoder(encoder, directory: str, quantize: bool = True):
+    """Export a SentenceTransformer made of Transformer -> mean Pooling (-> Normalize)."""
+    modules = list(encoder)
+    pooling = modules[1] if len(modules) > 1 else None
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError("Only mean-pooled sentence encoders can be exported")
+
+    _export_graph(modules[0].auto_model.eval(), encoder.tokenizer, directory, "last_hidden_state")
+    with open(os.path.join(directory, ENCODER_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "max_seq_length": encoder.max_seq_length,
+            "dimension": encoder.get_sentence_embedding_dimension(),
+            "normalize": any(type(m).__name__ == "Normalize" for m in modules[2:]),
+        }, f)
+    if quantize:
+        quantize_onnx(directory)
+
+def export_gliner(model, directory: str, quantize: bool = True):
+    """GLiNER exports itself; its ONNX loader also needs the saved config and tokenizer alongside."""
+    model.save_pretrained(directory)
+    model.export_to_onnx(directory, onnx_filename=ONNX_FILE, quantized_filename=ONNX_INT8_FILE, quantize=quantize)
@@ -0,0 +1,227 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.services.chunking import merge_entities
+from app.services.gliner_service import gliner_service
+from app.services.redaction import redact
+
+MODES = ("regex-only", "hybrid", "neural")
+
+# Labels only GLiNER can find; everything else has a pattern detector below
+NEURAL_LABELS = ("person", "organization", "location")
+PATTERN_LABELS = ("email", "phone number", "credit card", "ssn", "iban", "password", "api key", "secret")
+
+# Well-known credential prefixes (Stripe, OpenAI, AWS, GitHub, Slack, Google)
+KEY_PREFIX = re.compile(r"(?:sk|pk|rk)_(?:live|test)_|sk-|AKIA|ASIA|gh[pousr]_|github_pat_|xox[abposr]-|AIza")
+
+# Random-looking but not secret: hex digests (commit SHAs), UUIDs and ULIDs, optionally
+# behind a name or prefix ("req_", "request_id=", "trace-") as request and trace IDs are.
+# Prefix and body are matched separately at each separator (see _is_identifier): as one
+# regex, "a1-" fits both and the match backtracks over every way to split the token.
+IDENTIFIER_PREFIX = re.compile(r"(?:[A-Za-z][A-Za-z0-9]*[_=-])*")
+IDENTIFIER_BODY = re.compile(r"[0-9a-fA-F]+(?:-[0-9a-fA-F]+)*|[0-9A-HJKMNP-TV-Z]{26}")
+IDENTIFIER_MAX_CHARS = 128
+
+# Every pattern detector in one alternation, so a text is scanned once.
+# At a given position the first alternative wins, hence specific before loose.
+DETECTORS = re.compile(r"""
+    (?P<email>(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9-]{1,63}(?:\.[A-Za-z0-9-]{1,63}){0,8}\.[A-Za-z]{2,63})
+  | (?P<uuid>\b[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b)
+  | (?P<iban>\b[A-Z]{2}\d{2}(?:\ ?[A-Z0-9]){11,30}\b)
+  | (?P<card>\b(?:\d[\ -]?){12,18}\d\b)
+  | (?P<ssn>\b(?P<ssn_area>\d{3})-(?P<ssn_group>\d{2})-(?P<ssn_serial>\d{4})\b)
+  | (?P<phone>(?<![\w+])(?:\+?\d{1,3}[-.\ ]?)?\(?\d{3}\)?[-.\ ]?\d{3}[-.\ ]?\d{4}\b|\b\d{3}[-.]\d{4}\b)
+  | (?P<credential>(?i:\b(?P<credential_key>password|passwd|pwd|secret|api[_\ -]?key|access[_\ -]?token|token)\b
+        \s*(?P<credential_sep>[:=]|is)\s*)(?P<credential_value>[^\s,;'"]{3,}[^\s,;'".!?)\]]))
+  | (?P<token>(?<![\w+/=-])[\w+/=-]{20,})
+""", re.VERBOSE)
+
+# Names, organizations and places: a capitalized word mid-sentence, or a cue phrase
+NEURAL_HINT = re.compile(
+    r"[^.!?\s]\s+[A-Z][a-z]"
+    r"|(?i:\b(?:my\ name|name\ is|mr|mrs|ms|dr|lives?\ (?:in|at)|living\ in|located|address|born\ in"
+    r"|company|employer|works?\ (?:at|for)|inc|ltd|llc|corp|gmbh)\b)",
+    re.VERBOSE
+)
+
+def luhn_valid(digits: str) -> bool:
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        digit = ord(char) - 48
+        if i % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+def iban_valid(iban: str) -> bool:
+    """ISO 13616 check digits: country + checksum moved to the end, mod 97 == 1."""
+    iban = iban.replace(" ", "")
+    if not 15 <= len(iban) <= 34:
+        return False
+    rearranged = iban[4:] + iban[:4]
+    return int("".join(str(int(c, 36)) for c in rearranged)) % 97 == 1
+
+def ssn_valid(area: str, group: str, serial: str) -> bool:
+    # Never issued: area 000, 666 or 9xx, group 00, serial 0000
+    return area not in ("000", "666") and area[0] != "9" and group != "00" and serial != "0000"
+
+def shannon_entropy(text: str) -> float:
+    """Bits per character."""
+    n = len(text)
+    return -sum(count / n * math.log2(count / n) for count in Counter(text).values())
+
+def _is_identifier(token: str) -> bool:
+    if len(token) > IDENTIFIER_MAX_CHARS:
+        return False
+    starts = [0] + [i + 1 for i, c in enumerate(token) if c in "_=-"]
+    return any(IDENTIFIER_BODY.fullmatch(token, i) and IDENTIFIER_PREFIX.fullmatch(token, 0, i) for i in starts)
+
+def _secret_label(token: str) -> Optional[str]:
+    if KEY_PREFIX.match(token):
+        return "api key"
+    if _is_identifier(token):
+        return None
+    has_digit = any(c.isdigit() for c in token)
+    has_alpha = any(c.isalpha() for c in token)
+    if has_digit and has_alpha and shannon_entropy(token) >= settings.PII_SECRET_MIN_ENTROPY:
+        return "secret"
+    return None
+
+def _entity(match, group: str, label: str, score: float) -> dict:
+    start, end = match.span(group)
+    return {'start': start, 'end': end, 'label': label, 'score': score, 'text': match.group(group)}
+
+def detect_patterns(text: str) -> List[dict]:
+    """
+    Checksum- and heuristic-validated pattern entities, in one scan.
+    Labels match GLiNER's, so results from both can be merged.
+    Returns: [{'start', 'end', 'label', 'score', 'text'}, ...]
+    """
+    entities = []
+    for match in DETECTORS.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+
+        if kind == "email":
+            entities.append(_entity(match, kind, "email", 0.95))
+        elif kind == "uuid":
+            continue  # Consumed here so its digit groups don't read as a phone or card number
+        elif kind == "iban":
+            if iban_valid(value):
+                entities.append(_entity(match, kind, "iban", 0.95))
+        elif kind == "card":
+            if luhn_valid(re.sub(r"\D", "", value)):
+                entities.append(_entity(match, kind, "credit card", 0.95))
+        elif kind == "ssn":
+            if ssn_valid(match.group("ssn_area"), match.group("ssn_group"), match.group("ssn_serial")):
+                entities.append(_entity(match, kind, "ssn", 0.9))
+        elif kind == "phone":
+            if 7 <= sum(c.isdigit() for c in value) <= 15:
+                entities.append(_entity(match, kind, "phone number", 0.6))
+        elif kind == "credential":
+            key = match.group("credential_key").lower()
+            secret = match.group("credential_value")
+            # "password is wrong" is prose; "password is hunter2" is not
+            if match.group("credential_sep").lower() == "is" and secret.isalpha():
+                continue
+            label = "password" if key.startswith("p") else "secret" if key == "secret" else "api key"
+            entities.append(_entity(match, "credential_value", label, 0.8))
+        else:
+            label = _secret_label(value)
+            if label:
+                entities.append(_entity(match, kind, label, 0.9 if label == "api key" else 0.6))
+    return entities
+
+def may_need_neural(text: str) -> bool:
+    """Cheap pre-check: could the text contain a person, organization or location?"""
+    return NEURAL_HINT.search(text) is not None
+
+def label_set(labels: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    """Normalized labels of a request (None = every label)."""
+    if labels is None:
+        return None
+    return tuple(dict.fromkeys(label.strip().lower() for label in labels if label.strip()))
+
+
+class PiiEngine:
+    """
+    Tiered PII detection. Pattern detectors (email, phone, Luhn-checked
+    cards, SSN, IBAN, credentials, high-entropy keys other than hex, UUID
+    and ULID identifiers) run first, in one pass. GLiNER is then only asked
+    for the labels patterns can't find (person, organization, location),
+    and only for texts whose pre-check suggests they may contain one.
+
+    Modes:
+        "regex-only"  pattern detectors only; no model is loaded
+        "hybrid"      patterns + GLiNER for names/organizations/places when hinted
+        "neural"      GLiNER for every label (the default)
+    """
+
+    def __init__(self, mode: str = settings.PII_MODE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown PII mode: {mode} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+
+    def detect_batch(self, texts: List[str], batch_size: int = 8, labels: Optional[List[Optional[Sequence[str]]]] = None) -> List[List[dict]]:
+        """
+        Entity spans for each text. `labels[i]` restricts text i to those
+        labels (None = all); texts sharing a label set share a GLiNER call.
+        Returns: list of [{'start', 'end', 'label', 'score', ...}], in input order.
+        """
+        wanted = [label_set(labels[i]) if labels else None for i in range(len(texts))]
+        results = [[] for _ in texts]
+        neural: Dict[Optional[Tuple[str, ...]], List[int]] = {}  # GLiNER label set -> texts
+
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            if self.mode == "neural":
+                if wanted[i] != ():
+                    neural.setdefault(wanted[i], []).append(i)
+                continue
+
+            entities = detect_patterns(text)
+            if wanted[i] is not None:
+                entities = [e for e in entities if e['label'] in wanted[i]]
+            results[i] = entities
+
+            if self.mode == "hybrid":
+                model_labels = NEURAL_LABELS if wanted[i] is None else tuple(l for l in wanted[i] if l not in PATTERN_LABELS)
+                # Custom (zero-shot) labels have no pre-check, so they always go to the model
+                if model_labels and (may_need_neural(text) or not set(model_labels) <= set(NEURAL_LABELS)):
+                    neural.setdefault(model_labels, []).append(i)
+
+        for model_labels, indices in neural.items():
+            found = gliner_service.detect_batch(
+                [texts[i] for i in indices], batch_size=batch_size, labels=list(model_labels) if model_labels else None
+            )
+            for i, entities in zip(indices, found):
+                results[i] = merge_entities(results[i] + entities) if results[i] else entities
+        return results
+
+    def anonymize(self, text: str):
+        """
+        Detects and replaces PII entities.
+        Returns: (sanitized_text, list_of_types_found)
+        """
+        if not text:
+            return text, []
+        return self.anonymize_batch([text])[0]
+
+    def anonymize_batch(self, texts: List[str], batch_size: int = 8, labels: Optional[List[Optional[Sequence[str]]]] = None):
+        """Returns: list of (sanitized_text, list_of_types_found), in input order."""
+        batch_entities = self.detect_batch(texts, batch_size=batch_size, labels=labels)
+        return [self.redact(text, entities) for text, entities in zip(texts, batch_entities)]
+
+    def redact(self, text: str, entities: list):
+        """
+        Replace entity spans with <LABEL> placeholders.
+        Returns: (sanitized_text, list_of_types_found)
+        """
+        redaction = redact(text, entities)
+        return redaction.text, redaction.labels
+
+# Singleton instance
+pii_engine = PiiEngine()
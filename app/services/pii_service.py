@@ -1,10 +1,34 @@
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern, RecognizerRegistry
-from presidio_analyzer.nlp_engine import NlpEngineProvider
-from presidio_anonymizer import AnonymizerEngine
-from presidio_anonymizer.entities import OperatorConfig
+import threading
+from app.core.model_registry import model_registry
+from app.services.redaction import redact
 
 class PIIAnalyzer:
     def __init__(self):
+        # Presidio loads a spaCy pipeline; defer it (and the import) to first use
+        self.analyzer = None
+        self._load_lock = threading.Lock()
+
+    def load_model(self):
+        if self.analyzer is not None:
+            return
+        with self._load_lock:
+            if self.analyzer is None:
+                self.analyzer = self._build_analyzer()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.analyzer is not None
+
+    def unload_model(self):
+        self.analyzer = None
+
+    def memory_bytes(self):
+        # spaCy pipelines aren't torch modules; the registry measures RSS growth instead
+        return None
+
+    def _build_analyzer(self):
+        from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern, RecognizerRegistry
+
         # 1. Setup Registry
         registry = RecognizerRegistry()
         registry.load_predefined_recognizers()
@@ -19,8 +43,7 @@ class PIIAnalyzer:
         registry.add_recognizer(loose_phone_recognizer)
 
         # 3. Initialize Analyzer with default configuration (uses internal logic or default loaded models)
-        self.analyzer = AnalyzerEngine(registry=registry)
-        self.anonymizer = AnonymizerEngine()
+        return AnalyzerEngine(registry=registry)
 
     def analyze_and_anonymize(self, text: str):
         """
@@ -33,18 +56,16 @@ class PIIAnalyzer:
         # Analyze (Allowlist approach: Only check for things we care about)
         # This prevents "12345" being detected as an Organization or Bank Number
         target_entities = ["PHONE_NUMBER", "EMAIL_ADDRESS", "CREDIT_CARD", "IBAN_CODE", "PERSON", "US_SSN"]
-        results = self.analyzer.analyze(text=text, language='en', entities=target_entities)
-        
-        # Anonymize
-        anonymized_result = self.anonymizer.anonymize(
-            text=text,
-            analyzer_results=results
-        )
+        with model_registry.use(self):
+            results = self.analyzer.analyze(text=text, language='en', entities=target_entities)
         
-        # Extract unique entity types found for reporting
-        detected_entities = list(set([res.entity_type for res in results]))
-        
-        return anonymized_result.text, detected_entities
+        # Anonymize with the shared redaction builder (same span resolution as GLiNER and patterns).
+        # Presidio already applied its own score threshold, so keep everything it returned.
+        entities = [{'start': res.start, 'end': res.end, 'label': res.entity_type, 'score': res.score} for res in results]
+        redaction = redact(text, entities, min_score=0.0)
+
+        return redaction.text, redaction.labels
 
 # Singleton instance
 pii_analyzer = PIIAnalyzer()
+model_registry.register("presidio", pii_analyzer)
@@ -0,0 +1,183 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import better_profanity
+from better_profanity.constants import ALLOWED_CHARACTERS
+from app.core.config import settings
+
+# Same substitutions better_profanity accepts: dictionary char -> chars that may stand in for it
+CHARS_MAPPING = {
+    "a": ("a", "@", "*", "4"),
+    "i": ("i", "*", "l", "1"),
+    "o": ("o", "*", "0", "@"),
+    "u": ("u", "*", "v"),
+    "v": ("v", "*", "u"),
+    "l": ("l", "1"),
+    "e": ("e", "*", "3"),
+    "s": ("s", "$", "5"),
+    "t": ("t", "7"),
+}
+
+DEFAULT_WORDLIST = os.path.join(os.path.dirname(better_profanity.__file__), "profanity_wordlist.txt")
+
+# Word characters, as better_profanity splits them (letters, digits, @ $ * " ')
+WORD_PATTERN = re.compile("[" + "".join(re.escape(c) for c in sorted(ALLOWED_CHARACTERS)) + "]+")
+# Same set restricted to ASCII; much cheaper than the ~6k-character class above
+ASCII_WORD_PATTERN = re.compile(r"""[0-9A-Za-z@$*"']+""")
+
+# Three or more of the same letter: "fuuuck", "shiiit" (digit runs like "111" are left alone)
+ELONGATED = re.compile(r"([a-z])\1\1")
+REPEATS = re.compile(r"([a-z])\1+")
+
+def _skeleton_table() -> dict:
+    """
+    str.translate table mapping every character to a representative of its
+    substitution class (e.g. a, @, 4, *, o, 0, ... share one class). Two
+    strings can only match if their skeletons are equal, so the skeleton is
+    the hash key and exact per-position checks run on the few candidates.
+    """
+    parent = {}
+
+    def find(c):
+        while parent.get(c, c) != c:
+            c = parent[c]
+        return c
+
+    for char, variants in CHARS_MAPPING.items():
+        for variant in variants:
+            parent[find(variant)] = find(char)
+
+    return str.maketrans({c: find(c) for c in parent})
+
+SKELETON = _skeleton_table()
+
+def _read_wordlist(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [row.strip() for row in f if row.strip()]
+
+def _collapse(text: str) -> str:
+    return REPEATS.sub(r"\1", text)
+
+
+class ProfanityMatcher:
+    """
+    Single-pass profanity matcher with the same decisions as
+    better_profanity's contains_profanity, built for the hot path.
+
+    Words are indexed by skeleton (see SKELETON), so each text word costs one
+    translate + one dict lookup instead of a comparison against every
+    listed word. Multi-word entries ("blow job") and words split by
+    separators ("ass hole" vs "asshole") are checked like better_profanity
+    does, but only while the joined text is still a prefix of some entry.
+
+    `extended` (off by default) departs from better_profanity to also catch
+    elongated words ("fuuuck", via a run-collapsed index) and multi-word
+    matches whose last word starts at the last character of the text
+    ("say f-u-c-k"), which better_profanity skips.
+    """
+
+    def __init__(self, words: Iterable[str], extended: bool = False):
+        self.extended = extended
+        self.words = sorted({w.lower() for w in words if w.strip()})
+
+        self._index: Dict[str, List[Tuple[str, list]]] = {}
+        self._collapsed: Dict[str, List[Tuple[str, list]]] = {}
+        self._prefixes: Set[str] = set()
+        # How many following words an entry can span (better_profanity's MAX_NUMBER_COMBINATIONS)
+        self.max_extra_words = 1
+
+        for word in self.words:
+            self._add(self._index, word, word)
+            self._add(self._collapsed, _collapse(word), word)
+            skeleton = word.translate(SKELETON)
+            self._prefixes.update(skeleton[:i] for i in range(1, len(skeleton) + 1))
+            self.max_extra_words = max(self.max_extra_words, sum(1 for c in word if c not in ALLOWED_CHARACTERS))
+
+    def _add(self, index: dict, spelling: str, word: str):
+        pattern = [set(CHARS_MAPPING.get(c, (c,))) for c in spelling]
+        index.setdefault(spelling.translate(SKELETON), []).append((word, pattern))
+
+    def _lookup(self, index: dict, text: str, skeleton: str) -> Optional[str]:
+        for word, pattern in index.get(skeleton, ()):
+            if all(c in allowed for c, allowed in zip(text, pattern)):
+                return word
+        return None
+
+    def match_word(self, text: str, skeleton: Optional[str] = None) -> Optional[str]:
+        """The listed word that `text` (lowercased) spells, if any."""
+        word = self._lookup(self._index, text, skeleton or text.translate(SKELETON))
+        if word is None and self.extended and ELONGATED.search(text):
+            collapsed = _collapse(text)
+            word = self._lookup(self._collapsed, collapsed, collapsed.translate(SKELETON))
+        return word
+
+    def find(self, text: str) -> Optional[str]:
+        """First listed word found in text, or None."""
+        lowered = text.lower()
+        # Skeletons are per character, so translate once and slice per word
+        skeletons = lowered.translate(SKELETON)
+        pattern = ASCII_WORD_PATTERN if lowered.isascii() else WORD_PATTERN
+        spans = [m.span() for m in pattern.finditer(lowered)]
+
+        # better_profanity ignores texts whose only word starts at the last character
+        if not spans or spans[0][0] >= len(text) - 1:
+            return None
+
+        prefixes = self._prefixes
+        for i, (start, end) in enumerate(spans):
+            current = skeletons[start:end]
+            if current not in prefixes:
+                # Not the start of any entry; only an elongated spelling can still match
+                if self.extended and ELONGATED.search(lowered, start, end):
+                    word = self.match_word(lowered[start:end])
+                    if word:
+                        return word
+                continue
+
+            word = self.match_word(lowered[start:end], current)
+            if word:
+                return word
+
+            # Entries spanning several words: joined directly, or with the original separators
+            joined, joined_skeleton = lowered[start:end], current
+            for next_start, next_end in spans[i + 1:i + 1 + self.max_extra_words]:
+                if next_start >= len(text) - 1 and not self.extended:
+                    break  # better_profanity never joins a word starting at the last character
+                joined += lowered[next_start:next_end]
+                joined_skeleton += skeletons[next_start:next_end]
+                separated_skeleton = skeletons[start:next_end]
+                if joined_skeleton in prefixes:
+                    word = self.match_word(joined, joined_skeleton)
+                    if word:
+                        return word
+                if separated_skeleton in prefixes:
+                    word = self.match_word(lowered[start:next_end], separated_skeleton)
+                    if word:
+                        return word
+                if joined_skeleton not in prefixes and separated_skeleton not in prefixes:
+                    break
+
+        return None
+
+    def contains_profanity(self, text: str) -> bool:
+        return self.find(text) is not None
+
+
+@lru_cache(maxsize=1)
+def _default_matcher() -> ProfanityMatcher:
+    return ProfanityMatcher(_read_wordlist(DEFAULT_WORDLIST), extended=settings.PROFANITY_EXTENDED_MATCHING)
+
+def __getattr__(name: str):
+    # `default_profanity_matcher` is built on first access, not on import
+    if name == "default_profanity_matcher":
+        return _default_matcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@lru_cache(maxsize=256)
+def get_profanity_matcher(custom_words: Optional[Tuple[str, ...]] = None) -> ProfanityMatcher:
+    """Default list, extended with a tenant's custom words. Cached per word list."""
+    if not custom_words:
+        return _default_matcher()
+    return ProfanityMatcher(_default_matcher().words + list(custom_words), extended=settings.PROFANITY_EXTENDED_MATCHING)
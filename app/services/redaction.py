@@ -0,0 +1,100 @@
+from bisect import bisect_right
+from typing import Iterable, List
+
+MIN_SCORE = 0.35  # Spans scored below this are left in place
+
+# When spans overlap, the more specific detector names the merged span
+LABEL_PRIORITY = {
+    "credit card": 4, "iban": 4, "ssn": 4, "email": 4, "api key": 4,
+    "password": 3, "secret": 3,
+    "phone number": 2,
+}
+
+def placeholder(label: str) -> str:
+    return f"<{label.upper()}>"
+
+def _rank(entity: dict):
+    return LABEL_PRIORITY.get(entity['label'], 0), entity['score'], entity['end'] - entity['start']
+
+def resolve_spans(entities: Iterable[dict], min_score: float = MIN_SCORE) -> List[dict]:
+    """
+    Non-overlapping spans to redact, in text order. Overlapping spans, and
+    touching spans with the same label, collapse into one span covering all
+    of them, labelled by the strongest (label priority, then score, then
+    length). Works on any detector's output: GLiNER, Presidio or patterns.
+    Returns: [{'start', 'end', 'label', 'score'}, ...]
+    """
+    candidates = sorted(
+        (e for e in entities if e['score'] >= min_score and e['end'] > e['start']),
+        key=lambda e: e['start']
+    )
+    spans = []
+    for entity in candidates:
+        last = spans[-1] if spans else None
+        if last and (entity['start'] < last['end'] or (entity['start'] == last['end'] and entity['label'] == last['label'])):
+            if _rank(entity) > _rank(last):
+                last['label'], last['score'] = entity['label'], entity['score']
+            last['end'] = max(last['end'], entity['end'])
+        else:
+            spans.append({'start': entity['start'], 'end': entity['end'], 'label': entity['label'], 'score': entity['score']})
+    return spans
+
+
+class Redaction:
+    """
+    A redacted text plus the offset map back to the original. `spans` are
+    the resolved entities, each with 'redacted_start'/'redacted_end': where
+    its placeholder sits in `text`.
+    """
+
+    def __init__(self, text: str, spans: List[dict]):
+        self.text = text
+        self.spans = spans
+        self._starts = [span['start'] for span in spans]
+        self._redacted_starts = [span['redacted_start'] for span in spans]
+
+    @property
+    def labels(self) -> List[str]:
+        return sorted({span['label'] for span in self.spans})
+
+    def to_redacted(self, offset: int) -> int:
+        """Offset in the original text -> offset in the redacted text (a redacted character maps to its placeholder's start)."""
+        i = bisect_right(self._starts, offset) - 1
+        if i < 0:
+            return offset
+        span = self.spans[i]
+        if offset < span['end']:
+            return span['redacted_start']
+        return span['redacted_end'] + offset - span['end']
+
+    def to_original(self, offset: int) -> int:
+        """Offset in the redacted text -> offset in the original text (a placeholder character maps to its entity's start)."""
+        i = bisect_right(self._redacted_starts, offset) - 1
+        if i < 0:
+            return offset
+        span = self.spans[i]
+        if offset < span['redacted_end']:
+            return span['start']
+        return span['end'] + offset - span['redacted_end']
+
+def redact(text: str, entities: Iterable[dict], min_score: float = MIN_SCORE) -> Redaction:
+    """
+    Replace entity spans with <LABEL> placeholders in a single pass: spans
+    are resolved first, then the output is joined once, so the cost is
+    linear in the text length plus the number of entities.
+    Returns: Redaction (text, resolved spans, offset map)
+    """
+    spans = resolve_spans(entities, min_score)
+    parts = []
+    cursor = 0
+    length = 0
+    for span in spans:
+        kept = text[cursor:span['start']]
+        replacement = placeholder(span['label'])
+        parts.append(kept)
+        parts.append(replacement)
+        span['redacted_start'] = length + len(kept)
+        length = span['redacted_end'] = span['redacted_start'] + len(replacement)
+        cursor = span['end']
+    parts.append(text[cursor:])
+    return Redaction("".join(parts), spans)
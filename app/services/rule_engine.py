@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Optional
+from app.core.logging_config import logger
+
+try:
+    # RE2 guarantees linear-time matching (no backtracking)
+    import re2
+except ImportError:
+    re2 = None
+    logger.warning("⚠️ 'google-re2' not found. Injection rules fall back to Python 're' (backtracking).")
+
+class CompiledRules:
+    """An immutable, compiled snapshot of one rules file."""
+
+    def __init__(self, version: str, rules: List[dict]):
+        self.version = version
+        self.ids = [rule["id"] for rule in rules]
+        # Identifies the rule set even if an edit forgot to bump "version"
+        self.digest = hashlib.sha256(json.dumps(rules, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+        if re2 is not None:
+            # One automaton for every pattern; Match() returns the indices that hit
+            self.backend = "re2"
+            self._set = re2.Set.SearchSet()
+            for rule in rules:
+                if self._set.Add(rule["pattern"]) < 0:
+                    raise ValueError(f"Invalid RE2 pattern in rule {rule['id']}: {rule['pattern']}")
+            self._set.Compile()
+        else:
+            self.backend = "re"
+            self._patterns = [re.compile(rule["pattern"]) for rule in rules]
+
+    def match(self, text: str) -> List[str]:
+        if self.backend == "re2":
+            return [self.ids[i] for i in sorted(self._set.Match(text) or [])]
+        return [rule_id for rule_id, pattern in zip(self.ids, self._patterns) if pattern.search(text)]
+
+
+class InjectionRuleEngine:
+    """
+    Loads injection rules from a versioned JSON file and matches all of them
+    in a single pass. The file is re-read when its mtime changes (checked at
+    most every `reload_seconds`); a broken file is logged and the previous
+    rules stay active.
+    """
+
+    def __init__(self, path: str, reload_seconds: float = 5.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._rules: Optional[CompiledRules] = None
+        self._mtime = None
+        self._last_check = 0.0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.loaded_at = None
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile the rules file if it changed. Returns True if new rules were loaded."""
+        with self._lock:
+            self._last_check = time.time()
+            try:
+                mtime = os.path.getmtime(self.path)
+                if not force and mtime == self._mtime:
+                    return False
+                with open(self.path) as f:
+                    data = json.load(f)
+                rules = CompiledRules(str(data["version"]), data["rules"])
+            except Exception as e:
+                self.reload_errors += 1
+                if self._rules is None:
+                    raise
+                logger.error(f"❌ Failed to reload injection rules from {self.path}: {e}")
+                return False
+
+            self._rules = rules
+            self._mtime = mtime
+            self.reloads += 1
+            self.loaded_at = time.time()
+            logger.info(f"📜 Loaded {len(rules.ids)} injection rules (version {rules.version}, {rules.backend})")
+            return True
+
+    def match(self, text: str) -> List[str]:
+        """IDs of every rule that matches text."""
+        if time.time() - self._last_check > self.reload_seconds:
+            self.reload()
+        return self._rules.match(text)
+
+    @property
+    def version(self) -> str:
+        """Identity of the active rule set ("<version>-<digest>"), after a reload check if one is due."""
+        if time.time() - self._last_check > self.reload_seconds:
+            self.reload()
+        return f"{self._rules.version}-{self._rules.digest}"
+
+    def stats(self) -> dict:
+        rules = self._rules
+        return {
+            "path": self.path,
+            "version": rules.version,
+            "backend": rules.backend,
+            "rules": rules.ids,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "loaded_at": self.loaded_at,
+        }
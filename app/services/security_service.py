@@ -1,40 +1,23 @@
-import re
+from typing import List, Optional
 
+from app.core.config import settings
+from app.services.profanity_service import get_profanity_matcher
+from app.services.rule_engine import InjectionRuleEngine
 from app.services.semantic_service import semantic_scanner
-from better_profanity import profanity
 
 class SecurityScanner:
     def __init__(self):
-        # MVP: Simple Regex Patterns for common jailbreaks
-        self.injection_patterns = [
-            r"ignore all previous instructions",
-            r"ignore previous instructions",
-            r"ignore.*instructions",
-            r"do anything now",
-            r"dan mode",
-            r"jailbreak",
-            r"you are now",
-            r"act as",
-            r"simulate",
-        ]
-        # Initialize toxicity filter
-        profanity.load_censor_words()
+        # Versioned, hot-reloaded regex rules for common jailbreaks (app/rules/injection_rules.json)
+        self.rule_engine = InjectionRuleEngine(settings.INJECTION_RULES_PATH, settings.INJECTION_RULES_RELOAD_SECONDS)
 
     def scan(self, text: str):
         """
         Checks for prompt injection and toxicity.
         Returns: (is_safe: bool, reason: str | None, score: float)
         """
-        # 1. Fast Regex Check
-        text_lower = text.lower()
-        for pattern in self.injection_patterns:
-            if re.search(pattern, text_lower):
-                return False, "POTENTIAL_PROMPT_INJECTION (Regex)", 1.0
-        
-        # 2. Toxicity Check (Basic Profanity - Legacy)
-        # NOTE: We are moving to ToxicityService, but keeping this as fast falback
-        if profanity.contains_profanity(text):
-             return False, "TOXIC_CONTENT_DETECTED", 1.0
+        verdict = self._scan_fast(text)
+        if verdict:
+            return verdict
 
         # 3. Semantic Check (Slower but Smarter)
         if semantic_scanner:
@@ -44,4 +27,56 @@ class SecurityScanner:
 
         return True, None, 0.0
 
+    def scan_batch(self, texts: List[str], batch_size: int = 32):
+        """
+        Batched variant of scan. The cheap checks run per text; every text that
+        passes them goes through a single semantic encode call.
+        Returns: list of (is_safe, reason, score), in input order.
+        """
+        results = self.scan_rules_batch(texts)
+        pending = [i for i, (is_safe, _, _) in enumerate(results) if is_safe]
+
+        if pending:
+            semantic = self.scan_semantic_batch([texts[i] for i in pending], batch_size=batch_size)
+            for i, verdict in zip(pending, semantic):
+                results[i] = verdict
+
+        return results
+
+    def scan_rules_batch(self, texts: List[str], profanity_words: Optional[List[Optional[List[str]]]] = None):
+        """
+        Regex and profanity checks only (microseconds per text).
+        `profanity_words` optionally gives each text's tenant words, added to the default list.
+        """
+        profanity_words = profanity_words or [None] * len(texts)
+        return [self._scan_fast(text, words) or (True, None, 0.0) for text, words in zip(texts, profanity_words)]
+
+    def scan_semantic_batch(self, texts: List[str], batch_size: int = 32):
+        """Semantic similarity check only, as one encode call."""
+        if not semantic_scanner or not texts:
+            return [(True, None, 0.0) for _ in texts]
+
+        results = []
+        for is_safe, score, match in semantic_scanner.check_similarity_batch(texts, batch_size=batch_size):
+            if is_safe:
+                results.append((True, None, 0.0))
+            else:
+                results.append((False, f"POTENTIAL_PROMPT_INJECTION (Semantic: {match})", score))
+        return results
+
+    def _scan_fast(self, text: str, profanity_words: Optional[List[str]] = None):
+        """Regex and profanity checks. Returns a block verdict or None."""
+        # 1. Fast Regex Check (all rules in one pass)
+        matched = self.rule_engine.match(text.lower())
+        if matched:
+            return False, f"POTENTIAL_PROMPT_INJECTION (Regex: {', '.join(matched)})", 1.0
+        
+        # 2. Toxicity Check (Basic Profanity - Legacy)
+        # NOTE: We are moving to ToxicityService, but keeping this as fast falback
+        matcher = get_profanity_matcher(tuple(profanity_words) if profanity_words else None)
+        if matcher.contains_profanity(text):
+             return False, "TOXIC_CONTENT_DETECTED", 1.0
+
+        return None
+
 security_scanner = SecurityScanner()
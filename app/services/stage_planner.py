@@ -0,0 +1,90 @@
+import threading
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+class StageStats:
+    """Running cost and block-rate measurements for one stage."""
+
+    def __init__(self):
+        self.items = 0
+        self.blocks = 0
+        self.avg_cost_ms = 0.0  # Per item, exponentially weighted
+
+    def record(self, items: int, blocks: int, elapsed_ms: float, alpha: float):
+        cost = elapsed_ms / items
+        self.avg_cost_ms = cost if self.items == 0 else (1 - alpha) * self.avg_cost_ms + alpha * cost
+        self.items += items
+        self.blocks += blocks
+
+    @property
+    def block_rate(self) -> float:
+        # Laplace smoothing keeps unseen stages from looking free or useless
+        return (self.blocks + 1) / (self.items + 2)
+
+    @property
+    def rank(self) -> float:
+        # Expected cost paid per block found; lower runs earlier
+        return self.avg_cost_ms / self.block_rate
+
+    def to_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "blocks": self.blocks,
+            "block_rate": round(self.block_rate, 4),
+            "avg_cost_ms": round(self.avg_cost_ms, 4),
+            "rank": round(self.rank, 4),
+        }
+
+
+class StagePlanner:
+    """
+    Orders guard stages by measured cost / block probability, so cheap stages
+    that block often run first and expensive stages are skipped for prompts
+    that are already blocked.
+
+    Measurements are kept globally and per API key. A key's own numbers are
+    used once every stage has at least `min_samples` items for that key;
+    until then the global numbers decide. Block rates are measured on the
+    traffic that actually reaches a stage.
+    """
+
+    def __init__(self, min_samples: int = 20, alpha: float = 0.1):
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._global: Dict[str, StageStats] = {}
+        self._by_key: Dict[int, Dict[str, StageStats]] = {}
+
+    def record(self, stage: str, items: int, blocks: int, elapsed_ms: float, api_key_id: Optional[int] = None):
+        if items <= 0:
+            return
+        with self._lock:
+            self._global.setdefault(stage, StageStats()).record(items, blocks, elapsed_ms, self.alpha)
+            if api_key_id is not None:
+                key_stats = self._by_key.setdefault(api_key_id, {})
+                key_stats.setdefault(stage, StageStats()).record(items, blocks, elapsed_ms, self.alpha)
+
+    def order(self, stages: List[str], api_key_id: Optional[int] = None) -> List[str]:
+        """Return stages sorted by rank; stages without measurements keep their place up front."""
+        with self._lock:
+            table = self._table_for(stages, api_key_id)
+            measured = [s for s in stages if s in table]
+            unmeasured = [s for s in stages if s not in table]
+            return unmeasured + sorted(measured, key=lambda s: table[s].rank)
+
+    def _table_for(self, stages: List[str], api_key_id: Optional[int]) -> Dict[str, StageStats]:
+        key_stats = self._by_key.get(api_key_id) if api_key_id is not None else None
+        if key_stats and all(s in key_stats and key_stats[s].items >= self.min_samples for s in stages):
+            return key_stats
+        return self._global
+
+    def stats(self, api_key_id: Optional[int] = None) -> dict:
+        with self._lock:
+            key_stats = self._by_key.get(api_key_id, {})
+            return {
+                "global": {name: stat.to_dict() for name, stat in self._global.items()},
+                "key": {name: stat.to_dict() for name, stat in key_stats.items()},
+            }
+
+# Singleton
+stage_planner = StagePlanner(min_samples=settings.GUARD_PLANNER_MIN_SAMPLES)
@@ -0,0 +1,127 @@
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.schemas.guard import GuardConfig, GuardResponse
+from app.services.pii_engine import pii_engine
+from app.services.guard_pipeline import guard_pipeline
+
+def inspect_window(window: str, config: GuardConfig, api_key_id: Optional[int] = None) -> Tuple[list, GuardResponse]:
+    """
+    Scan one stream window: PII spans (if enabled) plus the block stages on
+    the redacted window. Stateless, so it can run on any inference worker.
+    Returns: (entities, guard_result)
+    """
+    entities = []
+    scanned = window
+    if config.redact_pii:
+        entities = pii_engine.detect_batch([window], labels=[config.pii_labels])[0]
+        scanned, _ = pii_engine.redact(window, entities)
+
+    # PII is already handled above; the pipeline only runs the block stages
+    scan_config = config.model_copy(update={"redact_pii": False})
+    return entities, guard_pipeline.run(scanned, scan_config, api_key_id)
+
+
+class StreamLimitExceeded(ValueError):
+    """A token would take the stream past max_pending_chars or max_total_chars."""
+
+
+class StreamGuard:
+    """
+    Incremental guard for an LLM output token stream.
+
+    Tokens accumulate in `pending`. Once `chunk_chars + overlap_chars` are
+    pending, the window (the last `overlap_chars` of already-emitted text as
+    left context, plus everything pending) is inspected. Everything except a
+    trailing `overlap_chars` hold-back is emitted, redacted. The hold-back
+    lets an entity or phrase that straddles the boundary be seen whole by
+    the next window. No span is ever cut in two at the emit boundary. Each
+    character is scanned a bounded number of times, so cost grows with the
+    stream length, not quadratically.
+
+    Usage: `push()` tokens; when it returns True, inspect `window()` (off the
+    event loop) and pass the result to `advance()`. At the end of the stream,
+    inspect the final window and call `advance(..., final=True)`.
+    A token that would make `pending` exceed `max_pending_chars`, or the
+    stream exceed `max_total_chars`, raises StreamLimitExceeded.
+    """
+
+    def __init__(self, config: Optional[GuardConfig] = None, chunk_chars: int = settings.STREAM_CHUNK_CHARS, overlap_chars: int = settings.STREAM_OVERLAP_CHARS,
+                 max_pending_chars: int = settings.STREAM_MAX_PENDING_CHARS, max_total_chars: int = settings.STREAM_MAX_TOTAL_CHARS):
+        self.config = config or GuardConfig()
+        self.chunk_chars = chunk_chars
+        self.overlap_chars = overlap_chars
+        self.max_pending_chars = max_pending_chars
+        self.max_total_chars = max_total_chars
+        self.total_chars = 0
+
+        self.context = ""  # Tail of emitted raw text, re-scanned as left context
+        self.pending = ""  # Raw text not yet emitted
+        self.pii_detected = set()
+        self.max_risk_score = 0.0
+        self.result: Optional[GuardResponse] = None  # Set once blocked or finished
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def push(self, token: str) -> bool:
+        """Append a token. Returns True when a window is ready to inspect."""
+        if len(self.pending) + len(token) > self.max_pending_chars:
+            raise StreamLimitExceeded(f"Token too large: more than {self.max_pending_chars} characters pending")
+        if self.total_chars + len(token) > self.max_total_chars:
+            raise StreamLimitExceeded(f"Stream too large: more than {self.max_total_chars} characters")
+        self.total_chars += len(token)
+        self.pending += token
+        return len(self.pending) >= self.chunk_chars + self.overlap_chars
+
+    def window(self) -> str:
+        return self.context + self.pending
+
+    def advance(self, inspection: Tuple[list, GuardResponse], final: bool = False) -> List[dict]:
+        """Apply the inspection of the current window and return the events to send."""
+        entities, verdict = inspection
+
+        if not verdict.safe:
+            # Nothing from the offending window is released
+            self.result = GuardResponse(
+                safe=False,
+                score=verdict.score,
+                reason=verdict.reason,
+                pii_detected=sorted(self.pii_detected)
+            )
+            return [{"event": "block", "reason": verdict.reason, "score": verdict.score}]
+
+        self.max_risk_score = max(self.max_risk_score, verdict.score)
+
+        offset = len(self.context)
+        boundary = len(self.pending) if final else len(self.pending) - self.overlap_chars
+
+        # Don't split an entity: pull the boundary back to its start
+        for entity in entities:
+            start, end = entity['start'] - offset, entity['end'] - offset
+            if 0 <= start < boundary < end:
+                boundary = start
+
+        # Entities inside the region being emitted, in region coordinates
+        region = []
+        for entity in entities:
+            start = max(entity['start'] - offset, 0)
+            end = min(entity['end'] - offset, boundary)
+            if start < end:
+                region.append({**entity, 'start': start, 'end': end})
+
+        emitted, types = pii_engine.redact(self.pending[:boundary], region)
+        self.pii_detected.update(types)
+
+        self.context = (self.context + self.pending[:boundary])[-self.overlap_chars:] if self.overlap_chars else ""
+        self.pending = self.pending[boundary:]
+
+        events = [{"event": "chunk", "text": emitted}] if emitted else []
+        if final:
+            self.result = GuardResponse(
+                safe=True,
+                score=self.max_risk_score,
+                pii_detected=sorted(self.pii_detected)
+            )
+            events.append({"event": "done", "safe": True, "score": self.max_risk_score, "pii_detected": self.result.pii_detected})
+        return events
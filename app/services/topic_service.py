@@ -0,0 +1,87 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+def _trie_regex(words: List[str]) -> str:
+    """
+    Compile words into one regex shaped like a trie, e.g. ["war", "warfare",
+    "weapon"] -> w(?:ar(?:fare)?|eapon). Shared prefixes are matched once and
+    the greedy optional groups make it match the longest word at a position.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class TopicMatcher:
+    """
+    Single-pass matcher for a blocked-topic list.
+
+    All topics are compiled into one trie-shaped regex, tried at every text
+    position via a lookahead, so each scan is one pass in the regex engine
+    however many topics there are. The regex yields the longest topic at a
+    position; shorter topics that are prefixes of it are added from a table
+    built at compile time, so every matched topic is reported.
+    """
+
+    def __init__(self, topics: Tuple[str, ...], whole_words: bool = False, case_sensitive: bool = False):
+        self.topics = topics
+        self.whole_words = whole_words
+        self.case_sensitive = case_sensitive
+
+        self._by_key: Dict[str, List[str]] = {}
+        for topic in topics:
+            key = self._normalize(topic)
+            # An empty topic would match every prompt
+            if key.strip():
+                self._by_key.setdefault(key, []).append(topic)
+
+        keys = sorted(self._by_key)
+        self._prefixes = {key: [other for other in keys if other != key and key.startswith(other)] for key in keys}
+
+        body = _trie_regex(keys) if keys else None
+        if body is None:
+            self._pattern = None
+        elif whole_words:
+            self._pattern = re.compile(rf"(?=(?<!\w)({body})(?!\w))")
+        else:
+            self._pattern = re.compile(f"(?=({body}))")
+
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _ends_word(self, text: str, end: int) -> bool:
+        return end >= len(text) or not (text[end].isalnum() or text[end] == "_")
+
+    def find_all(self, text: str) -> List[str]:
+        """Every topic present in text, in topic-list order."""
+        if self._pattern is None:
+            return []
+
+        haystack = self._normalize(text)
+        found = set()
+        for match in self._pattern.finditer(haystack):
+            longest = match.group(1)
+            found.add(longest)
+            for prefix in self._prefixes[longest]:
+                if not self.whole_words or self._ends_word(haystack, match.start(1) + len(prefix)):
+                    found.add(prefix)
+
+        return [topic for topic in self.topics if self._normalize(topic) in found]
+
+@lru_cache(maxsize=1024)
+def get_topic_matcher(topics: Tuple[str, ...], whole_words: bool = False, case_sensitive: bool = False) -> TopicMatcher:
+    """Compiled matcher for a topic list, cached by (topics, options)."""
+    return TopicMatcher(topics, whole_words=whole_words, case_sensitive=case_sensitive)
@@ -0,0 +1,80 @@
+import json
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.profanity_service import get_profanity_matcher
+
+WORD = re.compile(r"[a-z0-9']+")
+
+class ToxicityPrefilter:
+    """
+    First pass of the toxicity cascade: a linear model over the word
+    n-grams of the lowercased text, cheap enough to run on every prompt.
+
+    score = sigmoid(bias + sum of the weights of the distinct n-grams found),
+    plus `profanity_weight` if the profanity matcher finds a listed word.
+    Only strong or stacked cues reach the clear-toxic end. Each weighted
+    term belongs to a toxicity label, reported as a flag for the terms found.
+
+    A low score is no evidence of safety (the lexicon can't list every way
+    to be toxic), so the scorer also reports `coverage`: the fraction of
+    words found in `safe_vocabulary`. Text full of unknown words (other
+    languages, slang, slurs missing from the lexicon) has low coverage.
+    """
+
+    def __init__(self, weights: Dict[str, Dict[str, float]], bias: float = -4.0, profanity_weight: float = 3.0, safe_vocabulary: Optional[Iterable[str]] = None, version: str = "custom"):
+        self.bias = bias
+        self.profanity_weight = profanity_weight
+        self.safe_vocabulary = frozenset(word.lower() for word in safe_vocabulary or ())
+        self.version = version
+
+        self._terms: Dict[str, Tuple[str, float]] = {}  # n-gram -> (label, weight)
+        for label, terms in weights.items():
+            for term, weight in terms.items():
+                self._terms[" ".join(WORD.findall(term.lower()))] = (label, weight)
+        self.max_words = max((term.count(" ") + 1 for term in self._terms), default=1)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ToxicityPrefilter":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        vocabulary = []
+        if data.get("safe_vocabulary"):
+            with open(os.path.join(os.path.dirname(path), data["safe_vocabulary"]), encoding="utf-8") as f:
+                vocabulary = [row.strip() for row in f if row.strip()]
+        return cls(
+            data["weights"],
+            bias=data.get("bias", -4.0),
+            profanity_weight=data.get("profanity_weight", 3.0),
+            safe_vocabulary=vocabulary,
+            version=data.get("version", "unknown")
+        )
+
+    def score(self, text: str) -> Tuple[float, List[str], float]:
+        """
+        Returns: (probability-like score in (0, 1), labels of the cues found,
+        fraction of words in the safe vocabulary; 1.0 for text without words)
+        """
+        lowered = text.lower()
+        words = WORD.findall(lowered)
+        known = sum(1 for word in words if word in self.safe_vocabulary or word.isdigit())
+        coverage = known / len(words) if words else 1.0
+        logit = self.bias
+        labels = set()
+
+        seen = set()
+        for i in range(len(words)):
+            for n in range(1, min(self.max_words, len(words) - i) + 1):
+                gram = " ".join(words[i:i + n])
+                hit = self._terms.get(gram)
+                if hit and gram not in seen:
+                    seen.add(gram)
+                    logit += hit[1]
+                    labels.add(hit[0])
+
+        if self.profanity_weight and get_profanity_matcher().contains_profanity(lowered):
+            logit += self.profanity_weight
+            labels.add("obscene")
+
+        return 1.0 / (1.0 + math.exp(-logit)), sorted(labels), coverage
@@ -1,44 +1,186 @@
-from transformers import pipeline
+import os
+import threading
+from typing import List, Optional
+from app.core.config import settings
 from app.core.logging_config import logger
+from app.core.model_registry import model_registry, tensor_bytes
+from app.services.chunking import in_order, length_buckets, length_order, split_batch
+from app.services.inference_backend import OnnxSequenceClassifier, backend_for, class_scores, onnx_path, pad_token_ids, quantize_torch
+from app.services.toxicity_prefilter import ToxicityPrefilter
 import time
 
 class ToxicityService:
-    def __init__(self):
+    def __init__(self, backend: str = None, cascade: bool = None, safe_below: float = None, toxic_above: float = None, safe_coverage: float = None):
         self.pipeline = None
         # This model is fine-tuned for toxicity detection and is relatively fast (RoBERTa based)
         self.model_name = "unitary/unbiased-toxic-roberta"
+        self.backend = backend or backend_for("toxicity")
+        self._load_lock = threading.Lock()
+
+        # Cascade: a cheap first pass decides clear cases; only the band in between reaches the model
+        self.cascade = settings.TOXICITY_CASCADE if cascade is None else cascade
+        self.safe_below = settings.TOXICITY_CASCADE_SAFE_BELOW if safe_below is None else safe_below
+        self.toxic_above = settings.TOXICITY_CASCADE_TOXIC_ABOVE if toxic_above is None else toxic_above
+        self.safe_coverage = settings.TOXICITY_CASCADE_SAFE_COVERAGE if safe_coverage is None else safe_coverage
+        self._prefilter: Optional[ToxicityPrefilter] = None
+        self._stats_lock = threading.Lock()  # scan_batch runs on several executor threads
+
+        # Cascade stats
+        self.prefiltered = 0   # Texts scored by the first pass
+        self.decided_safe = 0
+        self.decided_toxic = 0
+        self.escalated = 0     # Texts in the band, sent to the model
 
     def load_model(self):
-        """Lazy load the model."""
-        if not self.pipeline:
-            logger.info(f"☣️ Loading Toxicity model: {self.model_name}...")
+        """Lazy load the model (once, even when called from several threads)."""
+        if self.pipeline:
+            return
+        with self._load_lock:
+            if self.pipeline:
+                return
+            logger.info(f"☣️ Loading Toxicity model: {self.model_name} ({self.backend})...")
             start = time.time()
             try:
-                # Returns a list of dicts: [{'label': 'toxicity', 'score': 0.99}, ...]
-                self.pipeline = pipeline("text-classification", model=self.model_name, top_k=None)
+                if self.backend.startswith("onnx"):
+                    # Same call signature and output as the pipeline below
+                    self.pipeline = OnnxSequenceClassifier(*onnx_path(self.model_name, self.backend))
+                else:
+                    from transformers import pipeline
+                    # Returns a list of dicts: [{'label': 'toxicity', 'score': 0.99}, ...]
+                    self.pipeline = pipeline("text-classification", model=self.model_name, top_k=None)
+                    if self.backend == "torch-int8":
+                        quantize_torch(self.pipeline.model)
                 logger.info(f"✅ Toxicity model loaded in {time.time() - start:.2f}s")
             except Exception as e:
                 logger.error(f"❌ Failed to load Toxicity model: {e}")
                 raise e
 
+    @property
+    def is_loaded(self) -> bool:
+        return self.pipeline is not None
+
+    def unload_model(self):
+        self.pipeline = None
+
+    def memory_bytes(self) -> int:
+        if isinstance(self.pipeline, OnnxSequenceClassifier):
+            return os.path.getsize(self.pipeline.path)
+        return tensor_bytes(self.pipeline.model)
+
+    @property
+    def max_window_tokens(self) -> int:
+        # Some tokenizers report a huge sentinel model_max_length; RoBERTa tops out at 512
+        return min(self.pipeline.tokenizer.model_max_length, 512) - 2
+
     def scan(self, text: str, threshold: float = 0.7):
         """
         Scans text for toxic attributes.
         Returns: (is_toxic, score, list_of_flags)
         """
-        if not self.pipeline:
-            self.load_model()
+        return self.scan_batch([text], threshold=threshold)[0]
 
-        if not text:
-            return False, 0.0, []
+    @property
+    def prefilter(self) -> ToxicityPrefilter:
+        if self._prefilter is None:
+            self._prefilter = ToxicityPrefilter.from_file(settings.TOXICITY_PREFILTER_PATH)
+        return self._prefilter
 
-        # Run prediction
-        # Output format: [[{'label': 'toxicity', 'score': 0.9}, {'label': 'severe_toxicity', ...}]]
-        results = self.pipeline(text)
-        
-        # Flatten the list (pipeline returns a list of lists for single input)
-        scores = results[0]
-        
+    def scan_batch(self, texts: List[str], threshold: float = 0.7, batch_size: int = 8):
+        """
+        Batched variant of scan: one pipeline call for all texts.
+        Texts longer than the model's window are split into overlapping
+        windows; each label scores as its maximum over a text's windows.
+        In cascade mode, the first pass decides a text without the model
+        when it scores at least `toxic_above` (toxic), or below `safe_below`
+        with at least `safe_coverage` of its words in the safe vocabulary
+        (safe: no cue is not enough on its own).
+        Returns: list of (is_toxic, score, list_of_flags), in input order.
+        """
+        if not self.cascade:
+            with model_registry.use(self):
+                return self._scan_batch(texts, threshold, batch_size)
+
+        results = [None] * len(texts)
+        escalate = []
+        safe = toxic = 0
+        for i, text in enumerate(texts):
+            score, labels, coverage = self.prefilter.score(text)
+            if score >= self.toxic_above and score > threshold:
+                results[i] = (True, score, labels)
+                toxic += 1
+            elif score < self.safe_below and not labels and coverage >= self.safe_coverage:
+                results[i] = (False, score, [])
+                safe += 1
+            else:
+                escalate.append(i)
+        with self._stats_lock:
+            self.prefiltered += len(texts)
+            self.decided_safe += safe
+            self.decided_toxic += toxic
+            self.escalated += len(escalate)
+
+        if escalate:
+            with model_registry.use(self):
+                for i, result in zip(escalate, self._scan_batch([texts[i] for i in escalate], threshold, batch_size)):
+                    results[i] = result
+        return results
+
+    def stats(self) -> dict:
+        """Cascade counters: how much traffic the first pass kept away from the model."""
+        return {
+            "cascade": self.cascade,
+            "safe_below": self.safe_below,
+            "toxic_above": self.toxic_above,
+            "safe_coverage": self.safe_coverage,
+            "prefilter_version": self._prefilter.version if self._prefilter else None,
+            "prefiltered": self.prefiltered,
+            "decided_safe": self.decided_safe,
+            "decided_toxic": self.decided_toxic,
+            "escalated": self.escalated,
+            "escalated_fraction": round(self.escalated / self.prefiltered, 4) if self.prefiltered else 0.0,
+        }
+
+    def _scan_batch(self, texts: List[str], threshold: float, batch_size: int):
+        results = [(False, 0.0, []) for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text]
+        if not indices:
+            return results
+
+        windows = split_batch([texts[i] for i in indices], self.max_window_tokens, settings.CHUNK_OVERLAP_TOKENS, self.pipeline.tokenizer)
+
+        # Output format: [[{'label': 'toxicity', 'score': 0.9}, {'label': 'severe_toxicity', ...}], ...]
+        window_scores = self._classify(windows, batch_size)
+
+        label_max = [{} for _ in indices]
+        for owner, scores in zip(windows.owners, window_scores):
+            for item in scores:
+                label_max[owner][item['label']] = max(label_max[owner].get(item['label'], 0.0), item['score'])
+
+        for i, labels in zip(indices, label_max):
+            results[i] = self._score([{'label': label, 'score': score} for label, score in labels.items()], threshold)
+
+        return results
+
+    def _classify(self, windows, batch_size: int):
+        """
+        Label scores of every window, in window order. Windows run in batches
+        of similar token length, from the ids split_batch already computed.
+        """
+        if windows.token_ids is None:
+            # Slow tokenizer: the pipeline tokenizes, we still batch by length
+            order = length_order(windows.lengths)
+            return in_order(order, self.pipeline([windows.texts[i] for i in order], batch_size=batch_size))
+
+        window_scores = [None] * len(windows.texts)
+        for batch in length_buckets(windows.lengths, batch_size):
+            input_ids, attention_mask = pad_token_ids(self.pipeline.tokenizer, [windows.token_ids[i] for i in batch])
+            labels, scores = class_scores(self.pipeline, input_ids, attention_mask)
+            for i, row in zip(batch, scores):
+                window_scores[i] = [{'label': label, 'score': float(score)} for label, score in zip(labels, row)]
+        return window_scores
+
+    def _score(self, scores: list, threshold: float):
+        """Reduce the per-label pipeline output to (is_toxic, max_score, flags)."""
         flags = []
         max_score = 0.0
 
@@ -63,3 +205,4 @@ class ToxicityService:
 
 # Singleton
 toxicity_scanner = ToxicityService()
+model_registry.register("toxicity", toxicity_scanner)
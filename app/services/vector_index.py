@@ -0,0 +1,298 @@
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# (exemplar_id, cosine similarity), best first
+Hits = List[Tuple[str, float]]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (float32), so inner product == cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k (indices, scores) of a (queries, candidates) matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    top = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class Rows:
+    """
+    Immutable snapshot of an index's rows: `base` (from load(), possibly a
+    read-only memory map), `extra` (appended since, in memory) and an
+    `alive` mask (removed rows are tombstoned, not moved). Mutations build a
+    new snapshot, so searches never need a lock.
+    """
+
+    def __init__(self, ids: List[str], base: np.ndarray, extra: np.ndarray, alive: np.ndarray):
+        self.ids = ids
+        self.base = base
+        self.extra = extra
+        self.alive = alive
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """float32 vectors of the given row numbers."""
+        if not len(self.extra):
+            return np.asarray(self.base[rows], dtype=np.float32)
+        n = len(self.base)
+        out = np.empty((len(rows), self.base.shape[1]), dtype=np.float32)
+        in_base = rows < n
+        out[in_base] = self.base[rows[in_base]]
+        out[~in_base] = self.extra[rows[~in_base] - n]
+        return out
+
+    def chunks(self, size: int = 16384):
+        """(first row, float32 block) over all rows; float16 is upcast a block at a time."""
+        for matrix, offset in ((self.base, 0), (self.extra, len(self.base))):
+            for i in range(0, len(matrix), size):
+                yield offset + i, np.asarray(matrix[i:i + size], dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over exemplar embeddings. Vectors are normalized
+    on the way in; `search` takes a (queries, dim) matrix and returns the
+    top-k (id, score) hits for each query.
+
+    `add` and `remove` are incremental: added vectors are appended next to
+    the loaded matrix (which stays memory-mapped and shared), removed ones
+    are masked out. Re-adding an existing id replaces its vector.
+    """
+
+    kind = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        empty = np.empty((0, dim), dtype=np.float32)
+        self.rows = Rows([], empty, empty, np.ones(0, dtype=bool))
+        self._positions: Dict[str, int] = {}  # id -> row of its live vector
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, exemplar_id: str) -> bool:
+        return exemplar_id in self._positions
+
+    @property
+    def ids(self) -> List[str]:
+        """Live ids, in row order."""
+        rows = self.rows
+        return [exemplar_id for exemplar_id, alive in zip(rows.ids, rows.alive) if alive]
+
+    def load(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Replace the contents with already-normalized vectors, used as-is (no
+        copy), e.g. a read-only memory-mapped matrix from the embedding store.
+        """
+        if len(ids) != len(vectors):
+            raise ValueError(f"{len(ids)} ids for {len(vectors)} vectors")
+        with self._lock:
+            self._positions = {exemplar_id: i for i, exemplar_id in enumerate(ids)}
+            self.rows = Rows(list(ids), vectors, np.empty((0, self.dim), dtype=np.float32), np.ones(len(ids), dtype=bool))
+            self._changed(0)
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = normalize(vectors)
+        if len(ids) != len(vectors):
+            raise ValueError(f"{len(ids)} ids for {len(vectors)} vectors")
+        with self._lock:
+            rows = self.rows
+            alive = rows.alive.copy()
+            replaced = [self._positions[i] for i in ids if i in self._positions]
+            alive[replaced] = False
+
+            start = len(rows)
+            self.rows = Rows(
+                rows.ids + list(ids),
+                rows.base,
+                np.concatenate([rows.extra, vectors]),
+                np.concatenate([alive, np.ones(len(ids), dtype=bool)])
+            )
+            self._positions.update((exemplar_id, start + i) for i, exemplar_id in enumerate(ids))
+            self._changed(start)
+
+    def remove(self, ids: Sequence[str]) -> List[str]:
+        """Drop vectors by id. Returns: the ids that were present."""
+        with self._lock:
+            removed = [i for i in dict.fromkeys(ids) if i in self._positions]
+            if removed:
+                rows = self.rows
+                alive = rows.alive.copy()
+                alive[[self._positions.pop(i) for i in removed]] = False
+                self.rows = Rows(rows.ids, rows.base, rows.extra, alive)
+            return removed
+
+    def _changed(self, start: int):
+        """Hook: rows from `start` on are new (called under the lock)."""
+
+    def search(self, queries: np.ndarray, k: int = 1) -> List[Hits]:
+        raise NotImplementedError
+
+    def _hits(self, rows: Rows, candidates: np.ndarray, scores: np.ndarray, k: int) -> List[Hits]:
+        """Top-k hits per query from a (queries, candidates) score matrix, skipping removed rows."""
+        alive = rows.alive[candidates]
+        if not alive.all():
+            scores = np.where(alive, scores, -np.inf)
+        idx, top = _top_k(scores, k)
+        return [
+            [(rows.ids[candidates[i]], float(s)) for i, s in zip(row_idx, row_scores) if s > -np.inf]
+            for row_idx, row_scores in zip(idx, top)
+        ]
+
+    def _scan_all(self, rows: Rows, queries: np.ndarray, k: int) -> List[Hits]:
+        """(queries x corpus) matmul, then row-wise top-k."""
+        scores = np.empty((len(queries), len(rows)), dtype=np.float32)
+        for start, block in rows.chunks():
+            scores[:, start:start + len(block)] = queries @ block.T
+        return self._hits(rows, np.arange(len(rows)), scores, k)
+
+    def stats(self) -> dict:
+        rows = self.rows
+        return {
+            "kind": self.kind,
+            "size": len(self),
+            "dim": self.dim,
+            "loaded": len(rows.base),
+            "appended": len(rows.extra),
+            "removed": int((~rows.alive).sum()),
+        }
+
+
+class ExactIndex(VectorIndex):
+    """Brute force: one (queries x corpus) matmul, then top-k. Exact results."""
+
+    kind = "exact"
+
+    def search(self, queries: np.ndarray, k: int = 1) -> List[Hits]:
+        queries = normalize(queries)
+        rows = self.rows
+        if not len(rows):
+            return [[] for _ in queries]
+        return self._scan_all(rows, queries, k)
+
+
+class Clusters:
+    """Immutable IVF state: centroids and the row numbers of each list."""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_size: int):
+        self.centroids = centroids
+        self.assignments = assignments
+        self.trained_size = trained_size
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(centroids))]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(vectors @ centroids.T, axis=1) if len(vectors) else np.empty(0, dtype=np.int64)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: vectors are clustered with spherical k-means into
+    `n_lists` lists (default ~sqrt(n)), and a query only scans the `n_probe`
+    lists whose centroids are closest. Query cost grows with ~sqrt(n)
+    instead of n, at the price of occasionally missing a neighbour that sits
+    in an unprobed list.
+
+    Clustering is (re)trained lazily on the first search after the corpus
+    has doubled since the last training; vectors added in between are
+    assigned to their nearest existing list. Below `min_train_size` vectors
+    the index scans everything, like ExactIndex.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim: int, n_lists: int = 0, n_probe: int = 8, min_train_size: int = 1024, iterations: int = 10, seed: int = 0):
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.iterations = iterations
+        self.seed = seed
+        self.clusters: Optional[Clusters] = None
+
+    def _changed(self, start: int):
+        if start == 0:
+            self.clusters = None
+        elif self.clusters is not None:
+            clusters = self.clusters
+            new_rows = np.arange(start, len(self.rows))
+            assigned = np.concatenate([clusters.assignments, _assign(self.rows.take(new_rows), clusters.centroids)])
+            self.clusters = Clusters(clusters.centroids, assigned, clusters.trained_size)
+
+    def train(self):
+        """Cluster the current corpus and rebuild the inverted lists (call under the lock)."""
+        rows = self.rows
+        vectors = rows.take(np.flatnonzero(rows.alive))
+        n = len(vectors)
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+
+        centroids = vectors[rng.choice(n, n_lists, replace=False)]
+        for _ in range(self.iterations):
+            assigned = _assign(vectors, centroids)
+            counts = np.bincount(assigned, minlength=n_lists)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            filled = counts > 0
+            # Sum of each list's members in one pass over the sorted vectors
+            centroids[filled] = np.add.reduceat(vectors[np.argsort(assigned, kind="stable")], starts[filled])
+            # Re-seed empty lists with random vectors
+            centroids[~filled] = vectors[rng.integers(n, size=int((~filled).sum()))]
+            centroids = normalize(centroids)
+
+        # Assign every row (removed ones too; they're filtered at search time)
+        assignments = np.concatenate([_assign(block, centroids) for _, block in rows.chunks()])
+        self.clusters = Clusters(centroids, assignments, n)
+
+    def search(self, queries: np.ndarray, k: int = 1) -> List[Hits]:
+        queries = normalize(queries)
+        if len(self) < self.min_train_size:
+            rows = self.rows
+            return self._scan_all(rows, queries, k) if len(rows) else [[] for _ in queries]
+
+        with self._lock:
+            if self.clusters is None or len(self) >= 2 * self.clusters.trained_size:
+                self.train()
+            clusters, rows = self.clusters, self.rows
+
+        results = []
+        probes, _ = _top_k(queries @ clusters.centroids.T, self.n_probe)
+        for query, probed in zip(queries, probes):
+            candidates = np.concatenate([clusters.lists[c] for c in probed])
+            if not len(candidates):
+                results.append([])
+                continue
+            results.extend(self._hits(rows, candidates, (rows.take(candidates) @ query)[None, :], k))
+        return results
+
+    def stats(self) -> dict:
+        clusters = self.clusters
+        return {
+            **super().stats(),
+            "lists": 0 if clusters is None else len(clusters.centroids),
+            "n_probe": self.n_probe,
+            "trained_size": 0 if clusters is None else clusters.trained_size,
+        }
+
+
+def build_index(kind: str, dim: int, **options) -> VectorIndex:
+    """Index backend by name: "exact" or "ivf" (options go to IVFIndex)."""
+    if kind == "exact":
+        return ExactIndex(dim)
+    if kind == "ivf":
+        return IVFIndex(dim, **options)
+    raise ValueError(f"Unknown vector index kind: {kind}")
@@ -0,0 +1,18 @@
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.services.gliner_service import gliner_service
+from app.services.profanity_service import get_profanity_matcher
+from app.services.semantic_service import semantic_scanner
+from app.services.toxicity_service import toxicity_scanner
+
+# One short and one long input, so warmup exercises more than one shape
+WARMUP_TEXTS = ["Hello, how are you?", "Please summarize the following meeting notes for John Smith. " * 20]
+
+def register_models(loader):
+    """Register every model the guard pipeline uses (load + warmup) with a ModelLoader."""
+    loader.register("profanity", get_profanity_matcher)
+    if semantic_scanner:
+        loader.register("semantic", lambda: model_registry.load("semantic"), lambda: semantic_scanner.nearest_batch(WARMUP_TEXTS, k=1))
+    loader.register("toxicity", lambda: model_registry.load("toxicity"), lambda: toxicity_scanner.scan_batch(WARMUP_TEXTS))
+    if settings.PII_MODE != "regex-only":
+        loader.register("gliner", lambda: model_registry.load("gliner"), lambda: gliner_service.detect_batch(WARMUP_TEXTS))
@@ -0,0 +1,28 @@
+"""
+Stats of the process that runs inference. Module-level functions, so that
+with INFERENCE_EXECUTOR=remote the API can send them by reference to each
+inference worker (RemoteInferenceExecutor.collect) instead of reading its
+own, idle, state.
+"""
+from typing import Optional
+from app.core.model_registry import model_registry
+from app.services.guard_pipeline import guard_pipeline
+from app.services.stage_planner import stage_planner
+from app.services.toxicity_service import toxicity_scanner
+
+def planner_stats(api_key_id: Optional[int] = None) -> dict:
+    """Returns: stage orders (default, global, for the key) and the planner measurements."""
+    names = guard_pipeline.stage_names
+    return {
+        "adaptive": guard_pipeline.adaptive,
+        "default_order": names,
+        "global_order": stage_planner.order(names),
+        "key_order": stage_planner.order(names, api_key_id),
+        **stage_planner.stats(api_key_id)
+    }
+
+def model_stats() -> dict:
+    return model_registry.stats()
+
+def toxicity_stats() -> dict:
+    return toxicity_scanner.stats()
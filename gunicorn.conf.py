@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for running several workers per node:
+
+    gunicorn main:app -c gunicorn.conf.py
+
+With MODEL_PRELOAD_BEFORE_FORK (default), the master imports the app and
+loads + warms the MODEL_PRELOAD models before forking the workers, so every
+worker shares one physical copy of the weights (copy-on-write) instead of
+loading its own. scripts/measure_worker_pss.py shows the effect. With INFERENCE_EXECUTOR=remote
+the workers hold no models (inference_server.py does), so nothing is preloaded.
+"""
+import os
+
+from app.core.config import settings
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = 120
+preload_app = settings.MODEL_PRELOAD_BEFORE_FORK
+
+def when_ready(server):
+    """Runs in the master once the app is imported, before the first worker is forked."""
+    if not preload_app or settings.INFERENCE_EXECUTOR == "remote":
+        return
+    from app.core.model_loader import model_loader, preload_for_fork
+    import main  # noqa: F401 - already imported by preload_app; registers the models
+
+    preload_for_fork(model_loader, settings.MODEL_PRELOAD)
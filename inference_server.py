@@ -0,0 +1,125 @@
+"""
+Local inference server: a pool of worker processes that hold the models and
+serve guard jobs to API processes over Unix sockets.
+
+    python inference_server.py --workers 2 &
+    INFERENCE_EXECUTOR=remote gunicorn main:app -c gunicorn.conf.py
+
+The parent loads and warms MODEL_PRELOAD once, then forks the workers so
+they share the weights copy-on-write, and restarts any worker that dies.
+Each worker listens on <INFERENCE_SOCKET_DIR>/worker-<n>.sock and
+micro-batches guard requests from every API process together. Exemplar
+changes made through the API reach the workers only via Redis
+(SEMANTIC_EXEMPLARS_REDIS).
+"""
+import argparse
+import asyncio
+import glob
+import multiprocessing
+import os
+import signal
+import time
+
+from app.core.config import settings
+from app.core.executor import InferenceExecutor
+from app.core.logging_config import logger
+from app.core.model_loader import model_loader, preload_for_fork
+from app.core.remote_executor import InferenceWorkerServer, socket_path
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.services.exemplar_service import exemplar_registry
+from app.services.guard_pipeline import run_guard_batch
+from app.services.warmup import register_models
+
+async def serve_worker(path: str):
+    """One worker process: serve its socket until SIGTERM/SIGINT."""
+    executor = InferenceExecutor(
+        kind="thread",
+        max_workers=settings.INFERENCE_WORKERS,
+        max_queue=settings.INFERENCE_MAX_QUEUE,
+        torch_threads=settings.INFERENCE_TORCH_THREADS
+    )
+    scheduler = MicroBatchScheduler(
+        run_guard_batch,
+        max_batch_size=settings.MICROBATCH_MAX_SIZE,
+        max_wait_ms=settings.MICROBATCH_MAX_WAIT_MS,
+        executor=executor
+    )
+    server = InferenceWorkerServer(
+        path,
+        executor,
+        batchers={run_guard_batch: scheduler},
+        max_outstanding=settings.INFERENCE_WORKERS + settings.INFERENCE_MAX_QUEUE,
+        health=lambda: {**model_loader.state(), "executor": executor.stats(), "scheduler": scheduler.stats()}
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    # This process runs the semantic check, whatever INFERENCE_EXECUTOR the API processes use
+    exemplar_registry.detects_locally = True
+
+    # Models the parent preloaded are already here; this loads the rest (ONNX) and warms up
+    await model_loader.start(settings.MODEL_PRELOAD)
+    await exemplar_registry.start()
+    await server.start()
+    logger.info(f"🛰️ Inference worker {os.getpid()} listening on {path}")
+    await stop.wait()
+
+    await server.close()
+    await scheduler.close()
+    await model_loader.close()
+    await exemplar_registry.close()
+    executor.shutdown()
+
+def _worker_main(path: str):
+    asyncio.run(serve_worker(path))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=settings.INFERENCE_SERVER_WORKERS)
+    parser.add_argument("--socket-dir", default=settings.INFERENCE_SOCKET_DIR)
+    args = parser.parse_args()
+
+    # Only this user may connect: jobs are pickles
+    os.makedirs(args.socket_dir, mode=0o700, exist_ok=True)
+    os.chmod(args.socket_dir, 0o700)
+    for stale in glob.glob(os.path.join(args.socket_dir, "worker-*.sock")):
+        os.unlink(stale)
+
+    register_models(model_loader)
+    preload_for_fork(model_loader, settings.MODEL_PRELOAD)
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    context = multiprocessing.get_context("fork")
+    processes = {}
+    while not stopping:
+        for i in range(args.workers):
+            process = processes.get(i)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning(f"⚠️ Inference worker {i} exited with code {process.exitcode}; restarting")
+            processes[i] = context.Process(target=_worker_main, args=(socket_path(args.socket_dir, i),), name=f"inference-worker-{i}")
+            processes[i].start()
+        time.sleep(1.0)
+
+    logger.info("🛑 Stopping inference workers")
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+    for path in glob.glob(os.path.join(args.socket_dir, "worker-*.sock")):
+        os.unlink(path)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 import sentry_sdk
 from sentry_sdk.integrations.logging import LoggingIntegration
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
@@ -10,8 +13,14 @@ from slowapi.middleware import SlowAPIMiddleware
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.core.limiter import limiter
+from app.core.executor import inference_executor
+from app.core.model_loader import model_loader
+from app.services.guard_pipeline import guard_scheduler
+from app.services.exemplar_service import exemplar_registry
+from app.services.audit_service import audit_writer
+from app.services.warmup import register_models
 
-# Initialize database tables
+# Database tables (registered on Base by the model imports)
 from app.core.database import engine, Base
 from app.models.user import User, ApiKey
 from app.models.audit_log import AuditLog
@@ -31,12 +40,29 @@ if settings.SENTRY_DSN:
         profiles_sample_rate=1.0,
     )
 
-# Create tables if they don't exist (safe for production)
-Base.metadata.create_all(bind=engine)
+register_models(model_loader)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables if they don't exist (safe for production)
+    await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    # Models load in the background; /ready fails until they are warm.
+    # With remote inference they live in the inference_server.py workers instead.
+    if settings.INFERENCE_EXECUTOR != "remote":
+        await model_loader.start(settings.MODEL_PRELOAD)
+    await exemplar_registry.start()
+    yield
+    await model_loader.close()
+    await guard_scheduler.close()
+    await exemplar_registry.close()
+    # Write out queued audit logs before the process exits
+    await asyncio.to_thread(audit_writer.close)
+    inference_executor.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.state.limiter = limiter
@@ -67,6 +93,20 @@ def health_check():
     """
     return {"status": "ok", "environment": "production" if settings.SENTRY_DSN else "development"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until every model in MODEL_PRELOAD is loaded and
+    warmed up (or if one failed), 200 after. Reports each model's state and
+    load time. /health only says the process is up. With remote inference,
+    ready means every inference worker answers and is ready.
+    """
+    if settings.INFERENCE_EXECUTOR == "remote":
+        state = await inference_executor.health()
+    else:
+        state = model_loader.state()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 # --- Log Noise Filter ---
 class EndpointFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
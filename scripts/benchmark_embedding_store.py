@@ -0,0 +1,38 @@
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.embedding_store import EmbeddingStore
+
+DIM = 384  # all-MiniLM-L6-v2
+SIZES = [1_000, 10_000, 100_000]
+
+def fake_encode(texts):
+    # Stand-in for MiniLM: the real cold start is dominated by this step
+    rng = np.random.default_rng(len(texts))
+    vectors = rng.normal(size=(len(texts), DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main():
+    print(f"{'Corpus':>10}{'cold (encode+save)':>22}{'warm (mmap)':>14}{'matrix':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = EmbeddingStore(directory)
+        for n in SIZES:
+            exemplars = {f"SEM-{i}": f"known jailbreak number {i}" for i in range(n)}
+            start = time.time()
+            store.get_or_build("bench", exemplars, fake_encode)
+            cold = (time.time() - start) * 1000
+            start = time.time()
+            _, vectors = store.get_or_build("bench", exemplars, fake_encode)
+            warm = (time.time() - start) * 1000
+            print(f"{n:>10,}{cold:>19.1f} ms{warm:>11.1f} ms{vectors.nbytes / 2**20:>7.0f} MB")
+    print("\nWarm loads map the file: pages are shared between workers, not copied.")
+    print("Cold numbers exclude real model encoding (~1-3 ms per exemplar on CPU).")
+
+if __name__ == "__main__":
+    main()
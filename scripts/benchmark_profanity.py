@@ -0,0 +1,44 @@
+import sys
+import os
+import random
+import time
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from better_profanity import profanity
+from app.services.profanity_service import default_profanity_matcher
+
+SIZES = {"100 B": 100, "1 KB": 1_000, "10 KB": 10_000, "100 KB": 100_000}
+
+VOCABULARY = (
+    "the quick brown fox jumps over lazy dog please summarize this document "
+    "and list every action item from the meeting notes it's 2024 @team $5"
+).split()
+
+def make_prompt(size):
+    random.seed(size)
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(random.choice(VOCABULARY))
+    return " ".join(words)[:size]
+
+def timed(fn, text, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        fn(text)
+    return (time.time() - start) * 1000 / repeat
+
+def main():
+    profanity.load_censor_words()
+
+    print(f"{'Prompt':<10}{'better_profanity':>20}{'matcher':>14}{'speedup':>10}")
+    for label, size in SIZES.items():
+        text = make_prompt(size)
+        repeat = max(1, 10_000 // size)
+        legacy = timed(profanity.contains_profanity, text, repeat)
+        fast = timed(default_profanity_matcher.contains_profanity, text, repeat)
+        print(f"{label:<10}{legacy:>17.2f} ms{fast:>11.3f} ms{legacy / fast:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import sys
+import os
+import re
+import time
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.rule_engine import InjectionRuleEngine
+
+# The patterns SecurityScanner used to loop over with re.search
+LEGACY_PATTERNS = [
+    r"ignore all previous instructions",
+    r"ignore previous instructions",
+    r"ignore.*instructions",
+    r"do anything now",
+    r"dan mode",
+    r"jailbreak",
+    r"you are now",
+    r"act as",
+    r"simulate",
+]
+
+SIZES = {"1 KB": 1_000, "100 KB": 100_000, "10 MB": 10_000_000}
+
+def legacy_scan(text):
+    for pattern in LEGACY_PATTERNS:
+        if re.search(pattern, text):
+            return True
+    return False
+
+def make_prompt(size, adversarial):
+    # Adversarial: many "ignore" with no "instructions" after them, which makes
+    # the backtracking ".*" rescan the rest of the text from every occurrence
+    unit = "ignore this part. " if adversarial else "a perfectly ordinary sentence. "
+    return (unit * (size // len(unit) + 1))[:size]
+
+def timed(fn, text, budget_s=30):
+    start = time.time()
+    fn(text)
+    elapsed = time.time() - start
+    return f"{elapsed * 1000:10.2f} ms" if elapsed < budget_s else f"{elapsed:9.1f} s (!)"
+
+def main():
+    engine = InjectionRuleEngine(settings.INJECTION_RULES_PATH)
+    print(f"Rule engine backend: {engine.stats()['backend']} ({len(engine.stats()['rules'])} rules)\n")
+
+    print(f"{'Prompt':<22}{'legacy re.search':>20}{'rule engine':>20}")
+    for adversarial in (False, True):
+        for label, size in SIZES.items():
+            text = make_prompt(size, adversarial)
+            name = f"{label} {'adversarial' if adversarial else 'benign'}"
+            # The legacy path is quadratic on adversarial input; skip the 10 MB case
+            legacy = timed(legacy_scan, text) if not (adversarial and size > 100_000) else "   (skipped: O(n^2))"
+            print(f"{name:<22}{legacy:>20}{timed(engine.match, text):>20}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_index import ExactIndex, IVFIndex
+
+DIM = 384  # all-MiniLM-L6-v2
+SIZES = [1_000, 10_000, 100_000, 300_000]
+QUERIES = 32  # One micro-batch of prompt windows
+
+def clustered(n, seed):
+    # Jailbreak corpora are heavily clustered (templates and their paraphrases)
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 50, 1), DIM)).astype(np.float32)
+    return centers[rng.integers(len(centers), size=n)] + 0.3 * rng.normal(size=(n, DIM)).astype(np.float32)
+
+def timed(index, queries, repeat=5):
+    index.search(queries)  # warm up (trains IVF)
+    start = time.time()
+    for _ in range(repeat):
+        hits = index.search(queries)
+    return (time.time() - start) * 1000 / repeat, [h[0][0] for h in hits]
+
+def main():
+    print(f"{QUERIES} queries per search, dim {DIM}\n")
+    print(f"{'Corpus':>10}{'exact':>14}{'ivf':>14}{'ivf recall@1':>16}")
+    for n in SIZES:
+        vectors = clustered(n, seed=0)
+        # Queries are paraphrases of known exemplars
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(n, size=QUERIES)] + 0.2 * rng.normal(size=(QUERIES, DIM)).astype(np.float32)
+        ids = [str(i) for i in range(n)]
+        exact, ivf = ExactIndex(DIM), IVFIndex(DIM, min_train_size=0)
+        exact.add(ids, vectors)
+        ivf.add(ids, vectors)
+
+        exact_ms, truth = timed(exact, queries)
+        ivf_ms, found = timed(ivf, queries)
+        recall = np.mean([a == b for a, b in zip(truth, found)])
+        print(f"{n:>10,}{exact_ms:>11.2f} ms{ivf_ms:>11.2f} ms{recall:>16.2f}")
+
+if __name__ == "__main__":
+    main()
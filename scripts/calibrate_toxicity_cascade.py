@@ -0,0 +1,83 @@
+"""
+Measure the toxicity cascade's first pass on a labelled sample.
+
+    python scripts/calibrate_toxicity_cascade.py sample.jsonl
+    python scripts/calibrate_toxicity_cascade.py prompts.jsonl --label-with-model
+    python scripts/calibrate_toxicity_cascade.py sample.jsonl --safe-below 0.02 --safe-coverage 0.95
+
+Input is JSON lines of {"text": ..., "toxic": true|false}. With
+--label-with-model the "toxic" field is ignored and each text is labelled
+by the RoBERTa model instead (the cascade can at best agree with it).
+
+Per decision the report shows how many texts the first pass decided and
+how many of those it got wrong:
+  - safe:      toxic texts passed without the model (leaked; the recall loss)
+  - toxic:     safe texts flagged without the model
+  - escalated: sent to the model; the fraction is the cost that remains
+Take the sample from real traffic: the vocabulary coverage rule depends on
+what your users write.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.toxicity_service import ToxicityService
+
+def load_sample(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sample")
+    parser.add_argument("--label-with-model", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--safe-below", type=float, default=settings.TOXICITY_CASCADE_SAFE_BELOW)
+    parser.add_argument("--toxic-above", type=float, default=settings.TOXICITY_CASCADE_TOXIC_ABOVE)
+    parser.add_argument("--safe-coverage", type=float, default=settings.TOXICITY_CASCADE_SAFE_COVERAGE)
+    args = parser.parse_args()
+
+    rows = load_sample(args.sample)
+    texts = [row["text"] for row in rows]
+    if args.label_with_model:
+        print(f"Labelling {len(texts)} texts with the model...")
+        model = ToxicityService(cascade=False)
+        labels = [is_toxic for is_toxic, _, _ in model.scan_batch(texts, args.threshold)]
+    else:
+        labels = [bool(row["toxic"]) for row in rows]
+
+    cascade = ToxicityService(cascade=True, safe_below=args.safe_below, toxic_above=args.toxic_above, safe_coverage=args.safe_coverage)
+    decided = {"safe": [0, 0], "toxic": [0, 0], "escalated": [0, 0]}  # decision -> [texts, toxic texts]
+    for text, toxic in zip(texts, labels):
+        score, flags, coverage = cascade.prefilter.score(text)
+        if score >= args.toxic_above and score > args.threshold:
+            decision = "toxic"
+        elif score < args.safe_below and not flags and coverage >= args.safe_coverage:
+            decision = "safe"
+        else:
+            decision = "escalated"
+        decided[decision][0] += 1
+        decided[decision][1] += toxic
+
+    total = len(texts)
+    toxic_total = sum(labels)
+    print(f"\n{total} texts, {toxic_total} toxic "
+          f"(safe_below={args.safe_below}, toxic_above={args.toxic_above}, safe_coverage={args.safe_coverage})")
+    print(f"{'decision':<10} {'texts':>7} {'share':>7} {'precision':>10} {'wrong':>6}")
+    for decision, (count, toxic) in decided.items():
+        wrong = {"safe": toxic, "toxic": count - toxic, "escalated": 0}[decision]
+        precision = f"{1 - wrong / count:.4f}" if count and decision != "escalated" else "-"
+        print(f"{decision:<10} {count:>7} {count / max(total, 1):>7.2%} {precision:>10} {wrong if decision != 'escalated' else '-':>6}")
+
+    leaked = decided["safe"][1]
+    print(f"\nToxic texts leaked as safe: {leaked}/{toxic_total}"
+          + (f" (cascade recall {1 - leaked / toxic_total:.4f}, before the model's own misses)" if toxic_total else ""))
+    print(f"Escalated to the model: {decided['escalated'][0] / max(total, 1):.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Export the guard models to ONNX (fp32 + dynamically quantized int8) for the
+"onnx" / "onnx-int8" inference backends.
+
+    python scripts/export_onnx.py                      # all models
+    python scripts/export_onnx.py toxicity --no-quantize
+
+Graphs land in settings.ONNX_MODEL_DIR/<model name>/. Check them against the
+fp32 path with scripts/check_backend_parity.py before switching
+INFERENCE_BACKENDS over.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add parent dir to path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+# Export from the fp32 models, whatever the configured backends are
+for key in settings.INFERENCE_BACKENDS:
+    settings.INFERENCE_BACKENDS[key] = "torch"
+
+from app.services.inference_backend import export_dir, export_gliner, export_sentence_encoder, export_sequence_classifier
+
+MODELS = ("semantic", "toxicity", "gliner")
+
+def export(model_key: str, quantize: bool) -> str:
+    if model_key == "semantic":
+        from app.services.semantic_service import MODEL_NAME, load_encoder
+        directory = export_dir(MODEL_NAME)
+        export_sentence_encoder(load_encoder("torch"), directory, quantize=quantize)
+    elif model_key == "toxicity":
+        from app.services.toxicity_service import toxicity_scanner
+        toxicity_scanner.load_model()
+        directory = export_dir(toxicity_scanner.model_name)
+        export_sequence_classifier(toxicity_scanner.pipeline.model, toxicity_scanner.pipeline.tokenizer, directory, quantize=quantize)
+    else:
+        from app.services.gliner_service import gliner_service
+        gliner_service.load_model()
+        directory = export_dir(gliner_service.model_name)
+        export_gliner(gliner_service.model, directory, quantize=quantize)
+    return directory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="*", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 graph")
+    args = parser.parse_args()
+
+    for model_key in args.models:
+        print(f"Exporting {model_key}...")
+        start = time.time()
+        directory = export(model_key, quantize=not args.no_quantize)
+        sizes = ", ".join(
+            f"{name}: {os.path.getsize(os.path.join(directory, name)) / 1e6:.1f} MB"
+            for name in sorted(os.listdir(directory)) if name.endswith(".onnx")
+        )
+        print(f"  -> {directory} in {time.time() - start:.1f}s ({sizes})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Memory of a running multi-worker server, per worker: RSS counts shared
+pages in full for every process, PSS splits them among the processes
+sharing them. With copy-on-write model sharing (gunicorn.conf.py), total
+PSS stays close to one worker's RSS instead of growing with the workers.
+
+    gunicorn main:app -c gunicorn.conf.py &
+    python scripts/measure_worker_pss.py <gunicorn master pid>
+
+Run it once the workers report ready (GET /ready), and again after some
+traffic: pages a worker writes to stop being shared. Linux only.
+"""
+import argparse
+import sys
+
+import psutil
+
+MB = 1024 * 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pid", type=int, help="Master (parent) process id")
+    args = parser.parse_args()
+
+    master = psutil.Process(args.pid)
+    processes = [("master", master)] + [("worker", child) for child in master.children(recursive=True)]
+
+    print(f"{'process':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}{'shared MB':>11}")
+    total_rss = total_pss = 0
+    workers = 0
+    for role, process in processes:
+        try:
+            memory = process.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+            print(f"{role:<8}{process.pid:>8}  unavailable ({e.__class__.__name__})")
+            continue
+        # uss = pages only this process maps; the rest of its RSS is shared with someone
+        shared = memory.rss - memory.uss
+        print(f"{role:<8}{process.pid:>8}{memory.rss / MB:>10.0f}{memory.pss / MB:>10.0f}{memory.uss / MB:>10.0f}{shared / MB:>11.0f}")
+        total_rss += memory.rss
+        total_pss += memory.pss
+        workers += role == "worker"
+
+    if not workers:
+        print("No workers found under that pid.")
+        sys.exit(1)
+    print(f"\n{workers} workers: {total_rss / MB:.0f} MB summed RSS, {total_pss / MB:.0f} MB actually used (PSS), "
+          f"sharing saves {100 * (1 - total_pss / total_rss):.0f}%")
+
+if __name__ == "__main__":
+    main()
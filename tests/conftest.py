@@ -6,6 +6,8 @@ from sqlalchemy.pool import StaticPool
 
 import sys
 import os
+# Tests don't load real models at startup (services still load lazily if a test needs one)
+os.environ.setdefault("MODEL_PRELOAD", "[]")
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from main import app as fastapi_app
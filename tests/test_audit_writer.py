@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+from app.services.audit_service import AuditWriter
+
+class RecordingWriter:
+    def __init__(self, block: threading.Event = None):
+        self.flushes = []
+        self.block = block
+
+    def __call__(self, rows):
+        if self.block:
+            self.block.wait(5)
+        self.flushes.append(list(rows))
+
+def test_flushes_by_size_then_by_time():
+    write = RecordingWriter()
+    writer = AuditWriter(write, batch_size=3, flush_interval_ms=100)
+
+    writer.enqueue([{"n": i} for i in range(4)])
+    time.sleep(0.3)
+    # A full batch at once, the leftover row once its interval passed
+    assert [len(rows) for rows in write.flushes] == [3, 1]
+
+    stats = writer.stats()
+    assert stats["written"] == 4 and stats["flushes"] == 2 and stats["largest_flush"] == 3
+    writer.close()
+
+def test_close_drains_the_queue():
+    write = RecordingWriter()
+    writer = AuditWriter(write, batch_size=100, flush_interval_ms=60_000)
+
+    asyncio.run(writer.put([{"n": i} for i in range(10)]))
+    writer.close()
+
+    assert sum(len(rows) for rows in write.flushes) == 10
+    # The next enqueue starts a new writer thread
+    writer.enqueue([{"n": 10}])
+    writer.close()
+    assert write.flushes[-1] == [{"n": 10}]
+
+def test_full_queue_waits_then_drops():
+    release = threading.Event()
+    write = RecordingWriter(block=release)
+    writer = AuditWriter(write, batch_size=1, flush_interval_ms=0, max_queue=2, enqueue_timeout_ms=50)
+
+    # One row is stuck in the blocked flush, two fill the queue, the rest can't fit
+    writer.enqueue([{"n": 0}])
+    time.sleep(0.05)
+    start = time.monotonic()
+    accepted = asyncio.run(writer.put([{"n": i} for i in range(1, 5)]))
+    waited = time.monotonic() - start
+
+    assert accepted == 2
+    assert waited >= 0.04
+    # Rows queued before the queue filled count as queued too
+    assert (writer.stats()["queued"], writer.stats()["dropped"]) == (3, 2)
+
+    release.set()
+    writer.close()
+    assert sum(len(rows) for rows in write.flushes) == 3
+
+def test_failed_flush_is_counted():
+    def broken(rows):
+        raise RuntimeError("database is down")
+
+    writer = AuditWriter(broken, batch_size=10, flush_interval_ms=10)
+    writer.enqueue([{"n": 1}, {"n": 2}])
+    writer.close()
+    assert writer.stats()["failed"] == 2
+
+def test_failed_flush_is_retried_once():
+    write = RecordingWriter()
+    calls = []
+
+    def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        write(rows)
+
+    writer = AuditWriter(flaky, batch_size=10, flush_interval_ms=10)
+    writer.enqueue([{"n": 1}, {"n": 2}])
+    writer.close()
+
+    assert calls == [2, 2]
+    stats = writer.stats()
+    assert (stats["written"], stats["failed"], stats["retries"]) == (2, 0, 1)
+
+def test_bad_row_doesnt_sink_the_batch():
+    write = RecordingWriter()
+
+    def strict(rows):
+        if any(row["n"] is None for row in rows):
+            raise ValueError("NOT NULL constraint failed")
+        write(rows)
+
+    writer = AuditWriter(strict, batch_size=10, flush_interval_ms=10)
+    writer.enqueue([{"n": 1}, {"n": None}, {"n": 3}])
+    writer.close()
+
+    assert write.flushes == [[{"n": 1}], [{"n": 3}]]
+    stats = writer.stats()
+    assert (stats["written"], stats["failed"], stats["row_fallbacks"]) == (2, 1, 1)
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.executor import InferenceExecutor, InferenceQueueFull
+from app.services.batch_scheduler import MicroBatchScheduler
+
+def test_scheduler_coalesces_concurrent_requests():
+    seen_batches = []
+
+    def run_batch(items):
+        seen_batches.append(list(items))
+        return [item * 2 for item in items]
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=8, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+
+    results = asyncio.run(main())
+
+    # Each caller gets its own result, in order, from a single batch
+    assert results == [0, 2, 4, 6, 8]
+    assert seen_batches == [[0, 1, 2, 3, 4]]
+    stats = scheduler.stats()
+    assert stats["batches"] == 1
+    assert stats["largest_batch"] == 5
+    assert stats["max_queue_depth"] == 5
+
+def test_scheduler_respects_max_batch_size():
+    scheduler = MicroBatchScheduler(lambda items: items, max_batch_size=3, max_wait_ms=1000)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(7)))
+
+    assert asyncio.run(main()) == list(range(7))
+    stats = scheduler.stats()
+    assert stats["largest_batch"] == 3
+    assert stats["items"] == 7
+
+def test_scheduler_propagates_errors():
+    def run_batch(items):
+        raise ValueError("model exploded")
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=4, max_wait_ms=1)
+
+    async def main():
+        try:
+            await scheduler.submit("x")
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(main()) == "model exploded"
+
+def test_batches_run_concurrently_up_to_max_in_flight():
+    running = 0
+    overlap = 0
+    lock = threading.Lock()
+
+    def run_batch(items):
+        nonlocal running, overlap
+        with lock:
+            running += 1
+            overlap = max(overlap, running)
+        time.sleep(0.2)
+        with lock:
+            running -= 1
+        return items
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=2, max_wait_ms=1, max_in_flight=2)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(6)))
+
+    start = time.monotonic()
+    assert asyncio.run(main()) == list(range(6))
+    # Three batches of two, two at a time: two rounds, not three
+    assert overlap == 2
+    assert time.monotonic() - start < 0.55
+
+def test_full_scheduler_rejects_instead_of_queueing():
+    release = threading.Event()
+
+    def run_batch(items):
+        release.wait(5)
+        return items
+
+    # One batch in flight; the executor's queue allows 1 more batch = 2 waiting items
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=2, max_wait_ms=1, executor=executor)
+    assert scheduler.max_pending == 2
+
+    async def main():
+        running = [asyncio.create_task(scheduler.submit(i)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(scheduler.submit(i)) for i in range(2, 4)]
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceQueueFull):
+            await scheduler.submit(4)
+        release.set()
+        return await asyncio.gather(*running, *waiting)
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert scheduler.stats()["rejected"] == 1
+    executor.shutdown()
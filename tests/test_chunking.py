@@ -0,0 +1,46 @@
+from app.services.chunking import in_order, length_buckets, length_order, merge_entities, split_batch, window_spans, word_offsets
+
+def test_short_text_is_one_window():
+    text = "short prompt"
+    assert window_spans(text, word_offsets(text), max_tokens=10, overlap=2) == [(0, len(text))]
+
+def test_long_text_windows_overlap_and_cover_every_token():
+    words = [f"w{i}" for i in range(25)]
+    text = " ".join(words)
+    spans = window_spans(text, word_offsets(text), max_tokens=10, overlap=3)
+
+    windows = [text[s:e].split() for s, e in spans]
+    assert all(len(w) <= 10 for w in windows)
+    assert windows[0][-3:] == windows[1][:3]  # Overlap
+    assert sorted({w for window in windows for w in window}, key=words.index) == words
+
+def test_split_batch_tracks_owner_and_offset():
+    texts = ["tiny", " ".join(["x"] * 30)]
+    windows = split_batch(texts, max_tokens=8, overlap=2)
+
+    assert windows.owners[0] == 0 and windows.texts[0] == "tiny"
+    assert set(windows.owners[1:]) == {1}
+    for owner, start, window in zip(windows.owners, windows.starts, windows.texts):
+        assert texts[owner][start:start + len(window)] == window
+
+def test_split_batch_without_fast_tokenizer_counts_words():
+    windows = split_batch(["one two three", " ".join(["x"] * 30)], max_tokens=8, overlap=2)
+    assert windows.token_ids is None
+    assert windows.lengths[:2] == [3, 8] and max(windows.lengths) == 8
+
+def test_length_buckets_group_similar_lengths_and_restore_order():
+    lengths = [4000, 3, 5, 3900, 4, 6]
+    buckets = length_buckets(lengths, batch_size=2)
+    assert buckets == [[1, 4], [2, 5], [3, 0]]
+
+    order = length_order(lengths)
+    assert in_order(order, [lengths[i] for i in order]) == lengths
+
+def test_merge_entities_keeps_best_of_overlapping_spans():
+    entities = [
+        {"start": 10, "end": 20, "label": "email", "score": 0.9},
+        {"start": 10, "end": 20, "label": "email", "score": 0.8},  # Same span from the overlap window
+        {"start": 15, "end": 25, "label": "person", "score": 0.5},
+        {"start": 30, "end": 35, "label": "person", "score": 0.6},
+    ]
+    assert merge_entities(entities) == [entities[0], entities[3]]
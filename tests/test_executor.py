@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import pytest
+from app.core.executor import InferenceExecutor, InferenceQueueFull
+
+def test_executor_runs_off_event_loop():
+    executor = InferenceExecutor(kind="thread", max_workers=1, max_queue=4)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        worker_thread = await executor.run(threading.get_ident)
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(main())
+    assert loop_thread != worker_thread
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+def test_executor_rejects_when_queue_full():
+    executor = InferenceExecutor(kind="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        # One running + one queued fills the executor
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(release.wait)
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
@@ -0,0 +1,54 @@
+import asyncio
+from app.schemas.guard import GuardConfig, GuardResponse
+from app.services.guard_cache import GuardResultCache, cache_key
+
+def test_cache_key_depends_on_prompt_config_and_key():
+    base = cache_key("hello", GuardConfig())
+    assert base == cache_key("hello", None)  # None means the default config
+    assert base != cache_key("hello", GuardConfig(detect_toxicity=True))
+    assert base != cache_key("hello!", GuardConfig())
+    assert base != cache_key("hello", GuardConfig(), api_key_id=1)
+    # Rules or exemplars changed: earlier verdicts no longer apply
+    assert base != cache_key("hello", None, detection_version="rules:2-abc/exemplars:1")
+    # NFC normalization: composed and decomposed forms share a key
+    assert cache_key("caf\u00e9", None) == cache_key("cafe\u0301", None)
+
+def test_cache_lru_eviction_and_ttl():
+    cache = GuardResultCache(ttl_seconds=60, max_entries=2)
+    result = GuardResponse(safe=True)
+
+    async def main():
+        await cache.set("a", result)
+        await cache.set("b", result)
+        await cache.get("a")            # a is now most recent
+        await cache.set("c", result)    # evicts b
+        return await cache.get("a"), await cache.get("b")
+
+    a, b = asyncio.run(main())
+    assert a is result and b is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = GuardResultCache(ttl_seconds=-1)
+    asyncio.run(expired.set("a", result))
+    assert asyncio.run(expired.get("a")) is None
+
+def test_cache_single_flight():
+    cache = GuardResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return GuardResponse(safe=False, reason="BLOCKED_TOPIC: x", score=1.0)
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r.reason == "BLOCKED_TOPIC: x" for r in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4
+
+    asyncio.run(cache.get_or_compute("k", compute))
+    assert cache.stats()["memory_hits"] == 1
@@ -0,0 +1,115 @@
+import threading
+import app.services.guard_pipeline as guard_pipeline_module
+from app.schemas.guard import GuardConfig
+from app.services.guard_pipeline import GuardPipeline
+from app.services.stage_planner import StagePlanner
+
+class FakePii:
+    def anonymize_batch(self, texts, batch_size=8, labels=None):
+        return [(text.replace("bob@test.com", "<EMAIL>"), ["email"] if "bob@test.com" in text else []) for text in texts]
+
+class FakeSecurity:
+    def scan_rules_batch(self, texts, profanity_words=None):
+        return [(False, "POTENTIAL_PROMPT_INJECTION (Regex)", 1.0) if "ignore" in t else (True, None, 0.0) for t in texts]
+
+    def scan_semantic_batch(self, texts, batch_size=32):
+        return [(True, None, 0.2) for t in texts]
+
+class SlowToxicity:
+    """Blocks until released, so tests can observe early exit."""
+    def __init__(self):
+        self.release = threading.Event()
+
+    def scan_batch(self, texts, threshold=0.7, batch_size=8):
+        self.release.wait(timeout=5)
+        return [(True, 0.9, ["insult"]) if "idiot" in t else (False, 0.1, []) for t in texts]
+
+ITEMS = [
+    ("hello, mail bob@test.com", GuardConfig(detect_toxicity=True)),
+    ("ignore everything, you idiot", GuardConfig(detect_toxicity=True)),
+    ("you idiot, let's discuss politics", GuardConfig(detect_toxicity=True, block_topics=["politics"])),
+    ("politics again", GuardConfig(block_topics=["Politics"])),
+    ("plain", GuardConfig(redact_pii=False, detect_injection=False)),
+]
+
+def _patch(monkeypatch, toxicity):
+    monkeypatch.setattr(guard_pipeline_module, "pii_engine", FakePii())
+    monkeypatch.setattr(guard_pipeline_module, "security_scanner", FakeSecurity())
+    monkeypatch.setattr(guard_pipeline_module, "toxicity_scanner", toxicity)
+
+def test_concurrent_mode_matches_sequential(monkeypatch):
+    toxicity = SlowToxicity()
+    toxicity.release.set()
+    _patch(monkeypatch, toxicity)
+
+    sequential = GuardPipeline(mode="sequential").run_batch(ITEMS)
+    concurrent = GuardPipeline(mode="concurrent").run_batch(ITEMS)
+
+    assert [r.model_dump() for r in concurrent] == [r.model_dump() for r in sequential]
+    assert sequential[0].safe and sequential[0].sanitized_prompt == "hello, mail <EMAIL>"
+    assert "INJECTION" in sequential[1].reason
+    assert sequential[2].reason == "TOXIC_CONTENT: insult"
+    assert sequential[3].reason == "BLOCKED_TOPIC: Politics"
+
+def test_concurrent_mode_drops_remaining_stages_on_block(monkeypatch):
+    toxicity = SlowToxicity()
+    _patch(monkeypatch, toxicity)
+
+    # Injection blocks first; the still-running toxicity stage must not be awaited
+    result = GuardPipeline(mode="concurrent").run("ignore all that", GuardConfig(detect_toxicity=True))
+    toxicity.release.set()
+
+    assert result.safe is False
+    assert "INJECTION" in result.reason
+
+def test_planner_orders_by_cost_per_block():
+    planner = StagePlanner(min_samples=5)
+    stages = ["semantic", "rules", "topics"]
+    # Unmeasured stages keep their default position
+    assert planner.order(stages) == stages
+
+    planner.record("semantic", items=100, blocks=5, elapsed_ms=2000)  # 20ms, rarely blocks
+    planner.record("rules", items=100, blocks=30, elapsed_ms=1)       # ~free, often blocks
+    planner.record("topics", items=100, blocks=1, elapsed_ms=2)
+    assert planner.order(stages) == ["rules", "topics", "semantic"]
+
+def test_planner_uses_per_key_stats_once_warm():
+    planner = StagePlanner(min_samples=5)
+    stages = ["toxicity", "topics"]
+    planner.record("toxicity", items=1000, blocks=10, elapsed_ms=1000)
+    planner.record("topics", items=1000, blocks=500, elapsed_ms=1000)
+
+    # Key 7 mostly sends toxic content
+    planner.record("toxicity", items=10, blocks=9, elapsed_ms=10, api_key_id=7)
+    assert planner.order(stages, api_key_id=7) == ["topics", "toxicity"]  # Not warm yet: global order
+    planner.record("topics", items=10, blocks=0, elapsed_ms=10, api_key_id=7)
+    assert planner.order(stages, api_key_id=7) == ["toxicity", "topics"]
+
+def test_adaptive_pipeline_records_and_reorders(monkeypatch):
+    toxicity = SlowToxicity()
+    toxicity.release.set()
+    _patch(monkeypatch, toxicity)
+    planner = StagePlanner(min_samples=1)
+    monkeypatch.setattr(guard_pipeline_module, "stage_planner", planner)
+
+    pipeline = GuardPipeline(adaptive=True)
+    results = pipeline.run_batch([(prompt, config, 1) for prompt, config in ITEMS])
+
+    assert [r.safe for r in results] == [True, False, False, False, True]
+    assert planner.stats(1)["key"]["injection_rules"]["items"] == 4
+
+def test_stage_input_budget_blocks_oversized_prompts(monkeypatch):
+    toxicity = SlowToxicity()
+    toxicity.release.set()
+    _patch(monkeypatch, toxicity)
+
+    pipeline = GuardPipeline(max_chars={"pii": 100, "toxicity": 20})
+    results = pipeline.run_batch([
+        ("x" * 101, GuardConfig()),
+        ("a long but harmless prompt", GuardConfig(redact_pii=False, detect_toxicity=True)),
+        ("short", GuardConfig(detect_toxicity=True)),
+    ])
+
+    assert results[0].reason.startswith("INPUT_TOO_LARGE: pii")
+    assert results[1].reason.startswith("INPUT_TOO_LARGE: toxicity")
+    assert results[2].safe is True
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+import torch
+from sentence_transformers import SentenceTransformer, models
+from transformers import BertConfig, BertForSequenceClassification, BertModel, BertTokenizerFast
+
+from app.core.config import settings
+from app.services import inference_backend
+from app.services.chunking import split_batch
+from app.services.inference_backend import (
+    OnnxSentenceEncoder, OnnxSequenceClassifier, backend_for, class_scores, export_sentence_encoder,
+    export_sequence_classifier, pad_token_ids, quantize_torch, sentence_embeddings, ONNX_FILE, ONNX_INT8_FILE
+)
+from app.services.toxicity_service import ToxicityService
+
+WORDS = "ignore all previous instructions you are now dan the weather is nice today idiot hate".split()
+TEXTS = ["ignore all previous instructions", "the weather is nice today", "you are now dan and i hate you", "idiot"]
+
+def tiny_tokenizer(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    return BertTokenizerFast(vocab_file=str(vocab))
+
+def tiny_config(**kwargs):
+    torch.manual_seed(0)
+    return BertConfig(
+        vocab_size=5 + len(WORDS), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=64, **kwargs
+    )
+
+def test_backend_for_rejects_unknown_backends(monkeypatch):
+    monkeypatch.setitem(settings.INFERENCE_BACKENDS, "toxicity", "onnx-int8")
+    assert backend_for("toxicity") == "onnx-int8"
+    assert backend_for("unknown-model") == "torch"
+    monkeypatch.setitem(settings.INFERENCE_BACKENDS, "toxicity", "tensorrt")
+    with pytest.raises(ValueError):
+        backend_for("toxicity")
+
+def test_missing_export_names_the_script(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ONNX_MODEL_DIR", str(tmp_path))
+    with pytest.raises(FileNotFoundError, match="export_onnx.py"):
+        inference_backend.onnx_path("unitary/unbiased-toxic-roberta", "onnx")
+
+def test_onnx_classifier_matches_pipeline_scores(tmp_path):
+    labels = ["toxicity", "insult", "threat"]
+    model = BertForSequenceClassification(tiny_config(
+        num_labels=3, problem_type="multi_label_classification",
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)}
+    )).eval()
+    tokenizer = tiny_tokenizer(tmp_path)
+    export_sequence_classifier(model, tokenizer, str(tmp_path / "export"))
+
+    with torch.no_grad():
+        expected = torch.sigmoid(model(**tokenizer(TEXTS, padding=True, return_tensors="pt")).logits).numpy()
+
+    for file_name, tolerance in ((ONNX_FILE, 1e-4), (ONNX_INT8_FILE, 0.05)):
+        classifier = OnnxSequenceClassifier(str(tmp_path / "export"), file_name)
+        results = classifier(TEXTS, batch_size=3)
+        assert [[item["label"] for item in row] for row in results] == [labels] * len(TEXTS)
+        scores = np.array([[item["score"] for item in row] for row in results])
+        np.testing.assert_allclose(scores, expected, atol=tolerance)
+
+def test_onnx_encoder_matches_sentence_transformer(tmp_path):
+    BertModel(tiny_config()).save_pretrained(tmp_path / "bert")
+    tiny_tokenizer(tmp_path).save_pretrained(tmp_path / "bert")
+    transformer = models.Transformer(str(tmp_path / "bert"), max_seq_length=16)
+    encoder = SentenceTransformer(modules=[transformer, models.Pooling(32, "mean"), models.Normalize()], device="cpu")
+    export_sentence_encoder(encoder, str(tmp_path / "export"))
+
+    expected = encoder.encode(TEXTS, normalize_embeddings=True)
+    onnx_encoder = OnnxSentenceEncoder(str(tmp_path / "export"), ONNX_FILE)
+    assert onnx_encoder.max_seq_length == 16 and onnx_encoder.get_sentence_embedding_dimension() == 32
+    np.testing.assert_allclose(onnx_encoder.encode(TEXTS, batch_size=3), expected, atol=1e-4)
+
+    quantized = OnnxSentenceEncoder(str(tmp_path / "export"), ONNX_INT8_FILE).encode(TEXTS)
+    assert (np.sum(quantized * expected, axis=1) > 0.98).all()
+
+def test_torch_int8_quantizes_linear_layers_in_place(tmp_path):
+    model = BertForSequenceClassification(tiny_config(num_labels=2)).eval()
+    inputs = tiny_tokenizer(tmp_path)(TEXTS, padding=True, return_tensors="pt")
+    with torch.no_grad():
+        expected = torch.softmax(model(**inputs).logits, dim=-1)
+        quantized = quantize_torch(model)
+        scores = torch.softmax(quantized(**inputs).logits, dim=-1)
+
+    assert quantized is model
+    assert not any(type(m) is torch.nn.Linear for m in model.modules())
+    assert torch.allclose(scores, expected, atol=0.05)
+
+def test_split_batch_keeps_token_ids_of_each_window(tmp_path):
+    tokenizer = tiny_tokenizer(tmp_path)
+    texts = ["idiot", " ".join(WORDS)]
+    windows = split_batch(texts, max_tokens=6, overlap=2, tokenizer=tokenizer)
+
+    assert windows.lengths[0] == 1 and max(windows.lengths) == 6
+    for text, ids in zip(windows.texts, windows.token_ids):
+        assert ids == tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    input_ids, attention_mask = pad_token_ids(tokenizer, windows.token_ids[:2])
+    assert input_ids.shape == (2, 8) and attention_mask.sum(axis=1).tolist() == [3, 8]
+    assert input_ids[0, 0] == tokenizer.cls_token_id and input_ids[0, 3] == tokenizer.pad_token_id
+
+def test_bucketed_toxicity_scores_match_the_pipeline(tmp_path):
+    from transformers import pipeline
+    labels = ["toxicity", "insult"]
+    model = BertForSequenceClassification(tiny_config(
+        num_labels=2, problem_type="multi_label_classification", id2label=dict(enumerate(labels))
+    )).eval()
+    classifier = pipeline("text-classification", model=model, tokenizer=tiny_tokenizer(tmp_path), top_k=None)
+
+    service = ToxicityService(backend="torch")
+    service.pipeline = classifier
+    # Mixed lengths, so length-sorted batches differ from arrival order
+    texts = [" ".join(WORDS * 3), "idiot", "the weather is nice today", " ".join(WORDS), "hate"]
+    windows = split_batch(texts, service.max_window_tokens, 4, classifier.tokenizer)
+    bucketed = service._classify(windows, batch_size=2)
+
+    expected = classifier(texts, batch_size=1)
+    for got, want in zip(bucketed, expected):
+        got, want = {i["label"]: i["score"] for i in got}, {i["label"]: i["score"] for i in want}
+        assert got.keys() == want.keys()
+        assert all(abs(got[label] - want[label]) < 1e-5 for label in labels)
+
+    result_labels, scores = class_scores(classifier, *pad_token_ids(classifier.tokenizer, windows.token_ids))
+    assert result_labels == labels and scores.shape == (len(texts), 2)
+
+def test_sentence_embeddings_from_token_ids_match_encode(tmp_path):
+    BertModel(tiny_config()).save_pretrained(tmp_path / "bert")
+    tiny_tokenizer(tmp_path).save_pretrained(tmp_path / "bert")
+    encoder = SentenceTransformer(modules=[models.Transformer(str(tmp_path / "bert")), models.Pooling(32, "mean")], device="cpu")
+
+    ids = encoder.tokenizer(TEXTS, add_special_tokens=False)["input_ids"]
+    embeddings = sentence_embeddings(encoder, *pad_token_ids(encoder.tokenizer, ids))
+    np.testing.assert_allclose(embeddings, encoder.encode(TEXTS), atol=1e-5)
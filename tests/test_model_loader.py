@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+from app.core.model_loader import ModelLoader
+
+def test_models_load_in_parallel_and_warm_up():
+    loader = ModelLoader(workers=2, warmup_runs=2)
+    barrier = threading.Barrier(2, timeout=5)  # Both loads must be running at once
+    warmups = []
+
+    loader.register("a", barrier.wait, lambda: warmups.append("a"))
+    loader.register("b", barrier.wait, lambda: warmups.append("b"))
+    loader.register("unused", lambda: 1 / 0)
+
+    async def main():
+        await loader.start(["a", "b", "unknown"])
+        not_ready_yet = loader.ready
+        await loader.wait()
+        return not_ready_yet
+
+    assert asyncio.run(main()) is False
+    state = loader.state()
+    assert state["ready"] is True
+    assert set(state["models"]) == {"a", "b"}
+    assert all(model["state"] == "ready" and model["seconds"] is not None for model in state["models"].values())
+    assert sorted(warmups) == ["a", "a", "b", "b"]
+
+def test_failed_or_slow_model_is_not_ready():
+    loader = ModelLoader(workers=2, timeout=0.2)
+    loader.register("broken", lambda: 1 / 0)
+    loader.register("slow", lambda: time.sleep(1))
+
+    async def main():
+        await loader.start(["broken", "slow"])
+        await loader.wait()
+
+    asyncio.run(main())
+    state = loader.state()
+    assert state["ready"] is False
+    assert state["models"]["broken"] == {"state": "failed", "seconds": state["models"]["broken"]["seconds"], "error": "division by zero"}
+    assert state["models"]["slow"]["state"] == "failed"
+    assert "not ready after" in state["models"]["slow"]["error"]
+
+def test_preload_blocks_until_loaded():
+    loader = ModelLoader()
+    loaded = []
+    loader.register("a", lambda: loaded.append("a"))
+    loader.register("broken", lambda: 1 / 0)
+
+    assert loader.preload(["a"]) is True
+    assert loaded == ["a"]
+    assert loader.preload(["a", "broken"]) is False
+
+def test_not_ready_before_start():
+    assert ModelLoader().ready is False
+
+def test_ready_endpoint(client):
+    # Tests preload no models (see conftest), so the app is ready at once
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
@@ -0,0 +1,80 @@
+import time
+
+from app.core.model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+class FakeService:
+    def __init__(self, size_mb):
+        self.size = size_mb * MB
+        self.model = None
+
+    @property
+    def is_loaded(self):
+        return self.model is not None
+
+    def load_model(self):
+        if self.model is None:
+            self.model = object()
+
+    def unload_model(self):
+        self.model = None
+
+    def memory_bytes(self):
+        return self.size
+
+def _registry(budget_mb, idle_seconds=0.0, **sizes):
+    registry = ModelRegistry(budget_mb=budget_mb, idle_seconds=idle_seconds)
+    services = {name: FakeService(size) for name, size in sizes.items()}
+    for name, service in services.items():
+        registry.register(name, service)
+    return registry, services
+
+def test_budget_evicts_least_recently_used():
+    registry, services = _registry(250, gliner=100, semantic=100, toxicity=100)
+
+    for name in ("gliner", "semantic", "gliner", "toxicity"):
+        with registry.use(services[name]):
+            pass
+
+    # semantic was idle longest
+    assert [name for name, s in services.items() if s.is_loaded] == ["gliner", "toxicity"]
+    stats = registry.stats()
+    assert stats["loaded_bytes"] == 200 * MB
+    assert stats["models"]["semantic"]["evictions"] == 1
+    assert stats["models"]["gliner"]["loads"] == 1
+
+    # Reloading semantic makes room first
+    with registry.use(services["semantic"]):
+        assert registry.total_bytes() <= 250 * MB
+    assert registry.stats()["models"]["semantic"]["loads"] == 2
+
+def test_model_in_use_is_never_evicted():
+    registry, services = _registry(150, gliner=100, toxicity=100)
+
+    with registry.use(services["gliner"]):
+        with registry.use(services["toxicity"]):
+            # Both busy: over budget, but nothing can go
+            assert services["gliner"].is_loaded and services["toxicity"].is_loaded
+        assert services["gliner"].is_loaded
+
+    with registry.use(services["toxicity"]):
+        assert not services["gliner"].is_loaded
+
+def test_idle_models_are_unloaded():
+    registry, services = _registry(0, idle_seconds=0.05, gliner=100, toxicity=100)
+    with registry.use(services["gliner"]):
+        pass
+    time.sleep(0.1)
+    with registry.use(services["toxicity"]):
+        pass
+
+    assert not services["gliner"].is_loaded
+    assert services["toxicity"].is_loaded
+
+def test_unregistered_service_just_loads():
+    registry = ModelRegistry(budget_mb=1)
+    service = FakeService(100)
+    with registry.use(service):
+        assert service.is_loaded
+    assert registry.stats()["models"] == {}
@@ -0,0 +1,171 @@
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import time
+import uuid
+import pytest
+import app.services.pii_engine as pii_engine_module
+from app.services.gliner_service import GlinerPiiService
+from app.services.pii_engine import PiiEngine, NEURAL_LABELS, detect_patterns, iban_valid, luhn_valid, may_need_neural
+
+class FakeGliner:
+    def __init__(self):
+        self.calls = []
+
+    def detect_batch(self, texts, batch_size=8, labels=None):
+        self.calls.append((list(texts), labels))
+        results = []
+        for text in texts:
+            start = text.find("John Smith")
+            results.append([{"start": start, "end": start + 10, "label": "person", "score": 0.9}] if start >= 0 else [])
+        return results
+
+    def redact(self, text, entities):
+        for entity in sorted(entities, key=lambda e: e["start"], reverse=True):
+            text = text[:entity["start"]] + f"<{entity['label'].upper()}>" + text[entity["end"]:]
+        return text, sorted({e["label"] for e in entities})
+
+def _found(text):
+    return [(e["label"], text[e["start"]:e["end"]]) for e in detect_patterns(text)]
+
+def test_checksums():
+    assert luhn_valid("4111111111111111") and not luhn_valid("4111111111111112")
+    assert iban_valid("DE89 3704 0044 0532 0130 00") and not iban_valid("DE89 3704 0044 0532 0130 01")
+
+def test_patterns_are_validated():
+    assert _found("mail jane.doe@example.com or call +1 415 555 0199") == [
+        ("email", "jane.doe@example.com"), ("phone number", "+1 415 555 0199")
+    ]
+    assert _found("card 4111 1111 1111 1111, not 4111 1111 1111 1112") == [("credit card", "4111 1111 1111 1111")]
+    assert _found("SSN 123-45-6789 but not 000-12-3456") == [("ssn", "123-45-6789")]
+    assert _found("IBAN DE89 3704 0044 0532 0130 00 please") == [("iban", "DE89 3704 0044 0532 0130 00")]
+
+def test_credentials_and_keys():
+    assert _found("the password is hunter2.") == [("password", "hunter2")]
+    assert _found("the password is wrong") == []
+    assert _found("use sk_live_abcdefghijklmnopqrstuv now") == [("api key", "sk_live_abcdefghijklmnopqrstuv")]
+    assert _found("random ab3Kd9fQz81LmPq2xYt7Wv in text") == [("secret", "ab3Kd9fQz81LmPq2xYt7Wv")]
+    # Long but low-entropy or letter-only tokens are not secrets
+    assert _found("internationalization_considerations and 3f786850e387550fdab836ed7e6dc881de23001b") == []
+
+@pytest.mark.parametrize("identifier", [
+    "7c9e6679-7425-40de-944b-e07cc1f29b41",                              # UUID
+    "7C9E6679-7425-40DE-944B-E07CC1F29B41",
+    "9b2e4f1c7a3d8e5f0b6c2a9d4e7f1b3c5a8d0e2f4b6c8a1d3e5f7b9c2a4d6e8f",  # SHA-256
+    "commit 3f786850e387550fdab836ed7e6dc881de23001b",                   # git SHA-1
+    "req_01HZX3K5V8QW2N4M6P7R9S0T1A",                                    # prefixed ULID
+    "request_id=7c9e6679-7425-40de-944b-e07cc1f29b41",
+    "X-Request-Id: req-2f1c9a7b3e8d4c6a9b0e1f2a3b4c5d6e",
+])
+def test_identifiers_are_not_secrets(identifier):
+    assert _found(f"failed with {identifier} again") == []
+
+@pytest.mark.parametrize("text", [
+    "a." * 50_000,                   # email local part with no "@"
+    "x@" + "a." * 50_000,            # domain with no top-level label
+    "key " + "a1-" * 33_000 + "+",   # token that is almost a prefixed identifier
+])
+def test_patterns_run_in_linear_time(text):
+    start = time.perf_counter()
+    detect_patterns(text)
+    assert time.perf_counter() - start < 1.0
+
+def test_random_identifiers_are_not_secrets():
+    rng = random.Random(0)
+    for _ in range(2000):
+        assert _found(str(uuid.UUID(int=rng.getrandbits(128), version=4))) == []
+        assert _found(f"req_{rng.getrandbits(160):040x}") == []
+
+def test_neural_hint():
+    assert may_need_neural("Please forward this to John Smith")
+    assert may_need_neural("my name is bob and i live in paris")
+    assert not may_need_neural("what is 2+2? Explain it simply.")
+
+def test_hybrid_only_asks_gliner_for_neural_labels_when_hinted(monkeypatch):
+    gliner = FakeGliner()
+    monkeypatch.setattr(pii_engine_module, "gliner_service", gliner)
+    engine = PiiEngine(mode="hybrid")
+
+    results = engine.anonymize_batch(["mail bob@test.com", "Send it to John Smith at bob@test.com", ""])
+
+    assert gliner.calls == [(["Send it to John Smith at bob@test.com"], list(NEURAL_LABELS))]
+    assert results[0] == ("mail <EMAIL>", ["email"])
+    assert results[1] == ("Send it to <PERSON> at <EMAIL>", ["email", "person"])
+    assert results[2] == ("", [])
+
+def test_regex_only_and_neural_modes(monkeypatch):
+    gliner = FakeGliner()
+    monkeypatch.setattr(pii_engine_module, "gliner_service", gliner)
+
+    assert PiiEngine(mode="regex-only").anonymize("Send it to John Smith")[0] == "Send it to John Smith"
+    assert gliner.calls == []
+
+    PiiEngine(mode="neural").detect_batch(["Send it to John Smith"])
+    assert gliner.calls == [(["Send it to John Smith"], None)]
+
+    with pytest.raises(ValueError):
+        PiiEngine(mode="presidio")
+
+def test_per_request_labels_skip_unwanted_detectors(monkeypatch):
+    gliner = FakeGliner()
+    monkeypatch.setattr(pii_engine_module, "gliner_service", gliner)
+    engine = PiiEngine(mode="hybrid")
+    text = "John Smith paid with 4111 1111 1111 1111, mail bob@test.com"
+
+    emails_and_cards = engine.detect_batch([text], labels=[["Email", "credit card"]])[0]
+    assert [e["label"] for e in emails_and_cards] == ["credit card", "email"]
+    assert gliner.calls == []  # No neural label requested: GLiNER never runs
+
+    # Texts sharing a label set share one call; custom labels go to GLiNER unhinted
+    engine.detect_batch(["x John Smith", "y John Smith", "plain text", "another plain"], labels=[
+        ["person"], ["person", "email"], ["passport number"], ["passport number"]
+    ])
+    assert gliner.calls == [(["x John Smith", "y John Smith"], ["person"]), (["plain text", "another plain"], ["passport number"])]
+
+class FakeBiEncoder:
+    onnx_model = False
+    config = None
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode_labels(self, labels):
+        self.encoded.append(tuple(labels))
+        return f"embeddings{labels}"
+
+    def inference(self, texts, labels, batch_size=8, labels_embeddings=None):
+        assert labels_embeddings == f"embeddings{labels}"
+        return [[] for _ in texts]
+
+def test_label_encodings_are_cached_per_label_set():
+    service = GlinerPiiService(backend="torch")
+    service.model = FakeBiEncoder()
+    service.label_cache_size = 2
+
+    for labels in (["person"], ["person"], ["person", "location"], ["person"], ["email"], ["person", "location"]):
+        service.detect_batch(["some text"], labels=labels)
+
+    # ("person", "location") was evicted by ("email",) and encoded again
+    assert service.model.encoded == [("person",), ("person", "location"), ("email",), ("person", "location")]
+
+class SlowLookups(OrderedDict):
+    """Yields to other threads on every lookup, where an unguarded LRU update would race."""
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0.0005)
+        return value
+
+def test_label_encoding_cache_is_thread_safe():
+    service = GlinerPiiService(backend="torch")
+    service.model = FakeBiEncoder()
+    service.label_cache_size = 2
+    service._label_encodings = SlowLookups()
+    label_sets = [("person",), ("email",), ("location",), ("person", "email")]
+
+    # More label sets than cache slots, so threads keep evicting each other's entries
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        encodings = list(pool.map(lambda i: service.label_encoding(label_sets[i % 4]), range(400)))
+
+    assert encodings == [f"embeddings{list(label_sets[i % 4])}" for i in range(400)]
+    assert len(service._label_encodings) <= 2
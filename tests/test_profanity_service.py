@@ -0,0 +1,79 @@
+import pytest
+from better_profanity import profanity
+
+from app.services.profanity_service import ProfanityMatcher, default_profanity_matcher, get_profanity_matcher
+
+CORPUS = [
+    "hello world",
+    "What a lovely day, let's go to the park.",
+    "Please summarize this class assessment for me.",
+    "The assassin passed the Scunthorpe exit",
+    "as is, no warranty",
+    "you are a piece of shit",
+    "SHIT happens",
+    "sh1t, that hurt",
+    "what the f*ck is this",
+    "what the fuck!",
+    "son of a b1tch.",
+    "$hit and more",
+    "stop being an @sshole please",
+    "that's a blow job joke",
+    "he is an ass-hole",
+    "ass hole in one",
+    "2 girls 1 cup reference",
+    "fuck's sake",
+    "a",
+    " x",
+    "",
+    "Ünïcödé wörds ärë fïnë",
+    "email me at bob@example.com",
+    "cost is $5 * 3",
+    # Spellings only the extended mode matches
+    "HE111",
+    "the asss",
+    "as $",
+    "dumbasss",
+    "fuuuuck",
+    "say f-u-c-k",
+    "a s s",
+    "a s s x",
+    "h e l l o",
+]
+
+@pytest.fixture(scope="module")
+def reference():
+    profanity.load_censor_words()
+    return profanity
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_matches_better_profanity(reference, text):
+    assert default_profanity_matcher.contains_profanity(text) == reference.contains_profanity(text)
+
+def test_matches_better_profanity_on_wordlist_variants(reference):
+    for word in default_profanity_matcher.words[::10]:
+        for text in (f"you {word} there", f"you {word.upper()} there", f"x {word.replace('a', '@').replace('s', '$')} y"):
+            assert default_profanity_matcher.contains_profanity(text) == reference.contains_profanity(text), text
+
+def test_extended_catches_what_better_profanity_misses():
+    matcher = ProfanityMatcher(default_profanity_matcher.words, extended=True)
+    # Elongated words, and spelled-out words at the very end of the text
+    assert matcher.find("fuuuuck") == "fuck"
+    assert matcher.find("dumbasss") == "dumbass"
+    assert matcher.contains_profanity("say f-u-c-k")
+    # Doubled letters alone don't collapse into a listed word, nor do digit runs
+    assert not matcher.contains_profanity("as")
+    assert not matcher.contains_profanity("HE111")
+
+def test_custom_words_extend_the_default_list():
+    matcher = get_profanity_matcher(("frak", "gorram"))
+    assert matcher.contains_profanity("oh FRAK")
+    assert matcher.contains_profanity("g0rr@m it")
+    assert matcher.contains_profanity("shit")
+    assert not default_profanity_matcher.contains_profanity("oh frak")
+    assert get_profanity_matcher(("frak", "gorram")) is matcher
+    assert get_profanity_matcher(None) is default_profanity_matcher
+
+def test_multi_word_custom_entry():
+    matcher = ProfanityMatcher(["bad robot"])
+    assert matcher.find("such a bad robot today") == "bad robot"
+    assert matcher.find("bad robots") is None
@@ -0,0 +1,59 @@
+from app.services.redaction import redact, resolve_spans
+
+def _entity(text, value, label, score=0.9, occurrence=0):
+    start = -1
+    for _ in range(occurrence + 1):
+        start = text.index(value, start + 1)
+    return {"start": start, "end": start + len(value), "label": label, "score": score}
+
+def test_overlapping_spans_are_merged_not_corrupted():
+    text = "card 4111 1111 1111 1111 or mail bob@test.com"
+    entities = [
+        _entity(text, "4111 1111 1111", "phone number", 0.97),
+        _entity(text, "4111 1111 1111 1111", "credit card", 0.95),
+        _entity(text, "bob@test.com", "email"),
+        _entity(text, "bob", "person", 0.99),
+    ]
+
+    redaction = redact(text, entities)
+
+    # Priority beats score, and the merged span covers both detections
+    assert redaction.text == "card <CREDIT CARD> or mail <EMAIL>"
+    assert redaction.labels == ["credit card", "email"]
+
+def test_touching_spans_merge_only_with_the_same_label():
+    text = "JohnSmith555-0199"
+    spans = resolve_spans([
+        {"start": 0, "end": 4, "label": "person", "score": 0.8},
+        {"start": 4, "end": 9, "label": "person", "score": 0.7},
+        {"start": 9, "end": 17, "label": "phone number", "score": 0.6},
+        {"start": 0, "end": 17, "label": "secret", "score": 0.1},  # Below MIN_SCORE
+    ])
+    assert [(s["start"], s["end"], s["label"]) for s in spans] == [(0, 9, "person"), (9, 17, "phone number")]
+    assert redact(text, spans).text == "<PERSON><PHONE NUMBER>"
+
+def test_offset_map():
+    text = "hi bob@test.com, call 555-0199 now"
+    redaction = redact(text, [_entity(text, "bob@test.com", "email"), _entity(text, "555-0199", "phone number")])
+    assert redaction.text == "hi <EMAIL>, call <PHONE NUMBER> now"
+
+    now = text.index("now")
+    assert redaction.text[redaction.to_redacted(now):] == "now"
+    assert redaction.to_original(redaction.to_redacted(now)) == now
+    # Inside an entity -> its placeholder, and back to the entity's start
+    assert redaction.to_redacted(text.index("test")) == redaction.text.index("<EMAIL>")
+    assert redaction.to_original(redaction.text.index("NUMBER")) == text.index("555")
+    assert redaction.to_redacted(1) == 1 and redaction.to_original(1) == 1
+
+def test_many_entities_in_one_pass():
+    rows = [f"user{i}@example.com,555-{i:04d}" for i in range(500)]
+    text = "\n".join(rows)
+    entities = []
+    for i in range(500):
+        entities.append(_entity(text, f"user{i}@example.com", "email"))
+        entities.append(_entity(text, f"555-{i:04d}", "phone number"))
+
+    redaction = redact(text, entities)
+
+    assert redaction.text == "\n".join(["<EMAIL>,<PHONE NUMBER>"] * 500)
+    assert len(redaction.spans) == 1000
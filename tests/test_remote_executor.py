@@ -0,0 +1,125 @@
+import asyncio
+import os
+import socket
+import time
+
+import pytest
+
+from app.core.executor import InferenceExecutor, InferenceQueueFull
+from app.core.remote_executor import InferenceWorkerServer, RemoteInferenceError, RemoteInferenceExecutor, socket_path
+from app.services.batch_scheduler import MicroBatchScheduler
+
+def double_all(items):
+    return [item * 2 for item in items]
+
+def add(a, b):
+    return a + b
+
+def slow(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+def fail():
+    raise ValueError("bad input")
+
+async def _servers(socket_dir, count, max_outstanding=8):
+    servers = []
+    for i in range(count):
+        executor = InferenceExecutor(max_workers=2)
+        scheduler = MicroBatchScheduler(double_all, max_batch_size=8, max_wait_ms=20, executor=executor)
+        server = InferenceWorkerServer(socket_path(str(socket_dir), i), executor, batchers={double_all: scheduler}, max_outstanding=max_outstanding)
+        await server.start()
+        servers.append((server, scheduler, executor))
+    return servers
+
+async def _close(servers):
+    for server, scheduler, executor in servers:
+        await server.close()
+        await scheduler.close()
+        executor.shutdown()
+
+def test_jobs_round_trip_and_batch_on_the_worker(tmp_path):
+    async def main():
+        servers = await _servers(tmp_path, 1)
+        client = RemoteInferenceExecutor(str(tmp_path))
+        try:
+            # Concurrent batched jobs share one micro-batch on the worker
+            results = await asyncio.gather(*(client.run(double_all, [i]) for i in range(4)))
+            assert results == [[0], [2], [4], [6]]
+            assert servers[0][1].stats()["batches"] == 1
+
+            assert await client.run(add, 2, 3) == 5
+            with pytest.raises(RemoteInferenceError, match="ValueError: bad input"):
+                await client.run(fail)
+
+            health = await client.health()
+            assert health["ready"] is True
+            assert health["workers"]["worker-0.sock"]["server"]["completed"] == 5
+        finally:
+            client.shutdown()
+            await _close(servers)
+        return client.stats()
+
+    stats = asyncio.run(main())
+    assert stats["completed"] == 5 and stats["failed"] == 1
+
+def test_collect_calls_every_worker(tmp_path):
+    async def main():
+        servers = await _servers(tmp_path, 2, max_outstanding=1)
+        client = RemoteInferenceExecutor(str(tmp_path))
+        try:
+            # Runs beside the inference queue, so a worker at max_outstanding still answers
+            job = asyncio.create_task(client.run(slow, 0.3))
+            await asyncio.sleep(0.1)
+            collected = await client.collect(add, 1, 2)
+            failed = await client.collect(fail)
+            await job
+        finally:
+            client.shutdown()
+            await _close(servers)
+        return collected, failed
+
+    collected, failed = asyncio.run(main())
+    assert collected == {"workers": {"worker-0.sock": 3, "worker-1.sock": 3}}
+    assert failed["workers"]["worker-0.sock"] == {"error": "ValueError: bad input"}
+
+def test_busy_worker_passes_jobs_on(tmp_path):
+    async def main():
+        servers = await _servers(tmp_path, 2, max_outstanding=1)
+        client = RemoteInferenceExecutor(str(tmp_path))
+        try:
+            # One job per worker fits; a third finds both busy
+            jobs = [asyncio.create_task(client.run(slow, 0.3)) for _ in range(2)]
+            await asyncio.sleep(0.1)
+            with pytest.raises(InferenceQueueFull, match="busy"):
+                await client.run(slow, 0)
+            await asyncio.gather(*jobs)
+            assert [server.stats()["completed"] for server, _, _ in servers] == [1, 1]
+        finally:
+            client.shutdown()
+            await _close(servers)
+        return client.stats()
+
+    assert asyncio.run(main())["rejected"] == 1
+
+def test_unreachable_worker_is_skipped(tmp_path):
+    # A socket file nobody listens on, as left by a dead worker
+    dead = socket.socket(socket.AF_UNIX)
+    dead.bind(socket_path(str(tmp_path), 0))
+    dead.close()
+
+    async def main():
+        servers = await _servers(tmp_path, 0)
+        client = RemoteInferenceExecutor(str(tmp_path))
+        with pytest.raises(InferenceQueueFull, match="No inference workers"):
+            await client.run(add, 1, 1)  # retried once, then skipped while marked down
+        with pytest.raises(InferenceQueueFull):
+            await client.run(add, 1, 1)
+        health = await client.health()
+        client.shutdown()
+        await _close(servers)
+        return client.stats(), health
+
+    stats, health = asyncio.run(main())
+    assert stats["retries"] == 1
+    assert health["ready"] is False
@@ -0,0 +1,29 @@
+from app.services.topic_service import TopicMatcher, get_topic_matcher
+
+def test_matches_like_substring_search_by_default():
+    matcher = TopicMatcher(("Politics", "war", "religion"))
+    assert matcher.find_all("Let's talk POLITICS and warfare") == ["Politics", "war"]
+    assert matcher.find_all("nothing to see") == []
+
+def test_reports_every_topic_including_prefixes():
+    matcher = TopicMatcher(("new", "new york", "york", "yorkshire"))
+    assert matcher.find_all("flights from New Yorkshire") == ["new", "new york", "york", "yorkshire"]
+
+def test_whole_words():
+    matcher = TopicMatcher(("war", "war crimes", "c++"), whole_words=True)
+    assert matcher.find_all("warfare and software") == []
+    assert matcher.find_all("war crimes tribunal") == ["war", "war crimes"]
+    assert matcher.find_all("I write c++ daily") == ["c++"]
+
+def test_case_sensitive():
+    matcher = TopicMatcher(("Apple",), case_sensitive=True)
+    assert matcher.find_all("an apple a day") == []
+    assert matcher.find_all("Apple stock") == ["Apple"]
+
+def test_empty_topics_are_ignored():
+    assert TopicMatcher(("", "  ")).find_all("anything") == []
+
+def test_matcher_is_cached_per_topic_list():
+    topics = tuple(f"term{i}" for i in range(500))
+    assert get_topic_matcher(topics) is get_topic_matcher(topics)
+    assert get_topic_matcher(topics).find_all("contains term499 and term4") == ["term4", "term49", "term499"]
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.services.toxicity_prefilter import ToxicityPrefilter
+from app.services.toxicity_service import ToxicityService
+
+class FakeToxicity(ToxicityService):
+    """The heavy model is replaced by a recorder that flags nothing."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.model_texts = []
+
+    def load_model(self):
+        pass
+
+    def _scan_batch(self, texts, threshold, batch_size):
+        self.model_texts.extend(texts)
+        return [(False, 0.3, []) for _ in texts]
+
+VOCABULARY = ["how", "do", "i", "reset", "my", "password", "go", "yourself"]
+
+def test_prefilter_scores_ngrams_once():
+    prefilter = ToxicityPrefilter({"threat": {"kill": 2.0, "kill yourself": 9.0}, "insult": {"idiot": 2.5}}, bias=-4.0, profanity_weight=0.0, safe_vocabulary=VOCABULARY)
+
+    safe, labels, coverage = prefilter.score("How do I reset my password?")
+    assert safe < 0.05 and labels == [] and coverage == 1.0
+
+    once, _, _ = prefilter.score("idiot")
+    twice, _, _ = prefilter.score("Idiot, idiot!")
+    assert once == twice
+
+    score, labels, coverage = prefilter.score("Just go KILL yourself")
+    assert score > 0.99 and labels == ["threat"] and coverage == 0.5
+
+def test_cascade_sends_only_the_uncertain_band_to_the_model():
+    toxicity = FakeToxicity(cascade=True, safe_below=0.05, toxic_above=0.99)
+    texts = ["What is the capital of this country?", "This plan is stupid", "go kill yourself", ""]
+
+    results = toxicity.scan_batch(texts)
+
+    assert toxicity.model_texts == ["This plan is stupid"]
+    assert results[0] == (False, results[0][1], [])
+    assert results[1] == (False, 0.3, [])
+    assert results[2][0] is True and "threat" in results[2][2]
+    assert results[3][0] is False
+
+    stats = toxicity.stats()
+    assert (stats["decided_safe"], stats["decided_toxic"], stats["escalated"]) == (2, 1, 1)
+    assert stats["escalated_fraction"] == 0.25
+
+def test_cascade_needs_known_words_to_decide_safe():
+    toxicity = FakeToxicity(cascade=True, safe_below=0.05, toxic_above=0.99, safe_coverage=0.9)
+    texts = [
+        "Can you help me write an email to my team about the project plan?",
+        "Eres un idiota inútil y nadie te quiere",     # No English cue, but not English
+        "ur such a mongoloid lmao",                    # Slur missing from the lexicon
+        "People like you should be wiped off the map", # Toxic paraphrase, no listed term
+    ]
+
+    results = toxicity.scan_batch(texts)
+
+    assert results[0] == (False, results[0][1], [])
+    assert toxicity.model_texts == texts[1:]
+    assert toxicity.stats()["decided_safe"] == 1
+
+def test_cascade_counters_are_consistent_across_threads():
+    toxicity = FakeToxicity(cascade=True, safe_below=0.05, toxic_above=0.99)
+    texts = ["What is the capital of this country?", "This plan is stupid", "go kill yourself"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: toxicity.scan_batch(texts), range(200)))
+
+    stats = toxicity.stats()
+    assert stats["prefiltered"] == 600
+    assert (stats["decided_safe"], stats["decided_toxic"], stats["escalated"]) == (200, 200, 200)
+
+def test_cascade_off_sends_everything_to_the_model():
+    toxicity = FakeToxicity(cascade=False)
+    toxicity.scan_batch(["hello", "go kill yourself"])
+    assert toxicity.model_texts == ["hello", "go kill yourself"]
+    assert toxicity.stats()["prefiltered"] == 0
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.services.vector_index import ExactIndex, IVFIndex, build_index
+
+def clustered(n, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return centers[rng.integers(clusters, size=n)] + 0.1 * rng.normal(size=(n, dim))
+
+def test_exact_returns_top_k_with_ids():
+    index = ExactIndex(dim=2)
+    index.add(["east", "north", "west"], np.array([[1, 0], [0, 1], [-1, 0]]))
+    hits = index.search(np.array([[1, 0.2]]), k=2)[0]
+    assert [hit_id for hit_id, _ in hits] == ["east", "north"]
+    assert hits[0][1] == pytest.approx(1 / np.sqrt(1.04))
+
+def test_exact_matches_brute_force():
+    vectors, queries = clustered(2000), clustered(50, seed=1)
+    index = ExactIndex(dim=32)
+    index.add([str(i) for i in range(len(vectors))], vectors)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T, axis=1)[:, :5]
+    for hits, row in zip(index.search(queries, k=5), expected):
+        assert [hit_id for hit_id, _ in hits] == [str(i) for i in row]
+
+def test_k_larger_than_corpus_and_empty_index():
+    index = ExactIndex(dim=2)
+    assert index.search(np.array([[1, 0]]), k=3) == [[]]
+    index.add(["a"], np.array([[1, 0]]))
+    assert [hit_id for hit_id, _ in index.search(np.array([[1, 0]]), k=3)[0]] == ["a"]
+
+def test_ivf_recall_and_incremental_add():
+    vectors, queries = clustered(5000), clustered(100, seed=1)
+    ids = [str(i) for i in range(len(vectors))]
+    exact, ivf = ExactIndex(dim=32), IVFIndex(dim=32, n_probe=8, min_train_size=1000)
+    exact.add(ids, vectors)
+    ivf.add(ids[:3000], vectors[:3000])
+    ivf.search(queries[:1])  # trains on the first 3000
+    ivf.add(ids[3000:], vectors[3000:])
+
+    truth = [hits[0][0] for hits in exact.search(queries)]
+    found = [hits[0][0] for hits in ivf.search(queries)]
+    assert ivf.stats()["lists"] == int(np.sqrt(3000))
+    assert np.mean([a == b for a, b in zip(truth, found)]) >= 0.95
+
+def test_ivf_retrains_after_corpus_doubles():
+    vectors = clustered(4000)
+    index = IVFIndex(dim=32, min_train_size=1000)
+    index.add([str(i) for i in range(1500)], vectors[:1500])
+    index.search(vectors[:1])
+    index.add([str(i) for i in range(1500, 4000)], vectors[1500:])
+    index.search(vectors[:1])
+    assert index.stats()["trained_size"] == 4000
+
+def test_build_index():
+    assert build_index("exact", 8).kind == "exact"
+    assert build_index("ivf", 8, n_probe=2).n_probe == 2
+    with pytest.raises(ValueError):
+        build_index("hnsw", 8)